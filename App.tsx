@@ -1436,11 +1436,8 @@ const NewDesignApp: React.FC = () => {
                   setLyricsLoading(true);
                   setLyricsError(null);
                   try {
+                    // Сначала бэкенд: тексты для очереди уже предзагружены в его кэш
                     try {
-                      const res = await fetchLyrics(safeTrack.title, safeTrack.artist);
-                      setLyricsText(res.lyrics);
-                      setLyricsTrackId(safeTrack.id);
-                    } catch {
                       const apiRes = await getLyricsApi(
                         safeTrack.id || `lyrics-${safeTrack.title}-${safeTrack.artist}`,
                         safeTrack.title,
@@ -1453,6 +1450,10 @@ const NewDesignApp: React.FC = () => {
                       } else {
                         throw new Error('Текст не найден');
                       }
+                    } catch {
+                      const res = await fetchLyrics(safeTrack.title, safeTrack.artist);
+                      setLyricsText(res.lyrics);
+                      setLyricsTrackId(safeTrack.id);
                     }
                   } catch (err: any) {
                     setLyricsText(null);
@@ -1,21 +1,78 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime
+from sqlalchemy import create_engine, event, Column, Integer, String, Boolean, Date, DateTime, LargeBinary, Index, Numeric
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Optional
 from dotenv import load_dotenv
 import os
 from pathlib import Path
 
+try:
+    from backend.lyrics_codec import encode_lyrics, decode_lyrics
+except ImportError:
+    from lyrics_codec import encode_lyrics, decode_lyrics
+
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env")
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./users.db")
 
-engine_kwargs = {}
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    engine_kwargs["connect_args"] = {"check_same_thread": False}
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_kwargs)
+def _env_flag(name: str, default: str = "1") -> bool:
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite tuning. WAL lets readers run alongside the single
+    writer instead of failing with "database is locked"; synchronous=NORMAL is
+    durable in WAL mode except for the last transactions on power loss.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_MB', '64')) * 1024}")
+        cursor.execute(f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_MB', '256')) * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str, tuned: bool = True):
+    """
+    Engine for `url`. With tuned=False it's the plain library defaults
+    (kept for scripts/bench_db_concurrency.py to compare against).
+
+    SQLite: WAL + pragmas on every connection, writers wait SQLITE_BUSY_TIMEOUT
+    seconds for the lock instead of failing.
+    Other databases: explicit pool settings from DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE and DB_POOL_PRE_PING.
+    """
+    kwargs = {}
+    is_sqlite = url.startswith("sqlite")
+    if is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+        if tuned:
+            kwargs["connect_args"]["timeout"] = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+    elif tuned:
+        kwargs.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            pool_pre_ping=_env_flag("DB_POOL_PRE_PING"),
+        )
+
+    new_engine = create_engine(url, **kwargs)
+    if is_sqlite and tuned and _env_flag("SQLITE_PRAGMAS"):
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -31,7 +88,7 @@ class User(Base):
     is_premium = Column(Boolean, default=False)
     is_premium_pro = Column(Boolean, default=False)  # Эксклюзивный уровень
     is_blocked = Column(Boolean, default=False)  # New field for access control
-    download_count = Column(Integer, default=0)  # Track download activity
+    download_count = Column(Integer, default=0, index=True)  # Track download activity
     joined_at = Column(DateTime, default=datetime.utcnow)
     
     # Trial period fields
@@ -47,6 +104,11 @@ class User(Base):
     referral_code = Column(String, unique=True, index=True, nullable=True)
     referred_by = Column(Integer, nullable=True)  # ID of referrer
 
+    __table_args__ = (
+        # Admin user list keyset: ORDER BY joined_at DESC, id DESC; also joined_at ranges
+        Index("ix_users_joined_id", "joined_at", "id"),
+    )
+
 class DownloadedMessage(Base):
     __tablename__ = "downloaded_messages"
 
@@ -57,15 +119,46 @@ class DownloadedMessage(Base):
     track_id = Column(String)  # Track identifier
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_downloaded_messages_user_track", "user_id", "track_id"),
+        # Daily rollups: WHERE created_at BETWEEN ...
+        Index("ix_downloaded_messages_created_at", "created_at"),
+    )
+
 class Lyrics(Base):
     __tablename__ = "lyrics"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    track_id = Column(String, unique=True, index=True)  # Unique track identifier
+    track_id = Column(String, unique=True, index=True)  # Track id the entry was first fetched for
+    lookup_key = Column(String, unique=True, index=True, nullable=True)  # Normalized "artist|||title"
     title = Column(String)
     artist = Column(String)
-    lyrics_text = Column(String)  # Full lyrics text
+    lyrics_text_plain = Column("lyrics_text", String, nullable=True)  # Legacy uncompressed text
+    lyrics_data = Column(LargeBinary, nullable=True)  # Compressed lyrics (see lyrics_codec)
+    lyrics_codec = Column(String, nullable=True)  # Codec of lyrics_data: zlib, zstd, none
     source = Column(String, default="genius")  # Source: genius, manual, etc.
+    status = Column(String, default="found")  # 'found' or 'not_found' (negative cache)
+    expires_at = Column(DateTime, nullable=True)  # When a not-found entry may be retried
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    @property
+    def lyrics_text(self):
+        """Full lyrics text (None for not-found entries), decompressed on access"""
+        if self.lyrics_data is not None:
+            return decode_lyrics(self.lyrics_data, self.lyrics_codec)
+        return self.lyrics_text_plain
+
+    @lyrics_text.setter
+    def lyrics_text(self, value):
+        self.lyrics_data, self.lyrics_codec = encode_lyrics(value)
+        self.lyrics_text_plain = None
+
+class LyricsAlias(Base):
+    __tablename__ = "lyrics_aliases"
+
+    # Hitmo gives the same song different ids; every id maps to one lookup key
+    track_id = Column(String, primary_key=True)
+    lookup_key = Column(String, index=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class Payment(Base):
@@ -74,6 +167,8 @@ class Payment(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, index=True)
     amount = Column(String) # Store as string to avoid float precision issues with crypto
+    # Numeric copy of `amount` for SQL-side aggregation; kept in sync by the listener below
+    amount_value = Column(Numeric(20, 9, asdecimal=False), nullable=True)
     currency = Column(String) # 'TON', 'XTR' (Stars)
     plan = Column(String) # 'month', 'year'
     status = Column(String) # 'pending', 'completed', 'failed'
@@ -86,6 +181,30 @@ class Payment(Base):
     completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Covers the revenue aggregate (SUM(amount_value) per currency) without touching the table
+        Index("ix_payments_status_currency_amount", "status", "currency", "amount_value"),
+        # Daily rollups: WHERE status = 'completed' AND completed_at BETWEEN ...
+        Index("ix_payments_status_completed_at", "status", "completed_at"),
+        # Admin transactions keyset: ORDER BY created_at DESC, id DESC
+        Index("ix_payments_created_id", "created_at", "id"),
+    )
+
+
+def parse_amount(value) -> Optional[float]:
+    """Numeric value of a stored payment amount ("1.5", "100", "0,25"); None if unparseable."""
+    if value is None:
+        return None
+    try:
+        return float(Decimal(str(value).strip().replace(",", ".")))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+@event.listens_for(Payment.amount, "set")
+def _sync_amount_value(target, value, oldvalue, initiator):
+    target.amount_value = parse_amount(value)
+
 class Referral(Base):
     __tablename__ = "referrals"
 
@@ -97,6 +216,12 @@ class Referral(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)  # When referral made first purchase
 
+    __table_args__ = (
+        Index("ix_referrals_referrer_status", "referrer_id", "status"),
+        # Referral list page: WHERE referrer_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_referrals_referrer_created", "referrer_id", "created_at", "id"),
+    )
+
 
 class PromoCode(Base):
     __tablename__ = "promo_codes"
@@ -114,9 +239,37 @@ class PromoCode(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class DailyStat(Base):
+    """Per-day counters for the admin dashboards, maintained by rollups.py"""
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)
+    new_users = Column(Integer, default=0)
+    active_users = Column(Integer, default=0)  # distinct users with any track event
+    plays = Column(Integer, default=0)
+    completes = Column(Integer, default=0)
+    downloads = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DailyRevenue(Base):
+    """Completed payments per day and currency, maintained by rollups.py"""
+    __tablename__ = "daily_revenue"
+
+    day = Column(Date, primary_key=True)
+    currency = Column(String, primary_key=True)
+    amount = Column(Numeric(20, 9, asdecimal=False), default=0)
+    payments = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    # Tables, columns and indexes are managed by versioned migrations
+    try:
+        from backend.migrations import run_migrations
+    except ImportError:
+        from migrations import run_migrations
+    run_migrations()
     
     # Ensure default admin exists
     db = SessionLocal()
@@ -140,3 +293,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Run blocking Session work from an async endpoint in the worker threadpool.
+
+    Endpoints that only touch the database are plain `def` (FastAPI already runs
+    them in the threadpool); async endpoints that also await network calls pass
+    their database steps through here so queries never block the event loop.
+    The session must not be used concurrently: await each call before the next.
+    """
+    return await run_in_threadpool(func, *args, **kwargs)
@@ -0,0 +1,254 @@
+"""
+Scratch-space manager for download pipelines (YouTube -> chat, Hitmo -> chat).
+
+Every job gets its own directory under a shared root. The directory is removed
+when the job finishes, whether it succeeded or failed, and directories left
+behind by crashed workers are swept on startup. The root can live on tmpfs
+(/dev/shm) so that half-written files from failed jobs never compete with the
+audio stream proxy for disk I/O, and a byte quota keeps the root bounded.
+
+The quota counts every job directory under the root (of any worker process)
+as at least DOWNLOAD_MAX_FILE_MB: a job reserves its maximum size when its
+directory is created and releases it when the directory is removed. The
+check and the mkdir happen under a lock file in the root, so parallel jobs
+of several workers can't all pass the check against the same free space.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock only
+    fcntl = None
+
+WORKSPACE_PREFIX = "dl-"
+LOCK_FILE = ".quota.lock"
+TMPFS_ROOT = Path("/dev/shm")
+
+
+class WorkspaceQuotaExceeded(Exception):
+    """Raised when there is no room left under the workspace root."""
+
+
+class DownloadTooLarge(Exception):
+    """Raised when a downloaded file grows past DOWNLOAD_MAX_FILE_MB."""
+
+
+def find_ffmpeg() -> Optional[str]:
+    """
+    Locate FFmpeg: FFMPEG_LOCATION / FFMPEG_PATH from the environment first,
+    then the `ffmpeg` binary on PATH. Returns None if nothing usable is found.
+    """
+    for env_name in ("FFMPEG_LOCATION", "FFMPEG_PATH"):
+        location = os.getenv(env_name, "").strip()
+        if location and os.path.exists(location):
+            return location
+    return shutil.which("ffmpeg")
+
+
+def _default_root() -> Path:
+    configured = os.getenv("DOWNLOAD_TMP_ROOT", "").strip()
+    if configured:
+        return Path(configured)
+
+    use_tmpfs = os.getenv("DOWNLOAD_TMP_USE_TMPFS", "1").strip().lower() not in ("0", "false", "no")
+    if use_tmpfs and TMPFS_ROOT.is_dir() and os.access(TMPFS_ROOT, os.W_OK):
+        return TMPFS_ROOT / "tgmusic-downloads"
+    return Path(tempfile.gettempdir()) / "tgmusic-downloads"
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class DownloadWorkspaceManager:
+    """
+    Hands out per-job scratch directories with a shared byte quota.
+
+    Directory names embed the owning PID (`dl-<pid>-<hex>`), so the startup
+    sweep can tell directories of live workers sharing the root apart from
+    orphans left by dead ones.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        quota_bytes: Optional[int] = None,
+        max_file_bytes: Optional[int] = None,
+        max_concurrent: Optional[int] = None,
+        orphan_max_age: Optional[int] = None,
+    ):
+        self.root = Path(root) if root else _default_root()
+        self.quota_bytes = quota_bytes if quota_bytes is not None else int(os.getenv("DOWNLOAD_TMP_QUOTA_MB", "512")) * 1024 * 1024
+        self.max_file_bytes = max_file_bytes if max_file_bytes is not None else int(os.getenv("DOWNLOAD_MAX_FILE_MB", "100")) * 1024 * 1024
+        self.max_concurrent = max_concurrent if max_concurrent is not None else int(os.getenv("DOWNLOAD_MAX_CONCURRENT", "4"))
+        # Directories older than this are removed even if their PID looks alive (PID reuse).
+        self.orphan_max_age = orphan_max_age if orphan_max_age is not None else int(os.getenv("DOWNLOAD_ORPHAN_MAX_AGE", "3600"))
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._quota_lock = threading.Lock()
+        self._active: Dict[str, Path] = {}
+        self._stats = {
+            "created": 0,
+            "cleaned": 0,
+            "failed_jobs": 0,
+            "quota_rejections": 0,
+            "orphans_swept": 0,
+        }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the manager can be built at import time, outside the event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    def usage_bytes(self) -> int:
+        if not self.root.exists():
+            return 0
+        return _dir_size(self.root)
+
+    def reserved_bytes(self) -> int:
+        """Usage with every job directory counted as at least max_file_bytes (its reservation)."""
+        if not self.root.exists():
+            return 0
+        total = 0
+        for entry in self.root.iterdir():
+            try:
+                if entry.is_dir():
+                    size = _dir_size(entry)
+                    total += max(size, self.max_file_bytes) if entry.name.startswith(WORKSPACE_PREFIX) else size
+                else:
+                    total += entry.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    @contextmanager
+    def _locked_root(self):
+        """Serialize quota checks across threads of this process and across worker processes."""
+        with self._quota_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.root / LOCK_FILE, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def sweep_orphans(self) -> int:
+        """Remove job directories whose owner process is gone or that are too old."""
+        if not self.root.exists():
+            return 0
+
+        removed = 0
+        now = time.time()
+        for entry in self.root.iterdir():
+            if not entry.is_dir() or not entry.name.startswith(WORKSPACE_PREFIX):
+                continue
+            if str(entry) in self._active:
+                continue
+
+            try:
+                pid = int(entry.name[len(WORKSPACE_PREFIX):].split("-", 1)[0])
+            except ValueError:
+                pid = -1
+
+            try:
+                age = now - entry.stat().st_mtime
+            except OSError:
+                continue
+
+            if pid > 0 and _pid_alive(pid) and age < self.orphan_max_age:
+                continue
+
+            shutil.rmtree(entry, ignore_errors=True)
+            removed += 1
+
+        if removed:
+            self._stats["orphans_swept"] += removed
+            print(f"🗑️ Swept {removed} orphaned download workspaces from {self.root}")
+        return removed
+
+    def _create_dir(self) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        with self._locked_root():
+            if self.reserved_bytes() + self.max_file_bytes > self.quota_bytes:
+                # A crashed worker may be holding space; try to reclaim before giving up.
+                self.sweep_orphans()
+                if self.reserved_bytes() + self.max_file_bytes > self.quota_bytes:
+                    self._stats["quota_rejections"] += 1
+                    raise WorkspaceQuotaExceeded(
+                        f"Download workspace quota exceeded ({self.quota_bytes // (1024 * 1024)} MB at {self.root})"
+                    )
+
+            # The directory itself is the reservation: it counts until it is removed
+            path = self.root / f"{WORKSPACE_PREFIX}{os.getpid()}-{uuid.uuid4().hex}"
+            path.mkdir()
+        return path
+
+    @asynccontextmanager
+    async def workspace(self):
+        """
+        Async context manager yielding a fresh job directory.
+        The directory is always removed on exit, including on errors and cancellation.
+        """
+        async with self._get_semaphore():
+            path = await asyncio.to_thread(self._create_dir)
+            self._active[str(path)] = path
+            self._stats["created"] += 1
+            try:
+                yield path
+            except BaseException:
+                self._stats["failed_jobs"] += 1
+                raise
+            finally:
+                self._active.pop(str(path), None)
+                await asyncio.to_thread(shutil.rmtree, path, True)
+                self._stats["cleaned"] += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "root": str(self.root),
+            "on_tmpfs": str(self.root).startswith(str(TMPFS_ROOT)),
+            "quota_bytes": self.quota_bytes,
+            "usage_bytes": self.usage_bytes(),
+            "reserved_bytes": self.reserved_bytes(),
+            "active": len(self._active),
+            **self._stats,
+        }
+
+
+workspace_manager = DownloadWorkspaceManager()
@@ -6,6 +6,7 @@ import urllib.parse
 import asyncio
 import os
 import random
+import hashlib
 
 class HitmoParser:
     """
@@ -36,6 +37,12 @@ class HitmoParser:
             return None
         return random.choice(self.proxy_list)
     
+    @staticmethod
+    def _stable_track_id(artist: str, title: str, duration: int, url: str) -> str:
+        """Generated track id that is the same across processes (unlike built-in hash())"""
+        digest = hashlib.md5(f"{artist}|{title}|{duration}|{url}".encode("utf-8")).hexdigest()
+        return f"gen_{digest[:16]}"
+
     def _prepare_headers(self, user_agent: Optional[str] = None) -> dict:
         """Prepare headers with custom user agent if provided"""
         headers = self.default_headers.copy()
@@ -155,7 +162,7 @@ class HitmoParser:
 
                         track_id = el.get('data-track-id') or el.get('data-id') or el.get('id')
                         if not track_id:
-                            track_id = f"gen_{abs(hash(f'{artist}|{title}|{duration}|{url}'))}"
+                            track_id = self._stable_track_id(artist, title, duration, url)
 
                         key = f"{track_id}-{title}-{artist}"
                         if key in seen:
@@ -329,7 +336,7 @@ class HitmoParser:
 
                         track_id = el.get('data-track-id') or el.get('data-id') or el.get('id')
                         if not track_id:
-                            track_id = f"gen_{abs(hash(f'{artist}|{title}|{duration}|{track_url}'))}"
+                            track_id = self._stable_track_id(artist, title, duration, track_url)
 
                         fallback_image = None
                         if cover_el:
@@ -0,0 +1,160 @@
+"""
+Popularity-driven lyrics backfill.
+
+Ranks songs by play count from user_track_events and looks up lyrics for the
+most played ones that are not cached yet, so that most lyrics opens are cache
+hits. Lookups go through LyricsPrefetcher (bounded worker pool) with a
+per-source rate limit.
+
+Progress is the cache itself: every answer, found or not, is written to the
+lyrics table as soon as it arrives, and ranking skips cached songs. An
+interrupted run simply continues where it stopped when started again.
+
+Run from backend/:
+    python scripts/backfill_lyrics.py --limit 500
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import SessionLocal
+    from backend.lyrics_cache import make_lyrics_key, fresh_keys
+    from backend.lyrics_prefetch import LyricsPrefetcher
+    from backend.lyrics_service import LyricsService
+    from backend.recommendations.models import UserTrackEvent
+except ImportError:
+    from database import SessionLocal
+    from lyrics_cache import make_lyrics_key, fresh_keys
+    from lyrics_prefetch import LyricsPrefetcher
+    from lyrics_service import LyricsService
+    from recommendations.models import UserTrackEvent
+
+PLAY_EVENTS = ("play", "complete")
+
+# The ranking is fetched once with limit * RANK_OVERFETCH rows and filtered; only if
+# cached songs ate too much of it, it is fetched again RANK_GROWTH times larger
+RANK_OVERFETCH = 4
+RANK_GROWTH = 4
+# Cache state is checked this many keys per IN query
+CACHE_CHECK_CHUNK = 500
+
+# (track_id, artist, title, plays)
+RankedTrack = Tuple[Optional[str], str, str, int]
+
+
+def rank_uncached_tracks(db: Session, limit: int, days: Optional[int] = None) -> List[RankedTrack]:
+    """
+    Most played songs without a cache entry (or with an expired miss), most played first.
+
+    Args:
+        db: Database session
+        limit: Max number of songs to return
+        days: Only count plays from the last N days (all time if None)
+    """
+    plays = func.count(UserTrackEvent.id).label("plays")
+    query = (
+        db.query(UserTrackEvent.artist, UserTrackEvent.title, func.max(UserTrackEvent.track_id), plays)
+        .filter(UserTrackEvent.event_type.in_(PLAY_EVENTS))
+    )
+    if days:
+        query = query.filter(UserTrackEvent.created_at >= datetime.utcnow() - timedelta(days=days))
+    # artist, title make the order total, so a larger fetch starts with the same rows
+    query = query.group_by(UserTrackEvent.artist, UserTrackEvent.title).order_by(
+        plays.desc(), UserTrackEvent.artist, UserTrackEvent.title
+    )
+
+    result: List[RankedTrack] = []
+    seen = set()
+    filtered = 0
+    fetch_size = max(limit * RANK_OVERFETCH, 1)
+    while len(result) < limit:
+        rows = query.limit(fetch_size).all()
+        new_rows = rows[filtered:]
+        filtered = len(rows)
+
+        for start in range(0, len(new_rows), CACHE_CHECK_CHUNK):
+            keyed = [
+                (make_lyrics_key(artist, title), artist, title, track_id, count)
+                for artist, title, track_id, count in new_rows[start:start + CACHE_CHECK_CHUNK]
+            ]
+            cached = fresh_keys(db, [key for key, *_ in keyed])
+            for key, artist, title, track_id, count in keyed:
+                # Spelling variants of one song normalize to the same key; the first (most played) wins
+                if key in cached or key in seen:
+                    continue
+                seen.add(key)
+                result.append((track_id, artist, title, count))
+                if len(result) >= limit:
+                    return result
+
+        if len(rows) < fetch_size:
+            break
+        fetch_size *= RANK_GROWTH
+    return result
+
+
+async def run_backfill(
+    limit: int = 200,
+    concurrency: Optional[int] = None,
+    rate_limit: Optional[float] = None,
+    days: Optional[int] = None,
+    report_every: float = 10.0,
+) -> Dict:
+    """
+    Fetch lyrics for the `limit` most played uncached songs.
+
+    Args:
+        limit: Number of songs to look up in this run
+        concurrency: Parallel lookups (default from LYRICS_BACKFILL_CONCURRENCY)
+        rate_limit: Requests per second to each source (default from LYRICS_BACKFILL_RPS)
+        days: Rank by plays from the last N days only
+        report_every: Seconds between progress lines
+
+    Returns:
+        Final prefetcher stats
+    """
+    if concurrency is None:
+        concurrency = int(os.getenv("LYRICS_BACKFILL_CONCURRENCY", "4"))
+    if rate_limit is None:
+        rate_limit = float(os.getenv("LYRICS_BACKFILL_RPS", "1"))
+
+    db = SessionLocal()
+    try:
+        ranked = await asyncio.to_thread(rank_uncached_tracks, db, limit, days)
+    finally:
+        db.close()
+
+    if not ranked:
+        print("✅ Nothing to backfill: all popular tracks have cached lyrics")
+        return {}
+
+    print(f"🎵 Backfilling lyrics for {len(ranked)} tracks "
+          f"(top plays: {ranked[0][3]}, concurrency {concurrency}, {rate_limit:g} req/s per source)")
+
+    service = LyricsService(max_concurrency=concurrency, rate_limit=rate_limit)
+    prefetcher = LyricsPrefetcher(service, concurrency=concurrency, queue_size=len(ranked))
+    started = time.monotonic()
+    try:
+        prefetcher.enqueue((track_id, artist, title) for track_id, artist, title, _ in ranked)
+
+        join_task = asyncio.create_task(prefetcher.join())
+        while not join_task.done():
+            await asyncio.wait({join_task}, timeout=report_every)
+            stats = prefetcher.get_stats()
+            done = stats["found"] + stats["not_found"] + stats["already_cached"] + stats["errors"]
+            print(f"⏳ {done}/{len(ranked)} done, {stats['found']} found, "
+                  f"{stats['not_found']} not found, {stats['errors']} errors")
+    finally:
+        await prefetcher.close()
+        await service.close()
+
+    stats = prefetcher.get_stats()
+    print(f"✅ Lyrics backfill finished in {time.monotonic() - started:.1f}s: {stats}")
+    return stats
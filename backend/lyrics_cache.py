@@ -0,0 +1,304 @@
+"""
+Database cache for lyrics lookups.
+
+Entries are keyed by a normalized "artist|||title" key instead of the Hitmo
+track id, so every id Hitmo hands out for the same song shares one row.
+Track ids are kept in an alias index. Lookups that found nothing are stored
+as well, with an expiry, so an unfindable track doesn't re-run the external
+sources every time the lyrics modal opens.
+
+Found entries are also kept in a small in-process LRU (the hot tier) so that
+popular songs skip the database and decompression entirely. Only found
+entries go there: they never change, while a miss may be replaced by a
+backfill running in another process. Writes through this module update or
+evict the hot entry; rows purged outside the process (scripts/
+clear_lyrics_cache.py) stay in a worker's hot tier until it restarts, which
+is bounded by LYRICS_HOT_CACHE_SIZE.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import Lyrics, LyricsAlias
+    from backend.lyrics_codec import get_codec_stats
+    from backend.lyrics_search import index_lyrics
+    from backend.lyrics_service import LyricsService
+except ImportError:
+    from database import Lyrics, LyricsAlias
+    from lyrics_codec import get_codec_stats
+    from lyrics_search import index_lyrics
+    from lyrics_service import LyricsService
+
+STATUS_FOUND = "found"
+STATUS_NOT_FOUND = "not_found"
+
+# How long a "not found" answer is trusted before the sources are asked again
+MISS_TTL = timedelta(hours=float(os.getenv("LYRICS_MISS_TTL_HOURS", "24")))
+
+# Number of found entries kept decompressed in memory
+HOT_CACHE_SIZE = int(os.getenv("LYRICS_HOT_CACHE_SIZE", "2000"))
+
+
+class LyricsSnapshot:
+    """Detached, decompressed copy of a Lyrics row (same attribute names)"""
+
+    __slots__ = ("lookup_key", "track_id", "title", "artist", "lyrics_text", "source", "status", "expires_at")
+
+    def __init__(self, entry: Lyrics):
+        self.lookup_key = entry.lookup_key
+        self.track_id = entry.track_id
+        self.title = entry.title
+        self.artist = entry.artist
+        self.lyrics_text = entry.lyrics_text
+        self.source = entry.source
+        self.status = entry.status
+        self.expires_at = entry.expires_at
+
+
+class HotLyricsCache:
+    """LRU of found lyrics keyed by lookup key"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, LyricsSnapshot]" = OrderedDict()
+        # Used from the threadpool (sync endpoints, run_db, the prefetcher's to_thread)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, lookup_key: str) -> Optional[LyricsSnapshot]:
+        with self._lock:
+            snapshot = self._entries.get(lookup_key)
+            if snapshot is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(lookup_key)
+            self._stats["hits"] += 1
+            return snapshot
+
+    def put(self, snapshot: LyricsSnapshot):
+        """Cache a found entry; a miss evicts whatever was cached under its key."""
+        if snapshot.status == STATUS_NOT_FOUND:
+            self.discard(snapshot.lookup_key)
+            return
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[snapshot.lookup_key] = snapshot
+            self._entries.move_to_end(snapshot.lookup_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def discard(self, lookup_key: str):
+        with self._lock:
+            self._entries.pop(lookup_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0,
+        }
+
+
+hot_cache = HotLyricsCache(HOT_CACHE_SIZE)
+
+
+def make_lyrics_key(artist: str, title: str) -> str:
+    """Normalized cache key: feat./remix/brackets stripped, case-folded"""
+    normalized_artist = LyricsService._normalize_query(artist or "").lower()
+    normalized_title = LyricsService._normalize_query(title or "").lower()
+    return f"{normalized_artist}|||{normalized_title}"
+
+
+def is_miss(entry: Lyrics) -> bool:
+    return entry.status == STATUS_NOT_FOUND
+
+
+def is_expired(entry: Lyrics, now: Optional[datetime] = None) -> bool:
+    return entry.expires_at is not None and entry.expires_at <= (now or datetime.utcnow())
+
+
+def lookup_lyrics(db: Session, lookup_key: str, track_id: Optional[str] = None) -> Optional[LyricsSnapshot]:
+    """
+    Find a cache entry (hit or miss) for a song.
+    The hot tier answers popular songs from memory; otherwise the normal path is
+    a single read on the unique lookup_key index. The track id is only consulted
+    for songs first cached under a different title spelling, and for rows
+    written before lookup keys existed.
+    """
+    snapshot = hot_cache.get(lookup_key)
+    if snapshot is not None:
+        return snapshot
+
+    entry = db.query(Lyrics).filter(Lyrics.lookup_key == lookup_key).first()
+    if entry is None and track_id:
+        alias = db.query(LyricsAlias).filter(LyricsAlias.track_id == track_id).first()
+        if alias:
+            entry = db.query(Lyrics).filter(Lyrics.lookup_key == alias.lookup_key).first()
+        else:
+            entry = db.query(Lyrics).filter(Lyrics.track_id == track_id, Lyrics.lookup_key.is_(None)).first()
+            if entry:
+                entry.lookup_key = lookup_key
+                _add_alias(db, track_id, lookup_key)
+                db.commit()
+
+    if entry is None:
+        return None
+    snapshot = LyricsSnapshot(entry)
+    hot_cache.put(snapshot)
+    return snapshot
+
+
+def fresh_keys(db: Session, lookup_keys: Iterable[str], now: Optional[datetime] = None) -> Set[str]:
+    """
+    Subset of lookup_keys that need no external fetch: lyrics found, or a miss
+    that hasn't expired yet. One IN query for the whole batch.
+    """
+    keys = list(set(lookup_keys))
+    if not keys:
+        return set()
+    now = now or datetime.utcnow()
+    rows = (
+        db.query(Lyrics.lookup_key, Lyrics.status, Lyrics.expires_at)
+        .filter(Lyrics.lookup_key.in_(keys))
+        .all()
+    )
+    return {
+        key for key, status, expires_at in rows
+        if status != STATUS_NOT_FOUND or expires_at is None or expires_at > now
+    }
+
+
+def _add_alias(db: Session, track_id: Optional[str], lookup_key: str):
+    if not track_id:
+        return
+    if db.query(LyricsAlias.track_id).filter(LyricsAlias.track_id == track_id).first():
+        return
+    db.add(LyricsAlias(track_id=track_id, lookup_key=lookup_key))
+
+
+def _upsert(db: Session, lookup_key: str, track_id: Optional[str], **fields) -> Lyrics:
+    entry = db.query(Lyrics).filter(Lyrics.lookup_key == lookup_key).first()
+    previous = None
+    if entry is None:
+        # track_id is unique on the legacy column; a second id for the same song only gets an alias
+        id_taken = track_id and db.query(Lyrics.id).filter(Lyrics.track_id == track_id).first()
+        entry = Lyrics(lookup_key=lookup_key, track_id=None if id_taken else track_id)
+        db.add(entry)
+    elif not is_miss(entry) and entry.lyrics_text:
+        # What the search index currently holds for this row
+        previous = (entry.title, entry.artist, entry.lyrics_text)
+    for name, value in fields.items():
+        setattr(entry, name, value)
+    _add_alias(db, track_id, lookup_key)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request stored the same song first; keep its row (it indexed it already)
+        db.rollback()
+        entry = db.query(Lyrics).filter(Lyrics.lookup_key == lookup_key).first()
+        if entry is None:
+            raise
+    else:
+        index_lyrics(db, entry, previous)
+    db.refresh(entry)
+    hot_cache.put(LyricsSnapshot(entry))
+    return entry
+
+
+def store_lyrics(
+    db: Session,
+    lookup_key: str,
+    track_id: Optional[str],
+    title: str,
+    artist: str,
+    lyrics_text: str,
+    source: str = "genius",
+) -> Lyrics:
+    return _upsert(
+        db,
+        lookup_key,
+        track_id,
+        title=title,
+        artist=artist,
+        lyrics_text=lyrics_text,
+        source=source,
+        status=STATUS_FOUND,
+        expires_at=None,
+        created_at=datetime.utcnow(),
+    )
+
+
+def store_miss(db: Session, lookup_key: str, track_id: Optional[str], title: str, artist: str) -> Lyrics:
+    now = datetime.utcnow()
+    return _upsert(
+        db,
+        lookup_key,
+        track_id,
+        title=title,
+        artist=artist,
+        lyrics_text=None,
+        source=None,
+        status=STATUS_NOT_FOUND,
+        expires_at=now + MISS_TTL,
+        created_at=now,
+    )
+
+
+def compress_legacy_rows(db: Session, batch_size: int = 500) -> int:
+    """Move plain-text lyrics written before compression into the compressed column"""
+    converted = 0
+    while True:
+        rows = (
+            db.query(Lyrics)
+            .filter(Lyrics.lyrics_data.is_(None), Lyrics.lyrics_text_plain.isnot(None))
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        for row in rows:
+            row.lyrics_text = row.lyrics_text_plain
+        db.commit()
+        converted += len(rows)
+    return converted
+
+
+def get_lyrics_cache_stats(db: Session) -> Dict:
+    """Row counts, on-disk size per codec and hot-tier hit rate"""
+    # Rows from before negative caching have no status and are all hits
+    status = func.coalesce(Lyrics.status, STATUS_FOUND)
+    by_status = dict(db.query(status, func.count(Lyrics.id)).group_by(status).all())
+    stored = (
+        db.query(
+            func.count(Lyrics.lyrics_data),
+            func.coalesce(func.sum(func.length(Lyrics.lyrics_data)), 0),
+            func.count(Lyrics.lyrics_text_plain),
+            func.coalesce(func.sum(func.length(Lyrics.lyrics_text_plain)), 0),
+        )
+        .one()
+    )
+    return {
+        "entries": by_status,
+        "compressed_rows": stored[0],
+        "compressed_bytes": int(stored[1]),
+        "legacy_plain_rows": stored[2],
+        "legacy_plain_chars": int(stored[3]),
+        "codec": get_codec_stats(),
+        "hot_tier": hot_cache.get_stats(),
+    }
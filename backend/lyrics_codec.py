@@ -0,0 +1,94 @@
+"""
+Compression codec for stored lyrics.
+
+Lyrics are plain text that compresses 3-4x, so the lyrics table stores them
+as compressed bytes plus the name of the codec used. zlib (stdlib) is the
+default; zstd is used when LYRICS_CODEC=zstd and the `zstandard` package is
+installed. Every row records its own codec, so changing the setting never
+breaks reading older rows.
+"""
+
+import os
+import zlib
+from typing import Dict, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+_stats = {
+    "encoded": 0,
+    "raw_bytes": 0,
+    "stored_bytes": 0,
+}
+
+
+def _configured_codec() -> str:
+    codec = os.getenv("LYRICS_CODEC", CODEC_ZLIB).strip().lower()
+    if codec == CODEC_ZSTD and zstandard is None:
+        print("⚠️ LYRICS_CODEC=zstd but zstandard is not installed, using zlib")
+        return CODEC_ZLIB
+    if codec not in (CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD):
+        return CODEC_ZLIB
+    return codec
+
+
+DEFAULT_CODEC = _configured_codec()
+
+
+def encode_lyrics(text: Optional[str], codec: Optional[str] = None) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Compress lyrics text. Returns (data, codec_name); (None, None) for None.
+    Falls back to uncompressed bytes when compression doesn't make it smaller.
+    """
+    if text is None:
+        return None, None
+
+    codec = codec or DEFAULT_CODEC
+    raw = text.encode("utf-8")
+    if codec == CODEC_ZSTD:
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    elif codec == CODEC_ZLIB:
+        data = zlib.compress(raw, ZLIB_LEVEL)
+    else:
+        data = raw
+
+    if codec != CODEC_NONE and len(data) >= len(raw):
+        data, codec = raw, CODEC_NONE
+
+    _stats["encoded"] += 1
+    _stats["raw_bytes"] += len(raw)
+    _stats["stored_bytes"] += len(data)
+    return data, codec
+
+
+def decode_lyrics(data: Optional[bytes], codec: Optional[str]) -> Optional[str]:
+    if data is None:
+        return None
+    if codec == CODEC_ZLIB:
+        data = zlib.decompress(data)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Lyrics row is zstd-compressed but zstandard is not installed")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return bytes(data).decode("utf-8")
+
+
+def get_codec_stats() -> Dict:
+    raw = _stats["raw_bytes"]
+    stored = _stats["stored_bytes"]
+    return {
+        "codec": DEFAULT_CODEC,
+        "encoded": _stats["encoded"],
+        "raw_bytes": raw,
+        "stored_bytes": stored,
+        "compression_ratio": round(raw / stored, 2) if stored else None,
+    }
@@ -0,0 +1,156 @@
+"""
+Background lyrics prefetch for the play queue.
+
+The client posts the upcoming tracks of its queue or playlist; the lookups run
+here in a small worker pool at low priority (they yield to interactive lyrics
+requests) and land in the lyrics cache, so opening the lyrics modal for the
+next track is a single database read.
+"""
+
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from backend.database import SessionLocal
+    from backend.lyrics_cache import make_lyrics_key, lookup_lyrics, store_lyrics, store_miss, is_miss, is_expired
+    from backend.lyrics_service import LyricsService
+except ImportError:
+    from database import SessionLocal
+    from lyrics_cache import make_lyrics_key, lookup_lyrics, store_lyrics, store_miss, is_miss, is_expired
+    from lyrics_service import LyricsService
+
+# (lookup_key, track_id, title, artist)
+PrefetchJob = Tuple[str, Optional[str], str, str]
+
+
+class LyricsPrefetcher:
+    """
+    Bounded queue of lyrics lookups drained by a fixed number of workers.
+
+    Jobs are de-duplicated by lookup key while pending, and a full queue drops
+    new jobs instead of blocking the request that submitted them.
+    """
+
+    def __init__(
+        self,
+        service: LyricsService,
+        concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ):
+        self.service = service
+        self.concurrency = concurrency if concurrency is not None else int(os.getenv("LYRICS_PREFETCH_CONCURRENCY", "2"))
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv("LYRICS_PREFETCH_QUEUE_SIZE", "500"))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending: Set[str] = set()
+        self._stats = {
+            "queued": 0,
+            "duplicates": 0,
+            "dropped": 0,
+            "already_cached": 0,
+            "found": 0,
+            "not_found": 0,
+            "errors": 0,
+        }
+
+    def _ensure_workers(self):
+        # Created lazily so the prefetcher can be built at import time, outside the event loop.
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def enqueue(self, tracks: Iterable[Tuple[Optional[str], str, str]]) -> int:
+        """
+        Queue (track_id, artist, title) tuples for background lookup.
+        Returns the number of jobs actually queued.
+        """
+        self._ensure_workers()
+        queued = 0
+        for track_id, artist, title in tracks:
+            lookup_key = make_lyrics_key(artist, title)
+            if lookup_key in self._pending:
+                self._stats["duplicates"] += 1
+                continue
+            try:
+                self._queue.put_nowait((lookup_key, track_id, title, artist))
+            except asyncio.QueueFull:
+                self._stats["dropped"] += 1
+                continue
+            self._pending.add(lookup_key)
+            queued += 1
+        self._stats["queued"] += queued
+        return queued
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"❌ Lyrics prefetch failed for {job[3]} - {job[2]}: {e}")
+            finally:
+                self._pending.discard(job[0])
+                self._queue.task_done()
+
+    async def _process(self, job: PrefetchJob):
+        lookup_key, track_id, title, artist = job
+
+        # An interactive request may have cached it while the job was waiting
+        if await asyncio.to_thread(self._is_cached, lookup_key, track_id):
+            self._stats["already_cached"] += 1
+            return
+
+        lyrics_text = await self.service.get_lyrics(title, artist, background=True)
+        await asyncio.to_thread(self._store, lookup_key, track_id, title, artist, lyrics_text)
+
+        if lyrics_text:
+            self._stats["found"] += 1
+            print(f"📝 Prefetched lyrics for: {artist} - {title}")
+        else:
+            self._stats["not_found"] += 1
+
+    @staticmethod
+    def _is_cached(lookup_key: str, track_id: Optional[str]) -> bool:
+        db = SessionLocal()
+        try:
+            entry = lookup_lyrics(db, lookup_key, track_id)
+            return entry is not None and (not is_miss(entry) or not is_expired(entry))
+        finally:
+            db.close()
+
+    @staticmethod
+    def _store(lookup_key: str, track_id: Optional[str], title: str, artist: str, lyrics_text: Optional[str]):
+        db = SessionLocal()
+        try:
+            if lyrics_text:
+                store_lyrics(db, lookup_key, track_id, title, artist, lyrics_text, source="genius")
+            else:
+                store_miss(db, lookup_key, track_id, title, artist)
+        finally:
+            db.close()
+
+    async def join(self):
+        """Wait until every queued job has been processed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def get_stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "pending": len(self._pending),
+            **self._stats,
+        }
@@ -0,0 +1,241 @@
+"""
+Full-text search over cached lyrics.
+
+Lyrics are stored compressed, so the database can't search them directly.
+Instead every found entry is also fed into a search index when it's stored:
+
+- SQLite: a contentless FTS5 table `lyrics_fts` (rowid = lyrics.id), ranked
+  with bm25(); it keeps only the inverted index, not a second copy of the text.
+- PostgreSQL: a `search_vector` tsvector column on `lyrics` with a GIN index,
+  ranked with ts_rank().
+
+Both use language-neutral tokenization since the catalogue mixes Russian and
+English. Snippets are cut in Python from the decompressed text of the hits.
+
+The index itself is created by a schema migration (migrations.py, version 9).
+Lyrics stored before it existed are indexed by scripts/rebuild_lyrics_search.py,
+which can also rebuild the whole index.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import engine, Lyrics
+except ImportError:
+    from database import engine, Lyrics
+
+FTS_TABLE = "lyrics_fts"
+TSVECTOR_COLUMN = "search_vector"
+GIN_INDEX = "ix_lyrics_search_vector"
+REBUILD_BATCH = 500
+SNIPPET_LINES = 2
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# unicode61 only folds Latin diacritics; "ё" is commonly typed as "е"
+_FOLD_TABLE = str.maketrans({"ё": "е", "Ё": "Е"})
+
+
+def _fold(value: str) -> str:
+    return value.translate(_FOLD_TABLE)
+
+# "fts5", "tsvector" or None (unsupported); detected on first use
+_backend: Optional[str] = None
+_backend_checked = False
+
+
+def _dialect() -> str:
+    return engine.dialect.name
+
+
+def _get_backend() -> Optional[str]:
+    """
+    Backend of the index created by the search migration. Never creates anything.
+    """
+    global _backend, _backend_checked
+    if not _backend_checked:
+        if _dialect() == "sqlite":
+            _backend = "fts5" if inspect(engine).has_table(FTS_TABLE) else None
+        elif _dialect() == "postgresql":
+            columns = {c["name"] for c in inspect(engine).get_columns("lyrics")}
+            _backend = "tsvector" if TSVECTOR_COLUMN in columns else None
+        _backend_checked = True
+    return _backend
+
+
+def _unindexed_ids(db: Session, after_id: int) -> List[int]:
+    if _backend == "fts5":
+        sql = (
+            f"SELECT id FROM lyrics WHERE id > :after AND COALESCE(status, 'found') = 'found' "
+            f"AND id NOT IN (SELECT rowid FROM {FTS_TABLE}) ORDER BY id LIMIT :limit"
+        )
+    else:
+        sql = (
+            "SELECT id FROM lyrics WHERE id > :after AND COALESCE(status, 'found') = 'found' "
+            "AND search_vector IS NULL ORDER BY id LIMIT :limit"
+        )
+    return [row[0] for row in db.execute(text(sql), {"after": after_id, "limit": REBUILD_BATCH})]
+
+
+def rebuild_search_index(db: Session, only_missing: bool = True) -> int:
+    """Index found lyrics that aren't in the index yet (all of them if only_missing is False)."""
+    if _get_backend() is None:
+        return 0
+
+    if not only_missing:
+        if _backend == "fts5":
+            db.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+        else:
+            db.execute(text("UPDATE lyrics SET search_vector = NULL"))
+        db.commit()
+
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = _unindexed_ids(db, last_id)
+        if not ids:
+            break
+        last_id = ids[-1]
+        for entry in db.query(Lyrics).filter(Lyrics.id.in_(ids)).all():
+            if entry.lyrics_text:
+                _write_index(db, entry.id, entry.title, entry.artist, entry.lyrics_text)
+                indexed += 1
+        db.commit()
+    return indexed
+
+
+def _write_index(db: Session, entry_id: int, title: Optional[str], artist: Optional[str], lyrics_text: str):
+    params = {"id": entry_id, "title": _fold(title or ""), "artist": _fold(artist or ""), "body": _fold(lyrics_text)}
+    if _backend == "fts5":
+        db.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, title, artist, lyrics_text) VALUES (:id, :title, :artist, :body)"),
+            params,
+        )
+    else:
+        db.execute(
+            text(
+                "UPDATE lyrics SET search_vector = "
+                "setweight(to_tsvector('simple', :title), 'A') || "
+                "setweight(to_tsvector('simple', :artist), 'A') || "
+                "setweight(to_tsvector('simple', :body), 'B') "
+                "WHERE id = :id"
+            ),
+            params,
+        )
+
+
+def index_lyrics(
+    db: Session,
+    entry: Lyrics,
+    previous: Optional[Tuple[Optional[str], Optional[str], str]] = None,
+):
+    """
+    Bring the search index in line with a freshly stored entry; commits.
+
+    Args:
+        db: Database session
+        entry: Lyrics row that was just stored (found or not found)
+        previous: (title, artist, lyrics_text) the row was indexed with before,
+                  if it was already a found entry. The contentless FTS5 table
+                  needs the old values to remove them.
+    """
+    if _get_backend() is None:
+        return
+    lyrics_text = entry.lyrics_text
+    if not previous and not lyrics_text:
+        return
+
+    if previous:
+        if _backend == "fts5":
+            old_title, old_artist, old_text = previous
+            db.execute(
+                text(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, artist, lyrics_text) "
+                    "VALUES ('delete', :id, :title, :artist, :body)"
+                ),
+                {"id": entry.id, "title": _fold(old_title or ""), "artist": _fold(old_artist or ""), "body": _fold(old_text)},
+            )
+        elif not lyrics_text:
+            db.execute(text("UPDATE lyrics SET search_vector = NULL WHERE id = :id"), {"id": entry.id})
+
+    if lyrics_text:
+        _write_index(db, entry.id, entry.title, entry.artist, lyrics_text)
+    db.commit()
+
+
+def _query_terms(query: str) -> List[str]:
+    return _TOKEN_RE.findall(_fold(query.lower()))
+
+
+def _fts5_match(terms: List[str]) -> str:
+    # Every term must match; the last one as a prefix so results follow the user's typing
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _make_snippet(lyrics_text: str, terms: List[str]) -> str:
+    lines = [line for line in lyrics_text.splitlines() if line.strip()]
+    for i, line in enumerate(lines):
+        lowered = _fold(line.lower())
+        if any(term in lowered for term in terms):
+            return "\n".join(lines[i:i + SNIPPET_LINES])
+    return "\n".join(lines[:SNIPPET_LINES])
+
+
+def search_lyrics(db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Ranked search over title, artist and lyrics text.
+
+    Returns:
+        List of {track_id, title, artist, snippet, score}, best match first
+    """
+    if _get_backend() is None:
+        raise RuntimeError("Lyrics search index is not available")
+
+    terms = _query_terms(query)
+    if not terms:
+        return []
+
+    if _backend == "fts5":
+        # bm25() is negative (lower = better); flip it so higher scores are better
+        rows = db.execute(
+            text(
+                f"SELECT rowid, -bm25({FTS_TABLE}, 5.0, 5.0, 1.0) AS score FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH :match ORDER BY bm25({FTS_TABLE}, 5.0, 5.0, 1.0) "
+                "LIMIT :limit OFFSET :offset"
+            ),
+            {"match": _fts5_match(terms), "limit": limit, "offset": offset},
+        ).all()
+    else:
+        tsquery = " & ".join(f"{term}:*" if i == len(terms) - 1 else term for i, term in enumerate(terms))
+        rows = db.execute(
+            text(
+                "SELECT id, ts_rank(search_vector, to_tsquery('simple', :q)) AS score FROM lyrics "
+                "WHERE search_vector @@ to_tsquery('simple', :q) "
+                "ORDER BY score DESC, id LIMIT :limit OFFSET :offset"
+            ),
+            {"q": tsquery, "limit": limit, "offset": offset},
+        ).all()
+
+    if not rows:
+        return []
+
+    entries = {entry.id: entry for entry in db.query(Lyrics).filter(Lyrics.id.in_([row[0] for row in rows])).all()}
+    results = []
+    for entry_id, score in rows:
+        entry = entries.get(entry_id)
+        if entry is None or not entry.lyrics_text:
+            continue
+        results.append({
+            "track_id": entry.track_id,
+            "title": entry.title,
+            "artist": entry.artist,
+            "snippet": _make_snippet(entry.lyrics_text, terms),
+            "score": round(float(score), 6),
+        })
+    return results
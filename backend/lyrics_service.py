@@ -2,20 +2,226 @@
 Lyrics Service for fetching song lyrics from multiple sources
 """
 
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import os
 import re
-from typing import Optional
+import time
+import urllib.parse
+from typing import Dict, List, Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+
+# --- Lyrics cleaner tables (compiled once at import) ---
+
+_PLAYLIST_KEYWORDS = ('playlist', 'tracklist', 'feel free to comment', 'must play', 'explicit')
+
+# Common languages headers and garbage
+_GARBAGE_LINES = frozenset([
+    'English', 'Russian', 'Español', 'Deutsch', 'Français', 'Italiano', 'Português',
+    'Slovenčina', 'Ελληνικά', 'فارسی', 'Magyar', 'Türkçe', 'Русский (Russian)',
+    'Română', 'Polski', 'Українська', '日本語', '한국어',
+    'العربية', 'Svenska', 'azərbaycan', 'עברית', 'हिन्दी', 'srpski',
+    'Česky', 'Македонски', 'עברית (Hebrew)', 'ไทย (Thai)', 'Tiếng Việt', '中文',
+    'Norsk', 'Nederlands', 'Dansk', 'Shqip', 'Suomi', 'Català',
+])
+
+# All case-insensitive "drop this line" rules in one alternation
+_DROP_LINE_RE = re.compile(
+    r'(?:'
+    r'\d+\s*Contributors'                 # Genius "42 Contributors"
+    r'|Translations'                       # Genius translations header
+    r'|Read More$'
+    r'|".*?"?\s+is\s+(?:the|a|about)'      # "Song" is the/a/about ...
+    r'|.*? Lyrics$'                        # "Song Title Lyrics" header
+    r'|Embed$'
+    r')',
+    re.IGNORECASE,
+)
+
+# Any non-ASCII word followed by "(Language)"
+_LANGUAGE_LABEL_RE = re.compile(r'[^\x00-\x7F]+\s+\([^)]+\)$')
+
+_EXTRA_NEWLINES_RE = re.compile(r'\n{3,}')
+
+
+class SourceStats:
+    """Success rate and latency of one lyrics source, used to order sources adaptively"""
+
+    # EWMA smoothing factor for latency
+    ALPHA = 0.2
+
+    def __init__(self, name: str):
+        self.name = name
+        self.attempts = 0
+        self.successes = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.avg_latency: Optional[float] = None
+
+    def record(self, latency: float, success: bool, error: bool = False, timeout: bool = False):
+        self.attempts += 1
+        if success:
+            self.successes += 1
+        if error:
+            self.errors += 1
+        if timeout:
+            self.timeouts += 1
+        if self.avg_latency is None:
+            self.avg_latency = latency
+        else:
+            self.avg_latency = self.ALPHA * latency + (1 - self.ALPHA) * self.avg_latency
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace smoothing: unknown sources start at 0.5 instead of 0 or 1
+        return (self.successes + 1) / (self.attempts + 2)
+
+    @property
+    def priority(self) -> float:
+        """Expected hits per second of waiting — higher goes first"""
+        return self.success_rate / max(self.avg_latency or 1.0, 0.05)
+
+    def to_dict(self) -> Dict:
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "success_rate": round(self.success_rate, 4),
+            "avg_latency_ms": round(self.avg_latency * 1000, 1) if self.avg_latency is not None else None,
+        }
+
+
+class SourceRateLimiter:
+    """Spaces out requests to each source so that at most `rate` start per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+
+    async def acquire(self, source: str):
+        if not self.interval:
+            return
+        # Reserve the slot before sleeping so concurrent callers queue up behind each other
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(source, 0.0))
+        self._next_slot[source] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 class LyricsService:
-    def __init__(self):
+    # Per-source request timeouts (seconds)
+    SOURCE_TIMEOUTS = {
+        "lyrics_ovh": 10.0,
+        "duckduckgo": 5.0,
+        "lyrics_page": 15.0,
+        "genius": 10.0,
+    }
+
+    # Statuses that mean "try again a bit later" (DuckDuckGo answers 202 when rate limiting)
+    RETRY_STATUSES = {202, 429, 503}
+
+    # Shortest cleaned text accepted as lyrics
+    MIN_LYRICS_LENGTH = 20
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_retries: int = 1,
+        backoff_base: float = 2.0,
+        race: Optional[bool] = None,
+        deadline: Optional[float] = None,
+        rate_limit: Optional[float] = None,
+    ):
         """
         Initialize Lyrics Service (no API tokens required)
+
+        Args:
+            max_concurrency: Max number of lookups running at the same time
+            max_retries: Retries per request on rate-limit statuses
+            backoff_base: First backoff delay in seconds (doubles on each retry)
+            race: Start all sources at once and take the first valid result
+                  (default from LYRICS_RACE, on unless set to 0)
+            deadline: Global time budget for one lookup in seconds (default from LYRICS_DEADLINE)
+            rate_limit: Max requests per second to each source, 0 = unlimited
+                        (default from LYRICS_SOURCE_RPS)
+        """
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        if race is None:
+            race = os.getenv("LYRICS_RACE", "1").strip().lower() not in ("0", "false", "no")
+        self.race = race
+        self.deadline = deadline if deadline is not None else float(os.getenv("LYRICS_DEADLINE", "15"))
+        if rate_limit is None:
+            rate_limit = float(os.getenv("LYRICS_SOURCE_RPS", "0"))
+        self.rate_limiter = SourceRateLimiter(rate_limit)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Interactive (user-facing) lookups in flight; background lookups wait for zero
+        self._interactive_inflight = 0
+
+        # Configured sources; order adapts to the recorded statistics
+        self._sources = {
+            "lyrics_ovh": self._fetch_from_lyrics_ovh,
+            "duckduckgo": self._fetch_from_duckduckgo,
+        }
+        self.source_stats: Dict[str, SourceStats] = {name: SourceStats(name) for name in self._sources}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared connection pool for all sources (created lazily inside the event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=BROWSER_HEADERS,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            )
+        return self._client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def close(self):
+        """Close the shared HTTP pool"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _get(self, url: str, source: str, headers: Optional[dict] = None) -> httpx.Response:
+        """
+        GET through the shared pool with the source's timeout.
+        Rate-limit statuses are retried with exponential backoff (asyncio.sleep, never blocking the loop).
         """
-        pass
+        client = self._get_client()
+        timeout = self.SOURCE_TIMEOUTS.get(source, 10.0)
+        delay = self.backoff_base
+
+        await self.rate_limiter.acquire(source)
+        response = await client.get(url, headers=headers, timeout=timeout)
+        for _ in range(self.max_retries):
+            if response.status_code not in self.RETRY_STATUSES:
+                break
+            print(f"⏱️ {source} returned {response.status_code}, retrying in {delay:g}s...")
+            await asyncio.sleep(delay)
+            delay *= 2
+            await self.rate_limiter.acquire(source)
+            response = await client.get(url, headers=headers, timeout=timeout)
+        return response
     
-    def _normalize_query(self, text: str) -> str:
+    @staticmethod
+    def _normalize_query(text: str) -> str:
         """
         Normalize track title or artist name for better search results
         
@@ -45,7 +251,7 @@ class LyricsService:
         result = re.sub(r'\s+', ' ', result).strip()
         return result
     
-    def _fetch_from_lyrics_ovh(self, title: str, artist: str) -> Optional[str]:
+    async def _fetch_from_lyrics_ovh(self, title: str, artist: str) -> Optional[str]:
         """
         Fetch lyrics from lyrics.ovh API
         
@@ -64,14 +270,12 @@ class LyricsService:
             normalized_title = self._normalize_query(title)
             
             # URL encode the parameters
-            import urllib.parse
             encoded_artist = urllib.parse.quote(normalized_artist)
             encoded_title = urllib.parse.quote(normalized_title)
             
             url = f"https://api.lyrics.ovh/v1/{encoded_artist}/{encoded_title}"
             
-            # Balanced timeout - 10 seconds
-            response = requests.get(url, timeout=10)
+            response = await self._get(url, "lyrics_ovh")
             
             if response.status_code == 200:
                 data = response.json()
@@ -84,17 +288,17 @@ class LyricsService:
             print(f"❌ No lyrics found on lyrics.ovh (status: {response.status_code})")
             return None
             
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             print(f"⏱️ lyrics.ovh timeout - server is slow or unavailable")
             return None
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             print(f"🔌 lyrics.ovh connection error - check internet connection")
             return None
         except Exception as e:
             print(f"Error fetching from lyrics.ovh: {e}")
             return None
     
-    def _fetch_from_duckduckgo(self, title: str, artist: str) -> Optional[str]:
+    async def _fetch_from_duckduckgo(self, title: str, artist: str) -> Optional[str]:
         """
         Search for lyrics using DuckDuckGo and parse from first result
         
@@ -116,176 +320,29 @@ class LyricsService:
             query = f"{normalized_artist} {normalized_title} lyrics"
             
             # Use DuckDuckGo HTML search
-            import urllib.parse
             encoded_query = urllib.parse.quote(query)
             search_url = f"https://html.duckduckgo.com/html/?q={encoded_query}"
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
-            
-            response = requests.get(search_url, headers=headers, timeout=5)
-            
-            # Handle 202 status (request accepted but processing)
-            if response.status_code == 202:
-                print("⏱️ DuckDuckGo returned 202, retrying after delay...")
-                import time
-                time.sleep(2)  # Wait 2 seconds
-                response = requests.get(search_url, headers=headers, timeout=5)
+            # 202 (rate limit) is retried with backoff inside _get
+            response = await self._get(search_url, "duckduckgo")
             
             if response.status_code != 200:
                 print(f"❌ DuckDuckGo search failed (status: {response.status_code})")
                 return None
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Find first result link
-            result_links = soup.find_all('a', class_='result__a')
-            
-            if not result_links:
-                print("❌ No search results found on DuckDuckGo")
-                return None
-            
-            # Filter out YouTube, Spotify, and other non-lyrics sites
-            # Look for actual lyrics sites (Genius, AZLyrics, etc.)
-            first_result_url = None
-            skip_domains = ['youtube.com', 'youtu.be', 'spotify.com', 'apple.com', 'deezer.com', 
-                          'soundcloud.com', 'amazon.com', 'tidal.com']
-            
-            for link in result_links[:5]:  # Check first 5 results
-                url = link.get('href')
-                if not url:
-                    continue
-                    
-                # Skip if it's a music/video platform (not lyrics site)
-                if any(domain in url.lower() for domain in skip_domains):
-                    print(f"⏭️ Skipping {url[:50]}... (music platform)")
-                    continue
-                    
-                first_result_url = url
-                break
-            
+            first_result_url = await asyncio.to_thread(self._pick_result_url, response.text)
             if not first_result_url:
-                print("❌ No suitable lyrics site found in search results")
                 return None
             
-            # Fix relative URLs from DuckDuckGo
-            if first_result_url.startswith('//'):
-                first_result_url = 'https:' + first_result_url
-            elif not first_result_url.startswith('http'):
-                first_result_url = 'https://' + first_result_url
-            
-            # Handle DuckDuckGo redirect URLs
-            if 'duckduckgo.com/l/' in first_result_url:
-                # Extract the actual URL from the redirect
-                import urllib.parse
-                parsed = urllib.parse.urlparse(first_result_url)
-                params = urllib.parse.parse_qs(parsed.query)
-                if 'uddg' in params:
-                    first_result_url = urllib.parse.unquote(params['uddg'][0])
-                    print(f"Resolved redirect to: {first_result_url[:100]}...")
-            
             print(f"Found result: {first_result_url[:100]}...")
             
             # Try to fetch and parse lyrics from the page
             try:
-                page_response = requests.get(first_result_url, headers=headers, timeout=15)
+                page_response = await self._get(first_result_url, "lyrics_page")
                 
                 if page_response.status_code == 200:
-                    page_soup = BeautifulSoup(page_response.text, 'html.parser')
-                    
-                    # Remove script and style elements
-                    for script in page_soup(["script", "style", "nav", "header", "footer", "aside", "form", "button"]):
-                        script.decompose()
-                    
-                    # For Genius - collect ALL lyrics containers (they split lyrics into multiple divs)
-                    genius_containers = page_soup.find_all('div', {'data-lyrics-container': 'true'})
-                    
-                    if genius_containers:
-                        # Combine all Genius lyrics containers
-                        all_lyrics_parts = []
-                        for container in genius_containers:
-                            text = container.get_text(separator='\n', strip=True)
-                            # Skip if it looks like a description (has quotes and "is" pattern)
-                            if '"' in text[:100] and ' is ' in text[:200]:
-                                continue
-                            all_lyrics_parts.append(text)
-                        
-                        if all_lyrics_parts:
-                            combined_text = '\n\n'.join(all_lyrics_parts)
-                            cleaned = self._clean_lyrics(combined_text)
-                            if cleaned and len(cleaned) > 100:
-                                print(f"✅ Found lyrics via DuckDuckGo/Genius ({len(cleaned)} chars)")
-                                return cleaned
-                    
-                    # Try other lyrics containers
-                    lyrics_containers = [
-                        # General lyrics patterns
-                        page_soup.find('div', class_=re.compile(r'lyrics', re.IGNORECASE)),
-                        page_soup.find('div', id=re.compile(r'lyrics', re.IGNORECASE)),
-                        # AZLyrics
-                        page_soup.find('div', class_=re.compile(r'ringtone', re.IGNORECASE)),
-                        # Musixmatch
-                        page_soup.find('div', class_=re.compile(r'mxm-lyrics', re.IGNORECASE)),
-                        page_soup.find('span', class_=re.compile(r'lyrics__content', re.IGNORECASE)),
-                        # MetroLyrics / SongLyrics
-                        page_soup.find('div', class_=re.compile(r'lyrics-body', re.IGNORECASE)),
-                        page_soup.find('div', class_=re.compile(r'lyric-body', re.IGNORECASE)),
-                        page_soup.find('p', class_=re.compile(r'verse', re.IGNORECASE)),
-                        # Some sites use <pre> for lyrics
-                        page_soup.find('pre'),
-                    ]
-                    
-                    # Try each container
-                    for container in lyrics_containers:
-                        if container:
-                            text = container.get_text(separator='\n', strip=True)
-                            if len(text) > 100:  # Reasonable lyrics length
-                                cleaned = self._clean_lyrics(text)
-                                if cleaned and len(cleaned) > 100:
-                                    print(f"✅ Found lyrics via DuckDuckGo ({len(cleaned)} chars)")
-                                    return cleaned
-                    
-                    # Fallback: try to find the largest text block on the page
-                    # This helps with sites that don't use standard selectors
-                    print("⚠️ No standard lyrics container found, trying fallback method...")
-                    all_divs = page_soup.find_all(['div', 'article', 'section'])
-                    
-                    best_candidate = None
-                    max_lyrics_score = 0
-                    
-                    for div in all_divs:
-                        text = div.get_text(separator='\n', strip=True)
-                        
-                        # Skip if too short
-                        if len(text) < 200:
-                            continue
-                        
-                        # Calculate "lyrics score" based on characteristics
-                        lines = [l.strip() for l in text.split('\n') if l.strip()]
-                        
-                        # Heuristics for lyrics:
-                        # 1. Has multiple short-medium lines (typical for song verses)
-                        short_lines = sum(1 for l in lines if 5 < len(l) < 100)
-                        # 2. Not too many long lines (likely article text)
-                        long_lines = sum(1 for l in lines if len(l) > 200)
-                        # 3. Has some empty lines (verse breaks)
-                        empty_ratio = text.count('\n\n') / max(len(text), 1)
-                        
-                        # Calculate score
-                        score = short_lines * 2 - long_lines * 3 + empty_ratio * 50
-                        
-                        if score > max_lyrics_score and long_lines < 5:
-                            max_lyrics_score = score
-                            best_candidate = text
-                    
-                    if best_candidate:
-                        cleaned = self._clean_lyrics(best_candidate)
-                        if cleaned and len(cleaned) > 100:
-                            print(f"✅ Found lyrics via fallback method ({len(cleaned)} chars)")
-                            return cleaned
-                    
-                    print("❌ Could not extract lyrics from page")
+                    # HTML parsing is CPU-bound, keep it off the event loop
+                    return await asyncio.to_thread(self._extract_lyrics_from_page, page_response.text)
             except Exception as e:
                 print(f"Error fetching result page: {e}")
             
@@ -295,51 +352,317 @@ class LyricsService:
             print(f"Error with DuckDuckGo search: {e}")
             return None
     
-    def get_lyrics(self, title: str, artist: str) -> Optional[str]:
+    def _pick_result_url(self, search_html: str) -> Optional[str]:
         """
-        Fetch lyrics for a song from multiple sources (lyrics.ovh -> DuckDuckGo)
+        Pick the first lyrics-site link from a DuckDuckGo results page
         
         Args:
-            title: Song title
-            artist: Artist name
+            search_html: DuckDuckGo HTML results page
             
         Returns:
-            Lyrics text or None if not found
+            Resolved result URL or None
         """
-        try:
-            print(f"Searching lyrics for: {artist} - {title}")
+        soup = BeautifulSoup(search_html, 'html.parser')
+        
+        # Find first result link
+        result_links = soup.find_all('a', class_='result__a')
+        
+        if not result_links:
+            print("❌ No search results found on DuckDuckGo")
+            return None
+        
+        # Filter out YouTube, Spotify, and other non-lyrics sites
+        # Look for actual lyrics sites (Genius, AZLyrics, etc.)
+        first_result_url = None
+        skip_domains = ['youtube.com', 'youtu.be', 'spotify.com', 'apple.com', 'deezer.com', 
+                      'soundcloud.com', 'amazon.com', 'tidal.com']
+        
+        for link in result_links[:5]:  # Check first 5 results
+            url = link.get('href')
+            if not url:
+                continue
+                
+            # Skip if it's a music/video platform (not lyrics site)
+            if any(domain in url.lower() for domain in skip_domains):
+                print(f"⏭️ Skipping {url[:50]}... (music platform)")
+                continue
+                
+            first_result_url = url
+            break
+        
+        if not first_result_url:
+            print("❌ No suitable lyrics site found in search results")
+            return None
+        
+        # Fix relative URLs from DuckDuckGo
+        if first_result_url.startswith('//'):
+            first_result_url = 'https:' + first_result_url
+        elif not first_result_url.startswith('http'):
+            first_result_url = 'https://' + first_result_url
+        
+        # Handle DuckDuckGo redirect URLs
+        if 'duckduckgo.com/l/' in first_result_url:
+            # Extract the actual URL from the redirect
+            parsed = urllib.parse.urlparse(first_result_url)
+            params = urllib.parse.parse_qs(parsed.query)
+            if 'uddg' in params:
+                first_result_url = urllib.parse.unquote(params['uddg'][0])
+                print(f"Resolved redirect to: {first_result_url[:100]}...")
+        
+        return first_result_url
+    
+    def _extract_lyrics_from_page(self, page_html: str) -> Optional[str]:
+        """
+        Extract lyrics from an arbitrary lyrics site page
+        
+        Args:
+            page_html: Page HTML
             
-            # Normalize inputs for better search
-            normalized_title = self._normalize_query(title)
-            normalized_artist = self._normalize_query(artist)
+        Returns:
+            Cleaned lyrics text or None
+        """
+        page_soup = BeautifulSoup(page_html, 'html.parser')
+        
+        # Remove script and style elements
+        for script in page_soup(["script", "style", "nav", "header", "footer", "aside", "form", "button"]):
+            script.decompose()
+        
+        # For Genius - collect ALL lyrics containers (they split lyrics into multiple divs)
+        genius_containers = page_soup.find_all('div', {'data-lyrics-container': 'true'})
+        
+        if genius_containers:
+            # Combine all Genius lyrics containers
+            all_lyrics_parts = []
+            for container in genius_containers:
+                text = container.get_text(separator='\n', strip=True)
+                # Skip if it looks like a description (has quotes and "is" pattern)
+                if '"' in text[:100] and ' is ' in text[:200]:
+                    continue
+                all_lyrics_parts.append(text)
+            
+            if all_lyrics_parts:
+                combined_text = '\n\n'.join(all_lyrics_parts)
+                cleaned = self._clean_lyrics(combined_text)
+                if cleaned and len(cleaned) > 100:
+                    print(f"✅ Found lyrics via DuckDuckGo/Genius ({len(cleaned)} chars)")
+                    return cleaned
+        
+        # Try other lyrics containers
+        lyrics_containers = [
+            # General lyrics patterns
+            page_soup.find('div', class_=re.compile(r'lyrics', re.IGNORECASE)),
+            page_soup.find('div', id=re.compile(r'lyrics', re.IGNORECASE)),
+            # AZLyrics
+            page_soup.find('div', class_=re.compile(r'ringtone', re.IGNORECASE)),
+            # Musixmatch
+            page_soup.find('div', class_=re.compile(r'mxm-lyrics', re.IGNORECASE)),
+            page_soup.find('span', class_=re.compile(r'lyrics__content', re.IGNORECASE)),
+            # MetroLyrics / SongLyrics
+            page_soup.find('div', class_=re.compile(r'lyrics-body', re.IGNORECASE)),
+            page_soup.find('div', class_=re.compile(r'lyric-body', re.IGNORECASE)),
+            page_soup.find('p', class_=re.compile(r'verse', re.IGNORECASE)),
+            # Some sites use <pre> for lyrics
+            page_soup.find('pre'),
+        ]
+        
+        # Try each container
+        for container in lyrics_containers:
+            if container:
+                text = container.get_text(separator='\n', strip=True)
+                if len(text) > 100:  # Reasonable lyrics length
+                    cleaned = self._clean_lyrics(text)
+                    if cleaned and len(cleaned) > 100:
+                        print(f"✅ Found lyrics via DuckDuckGo ({len(cleaned)} chars)")
+                        return cleaned
+        
+        # Fallback: try to find the largest text block on the page
+        # This helps with sites that don't use standard selectors
+        print("⚠️ No standard lyrics container found, trying fallback method...")
+        all_divs = page_soup.find_all(['div', 'article', 'section'])
+        
+        best_candidate = None
+        max_lyrics_score = 0
+        
+        for div in all_divs:
+            text = div.get_text(separator='\n', strip=True)
             
-            # 1. Try lyrics.ovh first (fast and reliable)
-            print("Trying primary source: lyrics.ovh")
-            lyrics = self._fetch_from_lyrics_ovh(title, artist)
+            # Skip if too short
+            if len(text) < 200:
+                continue
             
-            if lyrics:
-                return lyrics
+            # Calculate "lyrics score" based on characteristics
+            lines = [l.strip() for l in text.split('\n') if l.strip()]
             
-            # 2. Fallback to DuckDuckGo search
-            print("Trying fallback source: DuckDuckGo search")
-            lyrics = self._fetch_from_duckduckgo(title, artist)
+            # Heuristics for lyrics:
+            # 1. Has multiple short-medium lines (typical for song verses)
+            short_lines = sum(1 for l in lines if 5 < len(l) < 100)
+            # 2. Not too many long lines (likely article text)
+            long_lines = sum(1 for l in lines if len(l) > 200)
+            # 3. Has some empty lines (verse breaks)
+            empty_ratio = text.count('\n\n') / max(len(text), 1)
             
-            if lyrics:
-                return lyrics
+            # Calculate score
+            score = short_lines * 2 - long_lines * 3 + empty_ratio * 50
             
-            print("❌ All sources exhausted, no lyrics found")
+            if score > max_lyrics_score and long_lines < 5:
+                max_lyrics_score = score
+                best_candidate = text
+        
+        if best_candidate:
+            cleaned = self._clean_lyrics(best_candidate)
+            if cleaned and len(cleaned) > 100:
+                print(f"✅ Found lyrics via fallback method ({len(cleaned)} chars)")
+                return cleaned
+        
+        print("❌ Could not extract lyrics from page")
+        return None
+    
+    def _source_order(self) -> List[str]:
+        """Sources sorted by observed success rate per second of latency"""
+        return sorted(self._sources, key=lambda name: self.source_stats[name].priority, reverse=True)
+
+    def _validate_lyrics(self, lyrics: Optional[str]) -> Optional[str]:
+        """Clean a source result and return it only if it still looks like lyrics"""
+        if not lyrics:
             return None
-            
+        cleaned = self._clean_lyrics(lyrics)
+        if len(cleaned) < self.MIN_LYRICS_LENGTH:
+            return None
+        return cleaned
+
+    async def _run_source(self, name: str, title: str, artist: str) -> Optional[str]:
+        """Run one source, validate its result and record its statistics"""
+        stats = self.source_stats[name]
+        started = time.monotonic()
+        try:
+            lyrics = self._validate_lyrics(await self._sources[name](title, artist))
+        except asyncio.CancelledError:
+            # Lost the race or ran out of time: the caller records which one
+            raise
         except Exception as e:
-            print(f"Error fetching lyrics: {e}")
-            # Try DuckDuckGo as last resort
+            print(f"Error in lyrics source {name}: {e}")
+            stats.record(time.monotonic() - started, success=False, error=True)
+            return None
+        stats.record(time.monotonic() - started, success=lyrics is not None)
+        return lyrics
+
+    async def _race_sources(self, title: str, artist: str) -> Optional[str]:
+        """Start every source at once; the first valid result wins and the rest are cancelled"""
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+        task_sources = {
+            asyncio.create_task(self._run_source(name, title, artist), name=f"lyrics:{name}"): name
+            for name in self._source_order()
+        }
+        pending = set(task_sources)
+        pending_timed_out = False
+        try:
+            while pending:
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    print(f"⏱️ Lyrics deadline ({self.deadline:g}s) reached")
+                    for task in pending:
+                        self.source_stats[task_sources[task]].record(self.deadline, success=False, timeout=True)
+                    pending_timed_out = True
+                    return None
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    lyrics = task.result()
+                    if lyrics:
+                        print(f"🏁 {task.get_name()} won the race ({len(lyrics)} chars)")
+                        return lyrics
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+                if not pending_timed_out:
+                    self.source_stats[task_sources[task]].cancelled += 1
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _try_sources_in_order(self, title: str, artist: str) -> Optional[str]:
+        """Try sources one by one (best first) within the global deadline"""
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+        for name in self._source_order():
+            remaining = deadline_at - loop.time()
+            if remaining <= 0:
+                print(f"⏱️ Lyrics deadline ({self.deadline:g}s) reached")
+                return None
+            print(f"Trying source: {name}")
             try:
-                return self._fetch_from_duckduckgo(title, artist)
-            except:
+                lyrics = await asyncio.wait_for(self._run_source(name, title, artist), timeout=remaining)
+            except asyncio.TimeoutError:
+                print(f"⏱️ Lyrics deadline ({self.deadline:g}s) reached")
+                self.source_stats[name].record(remaining, success=False, timeout=True)
                 return None
+            if lyrics:
+                return lyrics
+        return None
+
+    async def get_lyrics(
+        self,
+        title: str,
+        artist: str,
+        race: Optional[bool] = None,
+        background: bool = False,
+    ) -> Optional[str]:
+        """
+        Fetch lyrics for a song from multiple sources (lyrics.ovh, DuckDuckGo)
+        
+        Args:
+            title: Song title
+            artist: Artist name
+            race: Override racing mode for this call
+            background: Low-priority lookup (prefetch); waits until no
+                        interactive lookup is running before starting
+            
+        Returns:
+            Lyrics text or None if not found
+        """
+        use_race = self.race if race is None else race
+        if background:
+            await self._wait_for_interactive()
+        else:
+            self._interactive_inflight += 1
+        try:
+            async with self._get_semaphore():
+                try:
+                    print(f"Searching lyrics for: {artist} - {title}")
+                    
+                    if use_race:
+                        lyrics = await self._race_sources(title, artist)
+                    else:
+                        lyrics = await self._try_sources_in_order(title, artist)
+                    
+                    if lyrics:
+                        return lyrics
+                    
+                    print("❌ All sources exhausted, no lyrics found")
+                    return None
+                    
+                except Exception as e:
+                    print(f"Error fetching lyrics: {e}")
+                    return None
+        finally:
+            if not background:
+                self._interactive_inflight -= 1
+
+    async def _wait_for_interactive(self, poll_interval: float = 0.2):
+        while self._interactive_inflight > 0:
+            await asyncio.sleep(poll_interval)
+
+    def get_source_stats(self) -> Dict:
+        return {
+            "race": self.race,
+            "deadline_seconds": self.deadline,
+            "interactive_inflight": self._interactive_inflight,
+            "order": self._source_order(),
+            "sources": {name: stats.to_dict() for name, stats in self.source_stats.items()},
+        }
 
     
-    def _scrape_lyrics(self, url: str) -> Optional[str]:
+    async def _scrape_lyrics(self, url: str) -> Optional[str]:
         """
         Scrape lyrics from Genius song page
         
@@ -350,145 +673,106 @@ class LyricsService:
             Lyrics text or None
         """
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
+            response = await self._get(url, "genius")
             
             if response.status_code != 200:
                 return None
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Find lyrics container (Genius uses different div classes)
-            lyrics_divs = soup.find_all('div', {'data-lyrics-container': 'true'})
-            
-            if not lyrics_divs:
-                # Try alternative selectors
-                lyrics_divs = soup.find_all('div', class_=re.compile(r'Lyrics__Container'))
-            
-            if not lyrics_divs:
-                return None
-            
-            # Extract text from all lyrics divs
-            lyrics_parts = []
-            for div in lyrics_divs:
-                # Get text and preserve line breaks
-                text = div.get_text(separator='\n', strip=True)
-                lyrics_parts.append(text)
-            
-            lyrics = '\n\n'.join(lyrics_parts)
-            
-            # Clean up
-            lyrics = self._clean_lyrics(lyrics)
-            
-            return lyrics if lyrics else None
+            return await asyncio.to_thread(self._parse_genius_page, response.text)
             
         except Exception as e:
             print(f"Error scraping lyrics: {e}")
             return None
     
+    def _parse_genius_page(self, page_html: str) -> Optional[str]:
+        soup = BeautifulSoup(page_html, 'html.parser')
+        
+        # Find lyrics container (Genius uses different div classes)
+        lyrics_divs = soup.find_all('div', {'data-lyrics-container': 'true'})
+        
+        if not lyrics_divs:
+            # Try alternative selectors
+            lyrics_divs = soup.find_all('div', class_=re.compile(r'Lyrics__Container'))
+        
+        if not lyrics_divs:
+            return None
+        
+        # Extract text from all lyrics divs
+        lyrics_parts = []
+        for div in lyrics_divs:
+            # Get text and preserve line breaks
+            text = div.get_text(separator='\n', strip=True)
+            lyrics_parts.append(text)
+        
+        lyrics = '\n\n'.join(lyrics_parts)
+        
+        # Clean up
+        lyrics = self._clean_lyrics(lyrics)
+        
+        return lyrics if lyrics else None
+    
     def _clean_lyrics(self, lyrics: str) -> str:
         """
         Clean up lyrics text by removing unnecessary elements
         
+        Single pass over the lines with precompiled patterns; the playlist
+        heuristics are counted during the same pass.
+        
         Args:
             lyrics: Raw lyrics text
             
         Returns:
             Cleaned lyrics text
         """
-        # First check: if lyrics look like a playlist (many lines with " - " separator)
-        lines_with_dash = sum(1 for line in lyrics.split('\n') if ' - ' in line and len(line) < 100)
-        total_lines = len([l for l in lyrics.split('\n') if l.strip()])
-        
-        # If more than 30% of lines have " - " pattern, it's likely a playlist
-        if total_lines > 20 and lines_with_dash / max(total_lines, 1) > 0.3:
-            print("Detected playlist format, rejecting lyrics")
-            return ""
-        
-        # Check for common playlist indicators
-        playlist_keywords = ['playlist', 'tracklist', 'feel free to comment', 'must play', 'explicit']
-        keyword_count = sum(1 for keyword in playlist_keywords if keyword.lower() in lyrics.lower())
+        # Check for common playlist indicators (one lowercase pass for all keywords)
+        lowered = lyrics.lower()
+        keyword_count = sum(1 for keyword in _PLAYLIST_KEYWORDS if keyword in lowered)
         if keyword_count >= 2:
             print("Detected playlist keywords, rejecting lyrics")
             return ""
         
-        lines = lyrics.split('\n')
         cleaned_lines = []
+        lines_with_dash = 0
+        total_lines = 0
         
-        for line in lines:
-            line = line.strip()
+        for raw_line in lyrics.split('\n'):
+            # Playlist heuristics: "Artist - Title" lines among all non-empty lines
+            if ' - ' in raw_line and len(raw_line) < 100:
+                lines_with_dash += 1
+            
+            line = raw_line.strip()
             
-            # Skip empty lines (will be handled by join later)
+            # Keep empty lines (collapsed after the join)
             if not line:
                 cleaned_lines.append("")
                 continue
+            total_lines += 1
             
-            # Filter out Genius metadata
-            if re.match(r'^\d+\s*Contributors', line, re.IGNORECASE):
+            # Language headers and other garbage
+            if line in _GARBAGE_LINES:
                 continue
-            if re.match(r'^Translations', line, re.IGNORECASE):
+            # Descriptions cut with an ellipsis
+            if line.endswith('…') or (len(line) > 100 and '…' in line):
                 continue
-            
-            # Filter out "Read More"
-            if re.match(r'^Read More$', line, re.IGNORECASE):
+            # Bracketed annotations: [Verse 1], [Chorus], [Couplet 1 : Tito Prince]
+            if len(line) > 2 and line[0] == '[' and line[-1] == ']':
                 continue
-            
-            # Filter out track descriptions (multiple patterns)
-            # Pattern 1: Starts with quote, contains "is the", "is a", "is about"
-            if re.match(r'^[\""].*?[\""]?\s+is\s+(the|a|about)', line, re.IGNORECASE):
+            # Genius descriptions: ""Blinding Lights" serves as the second single..."
+            if line[0] == '"' and ('serves as' in line or 'is the' in line or 'is about' in line):
                 continue
-            # Pattern 2: Contains "…" (ellipsis) - often part of descriptions
-            if '…' in line and len(line) > 100:
+            # Genius metadata, "Song Title Lyrics" header, descriptions, "Embed"
+            if _DROP_LINE_RE.match(line):
                 continue
-            # Pattern 3: Ends with ellipsis
-            if line.endswith('…'):
-                continue
-                
-            # Common languages headers and garbage
-            garbage_lines = [
-                'English', 'Russian', 'Español', 'Deutsch', 'Français', 'Italiano', 'Português',
-                'Slovenčina', 'Ελληνικά', 'فارسی', 'Magyar', 'Türkçe', 'Русский (Russian)', 
-                'Română', 'Polski', 'Українська', '日本語', '한국어',
-                'العربية', 'Svenska', 'azərbaycan', 'עברית', 'हिन्दी', 'srpski',
-                'Česky', 'Македонски', 'עברית (Hebrew)', 'ไทย (Thai)', 'Tiếng Việt', '中文',
-                'Norsk', 'Nederlands', 'Dansk', 'Shqip', 'Suomi', 'Català'
-            ]
-            if line in garbage_lines:
+            # Language labels (e.g., "ไทย (Thai)")
+            if _LANGUAGE_LABEL_RE.match(line):
                 continue
             
-            # Filter out language labels (e.g., "ไทย (Thai)")
-            if re.match(r'^[\u0E00-\u0E7F]+\s+\([^)]+\)$', line):  # Thai with (Language)
-                continue
-            if re.match(r'^[^\x00-\x7F]+\s+\([^)]+\)$', line):  # Any non-ASCII with (Language)
-                continue
-            
-            # Filter out lines that look like track descriptions from Genius
-            # Example: ""Blinding Lights" serves as the second single..."
-            if line.startswith('"') and ('serves as' in line or 'is the' in line or 'is about' in line):
-                continue
-
-            # Filter out bracketed annotations (improved pattern)
-            # Matches: [Verse 1], [Chorus], [Pont : version 1], [Couplet 1 : Tito Prince], etc.
-            if re.match(r'^\[.+\]$', line):
-                continue
-                
-            # "Song Title Lyrics" header
-            if re.match(r'^.*? Lyrics$', line, re.IGNORECASE):
-                continue
-            # "Embed" at the end
-            if re.match(r'^Embed$', line, re.IGNORECASE):
-                continue
-                
             cleaned_lines.append(line)
         
-        # Rejoin lines
-        lyrics = '\n'.join(cleaned_lines)
-        
-        # Remove extra whitespace (more than 2 newlines)
-        lyrics = re.sub(r'\n{3,}', '\n\n', lyrics)
+        # If more than 30% of lines have " - " pattern, it's likely a playlist
+        if total_lines > 20 and lines_with_dash / total_lines > 0.3:
+            print("Detected playlist format, rejecting lyrics")
+            return ""
         
-        return lyrics.strip()
-
+        # Rejoin lines and remove extra whitespace (more than 2 newlines)
+        return _EXTRA_NEWLINES_RE.sub('\n\n', '\n'.join(cleaned_lines)).strip()
@@ -12,7 +12,8 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import uvicorn
 import random
-from sqlalchemy import func
+import asyncio
+from sqlalchemy import func, case, or_
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
@@ -21,9 +22,27 @@ import json
 
 try:
     from backend.hitmo_parser_light import HitmoParser
-    from backend.database import User, DownloadedMessage, Lyrics, Payment, Referral, PromoCode, get_db, init_db, SessionLocal
+    from backend.database import User, DownloadedMessage, Payment, Referral, PromoCode, get_db, init_db, SessionLocal, run_db
     from backend.cache import make_cache_key, get_from_cache, set_to_cache, get_cache_stats, reset_cache
     from backend.lyrics_service import LyricsService
+    from backend.lyrics_cache import make_lyrics_key, lookup_lyrics, store_lyrics, store_miss, is_miss, is_expired, fresh_keys, get_lyrics_cache_stats
+    from backend.lyrics_prefetch import LyricsPrefetcher
+    from backend.lyrics_search import search_lyrics
+    from backend.periodic import PeriodicJob
+    from backend.recommendations.cooccurrence import (
+        BUILD_INTERVAL as COOCCURRENCE_INTERVAL,
+        RELOAD_CHECK_SECONDS as COOCCURRENCE_RELOAD_INTERVAL,
+        cooccurrence_index,
+        run_build as run_cooccurrence_build,
+    )
+    from backend.recommendations.cursors import cursor_store
+    from backend.recommendations.pools import candidate_pools
+    from backend.recommendations.retention import EVENT_RETENTION_INTERVAL, run_retention
+    from backend.rollups import ROLLUP_INTERVAL, get_daily_stats, run_compaction as run_rollup_compaction
+    from backend.pagination import PAGE_SIZE_MAX, InvalidCursor, decode_cursor, keyset_before, list_total, stream_page
+    from backend.referrals import get_referral_summary, get_referral_page, invalidate_referrer
+    from backend.user_cache import get_user_snapshot, cache_user, user_cache
+    from backend.download_workspace import workspace_manager, find_ffmpeg, DownloadTooLarge, WorkspaceQuotaExceeded
     from backend.payments import (
         grant_premium_after_payment,
         get_stars_product,
@@ -36,11 +55,30 @@ try:
     )
     from backend.recommendations.models import UserTrackEvent
     from backend.recommendations.routes import router as recommendations_router, set_parser as set_rec_parser
+    from backend.recommendations.event_buffer import event_buffer
 except ImportError:
     from hitmo_parser_light import HitmoParser
-    from database import User, DownloadedMessage, Lyrics, Payment, Referral, PromoCode, get_db, init_db, SessionLocal
+    from database import User, DownloadedMessage, Payment, Referral, PromoCode, get_db, init_db, SessionLocal, run_db
     from cache import make_cache_key, get_from_cache, set_to_cache, get_cache_stats, reset_cache
     from lyrics_service import LyricsService
+    from lyrics_cache import make_lyrics_key, lookup_lyrics, store_lyrics, store_miss, is_miss, is_expired, fresh_keys, get_lyrics_cache_stats
+    from lyrics_prefetch import LyricsPrefetcher
+    from lyrics_search import search_lyrics
+    from periodic import PeriodicJob
+    from recommendations.cooccurrence import (
+        BUILD_INTERVAL as COOCCURRENCE_INTERVAL,
+        RELOAD_CHECK_SECONDS as COOCCURRENCE_RELOAD_INTERVAL,
+        cooccurrence_index,
+        run_build as run_cooccurrence_build,
+    )
+    from recommendations.cursors import cursor_store
+    from recommendations.pools import candidate_pools
+    from recommendations.retention import EVENT_RETENTION_INTERVAL, run_retention
+    from rollups import ROLLUP_INTERVAL, get_daily_stats, run_compaction as run_rollup_compaction
+    from pagination import PAGE_SIZE_MAX, InvalidCursor, decode_cursor, keyset_before, list_total, stream_page
+    from referrals import get_referral_summary, get_referral_page, invalidate_referrer
+    from user_cache import get_user_snapshot, cache_user, user_cache
+    from download_workspace import workspace_manager, find_ffmpeg, DownloadTooLarge, WorkspaceQuotaExceeded
     from payments import (
         grant_premium_after_payment,
         get_stars_product,
@@ -53,6 +91,7 @@ except ImportError:
     )
     from recommendations.models import UserTrackEvent
     from recommendations.routes import router as recommendations_router, set_parser as set_rec_parser
+    from recommendations.event_buffer import event_buffer
 
 import os
 from dotenv import load_dotenv
@@ -121,7 +160,9 @@ class DownloadToChatRequest(BaseModel):
 
 class TransactionListResponse(BaseModel):
     transactions: List[Transaction]
+    next_cursor: Optional[str] = None
     total: int
+    total_exact: bool = True
 
 class PromoCodeCreate(BaseModel):
     code: str
@@ -155,6 +196,15 @@ class ActivityStat(BaseModel):
     date: str
     count: int
 
+class DailyStatItem(BaseModel):
+    date: str
+    new_users: int
+    active_users: int
+    plays: int
+    completes: int
+    downloads: int
+    revenue: Dict[str, float]
+
 class TopUser(BaseModel):
     id: int
     username: Optional[str]
@@ -200,6 +250,9 @@ class UserListItem(BaseModel):
 
 class UserListResponse(BaseModel):
     users: List[UserListItem]
+    next_cursor: Optional[str] = None
+    total: int = 0
+    total_exact: bool = True
 
 
 class StarsProductResponse(BaseModel):
@@ -260,9 +313,25 @@ parser = HitmoParser()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    workspace_manager.sweep_orphans()
     set_rec_parser(parser)
+    rollup_compactor.start()
+    event_retention.start()
+    cooccurrence_reloader.start()
+    cooccurrence_builder.start()
+    event_buffer.start()
     yield
+    await event_buffer.close()
+    await candidate_pools.close()
+    await cooccurrence_builder.close()
+    await cooccurrence_reloader.close()
+    await event_retention.close()
+    await rollup_compactor.close()
     parser.close()
+    if lyrics_prefetcher:
+        await lyrics_prefetcher.close()
+    if lyrics_service:
+        await lyrics_service.close()
 
 # Инициализация FastAPI
 app = FastAPI(
@@ -328,6 +397,17 @@ try:
 except Exception as e:
     print(f"❌ Failed to initialize lyrics service: {e}")
 
+lyrics_prefetcher = LyricsPrefetcher(lyrics_service) if lyrics_service else None
+
+# Пересчёт дневных агрегатов для админки (daily_stats / daily_revenue)
+rollup_compactor = PeriodicJob("rollups", run_rollup_compaction, ROLLUP_INTERVAL)
+# Старые user_track_events -> user_artist_stats (retention)
+event_retention = PeriodicJob("event_retention", run_retention, EVENT_RETENTION_INTERVAL)
+# Индекс совместных прослушиваний для рекомендаций (обычно строится scripts/build_cooccurrence.py)
+cooccurrence_builder = PeriodicJob("cooccurrence", run_cooccurrence_build, COOCCURRENCE_INTERVAL)
+# Загрузка индекса (и новых сборок) в отдельном потоке, не в event loop; первый запуск сразу при старте
+cooccurrence_reloader = PeriodicJob("cooccurrence_reload", cooccurrence_index.reload_if_changed, COOCCURRENCE_RELOAD_INTERVAL)
+
 @app.get("/")
 async def root():
     """Корневой endpoint"""
@@ -380,29 +460,31 @@ def can_forward_from_chat(user: User) -> bool:
     """
     return not user.is_blocked
 
-async def notify_referrer_about_signup(referrer: User, referred_user: User):
+async def notify_referrer_about_signup(referrer_id: int, referred_id: int, referred_name: Optional[str]):
+    # Принимает простые значения: запускается фоновой задачей после закрытия сессии БД
     if not BOT_TOKEN:
-        print(f"ℹ️ Referral signup notification skipped: BOT_TOKEN is not set for referrer={referrer.id}, referred={referred_user.id}")
+        print(f"ℹ️ Referral signup notification skipped: BOT_TOKEN is not set for referrer={referrer_id}, referred={referred_id}")
         return
 
     try:
         telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-        username = referred_user.username or referred_user.first_name or "пользователь"
+        username = referred_name or "пользователь"
         message_text = f"👥 Новый реферал!\n\n✅ @{username} присоединился по вашей ссылке\n🎁 Если он впервые купит подписку, вы получите Premium на такой же срок."
 
         async with httpx.AsyncClient() as client:
             response = await client.post(telegram_url, json={
-                'chat_id': referrer.id,
+                'chat_id': referrer_id,
                 'text': message_text
             })
             if response.status_code >= 400:
-                print(f"❌ Failed to send referral notification: status={response.status_code}, body={response.text}, referrer={referrer.id}, referred={referred_user.id}")
+                print(f"❌ Failed to send referral notification: status={response.status_code}, body={response.text}, referrer={referrer_id}, referred={referred_id}")
             else:
-                print(f"✅ Referral signup notification sent to referrer={referrer.id} for referred={referred_user.id}")
+                print(f"✅ Referral signup notification sent to referrer={referrer_id} for referred={referred_id}")
     except Exception as e:
         print(f"❌ Failed to send referral notification: {e}")
 
-async def register_referral_relationship(db: Session, user: User, referrer: User) -> bool:
+def register_referral_relationship(db: Session, user: User, referrer: User, background_tasks: BackgroundTasks) -> bool:
+    """Сохраняет связь реферер -> приглашённый; уведомление рефереру уходит фоновой задачей после ответа"""
     if referrer.id == user.id:
         print(f"ℹ️ Referral skipped: self-referral attempt user={user.id}")
         return False
@@ -427,20 +509,26 @@ async def register_referral_relationship(db: Session, user: User, referrer: User
     )
     db.add(referral)
     db.commit()
+    invalidate_referrer(referrer.id)
     print(f"✅ Referral relationship stored: referrer={referrer.id}, referred={user.id}")
 
-    await notify_referrer_about_signup(referrer, user)
+    background_tasks.add_task(
+        notify_referrer_about_signup,
+        referrer.id,
+        user.id,
+        user.username or user.first_name,
+    )
     return True
 
 # --- User & Admin Endpoints ---
 
 @app.post("/api/user/auth")
-async def auth_user(user_data: UserAuth, db: Session = Depends(get_db)):
+def auth_user(user_data: UserAuth, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Регистрация или обновление данных пользователя"""
-    from datetime import timedelta
     print(f"ℹ️ auth_user called for user_id={user_data.id}, referrer_id={user_data.referrer_id}")
     
-    user = db.query(User).filter(User.id == user_data.id).first()
+    # Обычный вход: снимок из кэша, без запросов к БД
+    user = get_user_snapshot(db, user_data.id)
     is_new_user = False
     
     if not user:
@@ -449,7 +537,7 @@ async def auth_user(user_data: UserAuth, db: Session = Depends(get_db)):
         now = datetime.utcnow()
         trial_expires = now + timedelta(days=7)
         
-        user = User(
+        new_user = User(
             id=user_data.id,
             username=user_data.username,
             first_name=user_data.first_name,
@@ -457,31 +545,35 @@ async def auth_user(user_data: UserAuth, db: Session = Depends(get_db)):
             trial_started_at=now,
             trial_expires_at=trial_expires
         )
-        db.add(user)
+        db.add(new_user)
         db.commit()
-        print(f"✅ New user created user_id={user.id}")
+        print(f"✅ New user created user_id={new_user.id}")
         
         # РЕФЕРАЛЬНАЯ СИСТЕМА: Обработка реферальной ссылки
         if hasattr(user_data, 'referrer_id') and user_data.referrer_id:
             try:
                 referrer = db.query(User).filter(User.id == user_data.referrer_id).first()
                 if referrer:
-                    created = await register_referral_relationship(db, user, referrer)
+                    created = register_referral_relationship(db, new_user, referrer, background_tasks)
                     if created:
-                        print(f"✅ Referral created: {referrer.id} invited {user.id}")
+                        print(f"✅ Referral created: {referrer.id} invited {new_user.id}")
                 else:
-                    print(f"ℹ️ Referrer not found for referrer_id={user_data.referrer_id}, user_id={user.id}")
+                    print(f"ℹ️ Referrer not found for referrer_id={user_data.referrer_id}, user_id={new_user.id}")
             except Exception as e:
                 print(f"❌ Error processing referral: {e}")
+        
+        user = cache_user(new_user)
     
     # Обновляем данные если изменились
     if user.username != user_data.username or \
        user.first_name != user_data.first_name or \
        user.last_name != user_data.last_name:
-        user.username = user_data.username
-        user.first_name = user_data.first_name
-        user.last_name = user_data.last_name
+        db_user = db.query(User).filter(User.id == user_data.id).first()
+        db_user.username = user_data.username
+        db_user.first_name = user_data.first_name
+        db_user.last_name = user_data.last_name
         db.commit()
+        user = cache_user(db_user)
     
     # Проверяем доступ
     has_access_result, reason, details = has_access(user)
@@ -508,9 +600,9 @@ async def auth_user(user_data: UserAuth, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/user/subscription-status")
-async def get_subscription_status(user_id: int = Query(...), db: Session = Depends(get_db)):
+def get_subscription_status(user_id: int = Query(...), db: Session = Depends(get_db)):
     """Получение детальной информации о статусе подписки"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_snapshot(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -526,26 +618,31 @@ async def get_subscription_status(user_id: int = Query(...), db: Session = Depen
     }
 
 @app.get("/api/admin/stats", response_model=UserStats)
-async def get_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
+def get_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
     """Получение статистики (только для админов)"""
-    from database import Payment
-    
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_snapshot(db, user_id)
     if not user or not user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    total = db.query(User).count()
-    premium = db.query(User).filter(User.is_premium == True).count()
-    admins = db.query(User).filter(User.is_admin == True).count()
-    
     today = datetime.utcnow().date()
-    new_today = db.query(User).filter(User.joined_at >= today).count()
+    # Один проход по users вместо четырёх COUNT
+    total, premium, admins, new_today = db.query(
+        func.count(User.id),
+        func.coalesce(func.sum(case((User.is_premium == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((User.is_admin == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((User.joined_at >= today, 1), else_=0)), 0),
+    ).one()
     
-    # Считаем выручку
-    payments = db.query(Payment).filter(Payment.status == 'completed').all()
-    ton_revenue = sum(float(p.amount) for p in payments if p.currency == 'TON')
-    stars_revenue = sum(float(p.amount) for p in payments if p.currency == 'XTR')
-    rub_revenue = sum(float(p.amount) for p in payments if p.currency == 'RUB')
+    # Выручка считается в базе: покрывающий индекс (status, currency, amount_value)
+    revenue = dict(
+        db.query(Payment.currency, func.sum(Payment.amount_value))
+        .filter(Payment.status == 'completed')
+        .group_by(Payment.currency)
+        .all()
+    )
+    ton_revenue = float(revenue.get('TON') or 0)
+    stars_revenue = int(revenue.get('XTR') or 0)
+    rub_revenue = float(revenue.get('RUB') or 0)
     
     return UserStats(
         total_users=total,
@@ -557,66 +654,107 @@ async def get_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
         total_revenue_rub=rub_revenue
     )
 
-@app.get("/api/admin/transactions", response_model=TransactionListResponse)
-async def get_transactions(
+def _page_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/api/admin/transactions", response_model=None, responses={200: {"model": TransactionListResponse}})
+def get_transactions(
     user_id: int = Query(...), 
     limit: int = 20, 
-    offset: int = 0, 
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    currency: Optional[str] = None,
+    payer_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Получение истории транзакций"""
-    user = db.query(User).filter(User.id == user_id).first()
+    """
+    История транзакций, новые сначала. Постранично по курсору (created_at, id):
+    следующая страница запрашивается с cursor=next_cursor из ответа.
+    """
+    user = get_user_snapshot(db, user_id)
     if not user or not user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
-        
-    total = db.query(Payment).count()
-    payments = db.query(Payment).order_by(Payment.created_at.desc()).offset(offset).limit(limit).all()
-    
-    return TransactionListResponse(
-        transactions=[Transaction(
-            id=p.id,
-            user_id=p.user_id,
-            amount=p.amount,
-            currency=p.currency,
-            plan=p.plan,
-            status=p.status,
-            created_at=p.created_at
-        ) for p in payments],
-        total=total
+
+    limit = max(1, min(limit, PAGE_SIZE_MAX))
+    after = _page_cursor(cursor)
+
+    filters = []
+    if status:
+        filters.append(Payment.status == status)
+    if currency:
+        filters.append(Payment.currency == currency)
+    if payer_id is not None:
+        filters.append(Payment.user_id == payer_id)
+
+    total, exact = list_total(
+        db, "payments", f"payments:{status}:{currency}:{payer_id}",
+        lambda: db.query(func.count(Payment.id)).filter(*filters).scalar(),
+        filtered=bool(filters),
+    )
+
+    def rows():
+        # Своя сессия: ответ стримится уже после выхода из эндпоинта
+        session = SessionLocal()
+        try:
+            query = session.query(Payment).filter(*filters)
+            if after:
+                query = query.filter(keyset_before(Payment.created_at, Payment.id, after))
+            query = query.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(limit + 1)
+            for p in query.yield_per(100):
+                yield Transaction(
+                    id=p.id,
+                    user_id=p.user_id,
+                    amount=p.amount,
+                    currency=p.currency,
+                    plan=p.plan,
+                    status=p.status,
+                    created_at=p.created_at
+                ).model_dump_json(), (p.created_at, p.id)
+        finally:
+            session.close()
+
+    return StreamingResponse(
+        stream_page("transactions", rows(), limit, {"total": total, "total_exact": exact}),
+        media_type="application/json",
     )
 
 # --- Admin Phase 2 Endpoints ---
 
 @app.post("/api/admin/broadcast")
-async def broadcast_message(
+def broadcast_message(
     request: BroadcastRequest,
+    background_tasks: BackgroundTasks,
     user_id: int = Query(...),
     db: Session = Depends(get_db)
 ):
     """Рассылка сообщения всем пользователям"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_snapshot(db, user_id)
     if not user or not user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
         
     if not BOT_TOKEN:
         raise HTTPException(status_code=500, detail="BOT_TOKEN not configured")
         
-    users = db.query(User).filter(User.is_blocked == False).all()
-    count = 0
+    recipient_ids = [row.id for row in db.query(User.id).filter(User.is_blocked == False).all()]
     
     telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
     
     # В реальном проекте это нужно делать через очередь задач (Celery/Redis)
     # Здесь делаем просто в цикле с задержкой, чтобы не заблокировать event loop надолго
-    # используем asyncio.create_task для фона
+    # рассылка идёт фоновой задачей после ответа
     
     async def send_broadcast():
         sent = 0
         async with httpx.AsyncClient() as client:
-            for u in users:
+            for recipient_id in recipient_ids:
                 try:
                     await client.post(telegram_url, json={
-                        'chat_id': u.id,
+                        'chat_id': recipient_id,
                         'text': request.message,
                         'parse_mode': 'HTML'
                     })
@@ -624,21 +762,21 @@ async def broadcast_message(
                     # Rate limit protection
                     await asyncio.sleep(0.05) 
                 except Exception as e:
-                    print(f"Failed to send to {u.id}: {e}")
+                    print(f"Failed to send to {recipient_id}: {e}")
         print(f"📢 Broadcast completed. Sent to {sent} users.")
 
-    asyncio.create_task(send_broadcast())
+    background_tasks.add_task(send_broadcast)
     
-    return {"status": "ok", "message": f"Рассылка запущена для {len(users)} пользователей"}
+    return {"status": "ok", "message": f"Рассылка запущена для {len(recipient_ids)} пользователей"}
 
 @app.get("/api/admin/top-users", response_model=List[TopUser])
-async def get_top_users(
+def get_top_users(
     user_id: int = Query(...),
     limit: int = 10,
     db: Session = Depends(get_db)
 ):
     """Топ пользователей по скачиваниям"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_snapshot(db, user_id)
     if not user or not user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
         
@@ -654,37 +792,37 @@ async def get_top_users(
     ) for u in users]
 
 @app.get("/api/admin/activity-stats", response_model=List[ActivityStat])
-async def get_activity_stats(
+def get_activity_stats(
     user_id: int = Query(...),
     days: int = 7,
     db: Session = Depends(get_db)
 ):
     """Статистика новых пользователей по дням"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_snapshot(db, user_id)
     if not user or not user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
 
     days = max(1, min(days, 30))
-    end_date = datetime.utcnow().date()
-    start_date = end_date - timedelta(days=days - 1)
-
-    stats = db.query(
-        func.date(User.joined_at).label('date'),
-        func.count(User.id).label('count')
-    ).filter(
-        User.joined_at >= datetime.combine(start_date, datetime.min.time())
-    ).group_by('date').order_by('date').all()
-
-    counts_by_date = {str(s.date): s.count for s in stats}
-
+    # Читаем готовые дневные агрегаты вместо GROUP BY по users
     return [
-        ActivityStat(
-            date=current_date.isoformat(),
-            count=counts_by_date.get(current_date.isoformat(), 0)
-        )
-        for current_date in [start_date + timedelta(days=offset) for offset in range(days)]
+        ActivityStat(date=row["date"], count=row["new_users"])
+        for row in get_daily_stats(db, days)
     ]
 
+@app.get("/api/admin/daily-stats", response_model=List[DailyStatItem])
+def get_daily_stats_endpoint(
+    user_id: int = Query(...),
+    days: int = 30,
+    db: Session = Depends(get_db)
+):
+    """Дневные показатели: новые/активные пользователи, прослушивания, скачивания, выручка"""
+    user = get_user_snapshot(db, user_id)
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    days = max(1, min(days, 366))
+    return get_daily_stats(db, days)
+
 @app.get("/api/search", response_model=SearchResponse)
 async def search_tracks(
     request: Request,
@@ -944,35 +1082,93 @@ async def stream_audio_proxy(request: Request, url: str = Query(..., description
         print(f"Error streaming audio: {type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail=f"Stream error: {str(e)}")
 
-@app.get("/api/admin/users", response_model=UserListResponse)
-async def get_users(user_id: int = Query(...), filter_type: str = Query("all"), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+@app.get("/api/admin/users", response_model=None, responses={200: {"model": UserListResponse}})
+def get_users(
+    user_id: int = Query(...),
+    filter_type: str = Query("all"),
+    q: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Пользователи, новые сначала. Постранично по курсору (joined_at, id);
+    q ищет по username / имени или точному ID.
+    """
+    user = get_user_snapshot(db, user_id)
     if not user or not user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    query = db.query(User)
+    limit = max(1, min(limit, PAGE_SIZE_MAX))
+    after = _page_cursor(cursor)
 
+    filters = []
     if filter_type == "premium":
-        query = query.filter(User.is_premium == True)
+        filters.append(User.is_premium == True)
     elif filter_type == "admin":
-        query = query.filter(User.is_admin == True)
+        filters.append(User.is_admin == True)
     elif filter_type == "blocked":
-        query = query.filter(User.is_blocked == True)
-
-    users = query.order_by(User.joined_at.desc()).all()
-
-    return UserListResponse(
-        users=[UserListItem(
-            id=u.id,
-            username=u.username,
-            first_name=u.first_name,
-            last_name=u.last_name,
-            is_admin=u.is_admin,
-            is_premium=u.is_premium,
-            is_blocked=u.is_blocked
-        ) for u in users]
+        filters.append(User.is_blocked == True)
+
+    q = (q or "").strip()
+    if q:
+        needle = q.lstrip("@").lower()
+        conditions = [
+            func.lower(User.username).contains(needle, autoescape=True),
+            func.lower(User.first_name).contains(needle, autoescape=True),
+        ]
+        if q.isdigit():
+            conditions.append(User.id == int(q))
+        filters.append(or_(*conditions))
+
+    total, exact = list_total(
+        db, "users", f"users:{filter_type}:{q.lower()}",
+        lambda: db.query(func.count(User.id)).filter(*filters).scalar(),
+        filtered=bool(filters),
+    )
+
+    def rows():
+        # Своя сессия: ответ стримится уже после выхода из эндпоинта
+        session = SessionLocal()
+        try:
+            query = session.query(User).filter(*filters)
+            if after:
+                query = query.filter(keyset_before(User.joined_at, User.id, after))
+            query = query.order_by(User.joined_at.desc(), User.id.desc()).limit(limit + 1)
+            for u in query.yield_per(100):
+                yield UserListItem(
+                    id=u.id,
+                    username=u.username,
+                    first_name=u.first_name,
+                    last_name=u.last_name,
+                    is_admin=u.is_admin,
+                    is_premium=u.is_premium,
+                    is_blocked=u.is_blocked
+                ).model_dump_json(), (u.joined_at, u.id)
+        finally:
+            session.close()
+
+    return StreamingResponse(
+        stream_page("users", rows(), limit, {"total": total, "total_exact": exact}),
+        media_type="application/json",
     )
 
+def record_chat_download(db: Session, user_id: int, message_id: int, track_id: str, increment_count: bool = True):
+    """Сохраняет отправленное в чат сообщение и увеличивает счётчик скачиваний пользователя"""
+    db.add(DownloadedMessage(
+        user_id=user_id,
+        chat_id=user_id,
+        message_id=message_id,
+        track_id=track_id
+    ))
+    if increment_count:
+        # Атомарный UPDATE без чтения строки (download_count не входит в кэш пользователей)
+        db.query(User).filter(User.id == user_id).update(
+            {User.download_count: func.coalesce(User.download_count, 0) + 1},
+            synchronize_session=False
+        )
+    db.commit()
+
 @app.post("/api/download/chat")
 async def download_to_chat(request: DownloadToChatRequest, db: Session = Depends(get_db)):
     """
@@ -985,11 +1181,6 @@ async def download_to_chat(request: DownloadToChatRequest, db: Session = Depends
         raise HTTPException(status_code=500, detail="Bot token not configured")
     
     try:
-        # Проверить статус подписки пользователя
-        user = db.query(User).filter(User.id == request.user_id).first()
-
-        print(f"[DOWNLOAD_TO_CHAT] User found: {user is not None}, protect_content: False")
-        
         # Обработка URL: если относительный, преобразуем в абсолютный
         audio_url = request.track.audioUrl
         if audio_url:
@@ -1015,86 +1206,83 @@ async def download_to_chat(request: DownloadToChatRequest, db: Session = Depends
             headers['Origin'] = 'https://rus.hitmotop.com'
             print(f"[DOWNLOAD_TO_CHAT] Added Hitmo headers")
         
-        # 1. Download audio file from URL (увеличен timeout для больших файлов)
-        async with httpx.AsyncClient(timeout=120.0, follow_redirects=True, verify=False) as client:
-            audio_response = await client.get(audio_url, headers=headers)
-            audio_response.raise_for_status()
-            audio_data = audio_response.content
-        
-        print(f"[DOWNLOAD_TO_CHAT] Audio downloaded: {len(audio_data)} bytes")
-        
-        # 2. Send to Telegram
-        telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendAudio"
-        
-        files = {
-            'audio': ('track.mp3', audio_data, 'audio/mpeg')
-        }
-        
-        # Скачиваем обложку, если есть
-        thumbnail_data = None
-        if request.track.coverUrl:
-            try:
-                # Обработка относительных URL для обложки
-                cover_url = request.track.coverUrl
-                if cover_url.startswith('/api/'):
-                    cover_url = f"http://localhost:8000{cover_url}"
+        # 1. Download audio file into the job workspace instead of holding it in memory
+        async with workspace_manager.workspace() as job_dir:
+            audio_path = os.path.join(job_dir, 'track.mp3')
+            audio_size = 0
+            async with httpx.AsyncClient(timeout=120.0, follow_redirects=True, verify=False) as client:
+                async with client.stream("GET", audio_url, headers=headers) as audio_response:
+                    audio_response.raise_for_status()
+                    with open(audio_path, 'wb') as audio_out:
+                        async for chunk in audio_response.aiter_bytes():
+                            audio_size += len(chunk)
+                            if audio_size > workspace_manager.max_file_bytes:
+                                raise DownloadTooLarge(f"Audio file is larger than {workspace_manager.max_file_bytes} bytes")
+                            audio_out.write(chunk)
+    
+            print(f"[DOWNLOAD_TO_CHAT] Audio downloaded: {audio_size} bytes")
+    
+            # 2. Send to Telegram
+            telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendAudio"
+    
+            # Скачиваем обложку, если есть
+            thumbnail_data = None
+            if request.track.coverUrl:
+                try:
+                    # Обработка относительных URL для обложки
+                    cover_url = request.track.coverUrl
+                    if cover_url.startswith('/api/'):
+                        cover_url = f"http://localhost:8000{cover_url}"
                 
-                # Подготовка заголовков для обложки
-                cover_headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-                    'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-                }
+                    # Подготовка заголовков для обложки
+                    cover_headers = {
+                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                        'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+                        'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+                    }
                 
-                # Для Hitmo добавляем специальные заголовки
-                if "hitmotop.com" in cover_url:
-                    cover_headers['Referer'] = 'https://rus.hitmotop.com/'
-                    cover_headers['Origin'] = 'https://rus.hitmotop.com'
+                    # Для Hitmo добавляем специальные заголовки
+                    if "hitmotop.com" in cover_url:
+                        cover_headers['Referer'] = 'https://rus.hitmotop.com/'
+                        cover_headers['Origin'] = 'https://rus.hitmotop.com'
                 
-                print(f"[DOWNLOAD_TO_CHAT] Downloading thumbnail from: {cover_url[:100]}...")
-                async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, verify=False) as thumb_client:
-                    thumb_response = await thumb_client.get(cover_url, headers=cover_headers)
-                    if thumb_response.status_code == 200:
-                        thumbnail_data = thumb_response.content
-                        files['thumbnail'] = ('thumb.jpg', thumbnail_data, 'image/jpeg')
-                        print(f"[DOWNLOAD_TO_CHAT] Thumbnail downloaded: {len(thumbnail_data)} bytes")
-            except Exception as e:
-                print(f"[DOWNLOAD_TO_CHAT] Failed to download thumbnail: {e}")
+                    print(f"[DOWNLOAD_TO_CHAT] Downloading thumbnail from: {cover_url[:100]}...")
+                    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, verify=False) as thumb_client:
+                        thumb_response = await thumb_client.get(cover_url, headers=cover_headers)
+                        if thumb_response.status_code == 200:
+                            thumbnail_data = thumb_response.content
+                            print(f"[DOWNLOAD_TO_CHAT] Thumbnail downloaded: {len(thumbnail_data)} bytes")
+                except Exception as e:
+                    print(f"[DOWNLOAD_TO_CHAT] Failed to download thumbnail: {e}")
         
-        data = {
-            'chat_id': request.user_id,
-            'title': request.track.title,
-            'performer': request.track.artist,
-            'duration': request.track.duration if request.track.duration > 0 else None,
-            'caption': 'Отправлено из приложения @zvuklybot',
-            'protect_content': False
-        }
+            data = {
+                'chat_id': request.user_id,
+                'title': request.track.title,
+                'performer': request.track.artist,
+                'duration': request.track.duration if request.track.duration > 0 else None,
+                'caption': 'Отправлено из приложения @zvuklybot',
+                'protect_content': False
+            }
         
-        print(f"[DOWNLOAD_TO_CHAT] Sending to Telegram API...")
+            print(f"[DOWNLOAD_TO_CHAT] Sending to Telegram API...")
         
-        # 2. Send to Telegram (увеличен timeout для загрузки больших файлов)
-        async with httpx.AsyncClient(timeout=180.0) as client:
-            response = await client.post(telegram_url, files=files, data=data)
-            response.raise_for_status()
-            result = response.json()
+            # 2. Send to Telegram (увеличен timeout для загрузки больших файлов)
+            with open(audio_path, 'rb') as audio_file:
+                files = {
+                    'audio': ('track.mp3', audio_file, 'audio/mpeg')
+                }
+                if thumbnail_data:
+                    files['thumbnail'] = ('thumb.jpg', thumbnail_data, 'image/jpeg')
+                async with httpx.AsyncClient(timeout=180.0) as client:
+                    response = await client.post(telegram_url, files=files, data=data)
+                    response.raise_for_status()
+                    result = response.json()
         
         message_id = result['result']['message_id']
         print(f"[DOWNLOAD_TO_CHAT] Successfully sent to Telegram, message_id: {message_id}")
         
-        # 3. Save to database
-        downloaded_msg = DownloadedMessage(
-            user_id=request.user_id,
-            chat_id=request.user_id,
-            message_id=message_id,
-            track_id=request.track.id
-        )
-        db.add(downloaded_msg)
-        
-        # 4. Increment download count
-        if user:
-            user.download_count = (user.download_count or 0) + 1
-        
-        db.commit()
+        # 3. Save to database and increment download count
+        await run_db(record_chat_download, db, request.user_id, message_id, request.track.id)
         
         return {
             "status": "ok",
@@ -1102,6 +1290,15 @@ async def download_to_chat(request: DownloadToChatRequest, db: Session = Depends
             "message_id": message_id
         }
         
+    except WorkspaceQuotaExceeded as e:
+        print(f"[DOWNLOAD_TO_CHAT] Rejected: {e}")
+        raise HTTPException(status_code=503, detail="Сервер загрузок перегружен, попробуйте позже")
+    except DownloadTooLarge as e:
+        print(f"[DOWNLOAD_TO_CHAT] Rejected: {e}")
+        raise HTTPException(
+            status_code=413,
+            detail=f"Трек слишком большой для отправки в чат (больше {workspace_manager.max_file_bytes // (1024 * 1024)} МБ)",
+        )
     except Exception as e:
         print(f"Error downloading to chat: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1112,147 +1309,143 @@ async def youtube_download_to_chat(request: dict, db: Session = Depends(get_db))
     Download YouTube audio and send to user's Telegram chat
     """
     import yt_dlp
-    import os
-    import tempfile
-    
+
+    user_id = request.get('user_id')
+    youtube_url = request.get('url')
+    track_title = request.get('title', 'YouTube Track')
+    track_artist = request.get('artist', 'Unknown Artist')
+
+    if not user_id or not youtube_url:
+        raise HTTPException(status_code=400, detail="user_id and url are required")
+
     try:
-        user_id = request.get('user_id')
-        youtube_url = request.get('url')
-        track_title = request.get('title', 'YouTube Track')
-        track_artist = request.get('artist', 'Unknown Artist')
-        
-        if not user_id or not youtube_url:
-            raise HTTPException(status_code=400, detail="user_id and url are required")
-        
         print(f"📥 YouTube to chat: {youtube_url} for user {user_id}")
         
         # Получаем зарубежные прокси для YouTube (для обхода блокировки в РФ)
         youtube_proxy_str = os.getenv("YOUTUBE_PROXY_LIST", "")
         youtube_proxies = [p.strip() for p in youtube_proxy_str.split(",") if p.strip()]
         
-        # Create temp directory
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, 'audio')
-        
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': temp_path,
-            'quiet': False,
-            'no_warnings': False,
-            'socket_timeout': 300,  # 5 minutes timeout
-            'ffmpeg_location': r'C:\ffmpeg-2025-11-27-git-61b034a47c-essentials_build\bin',
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['android', 'web'],
-                    'skip': ['dash', 'hls']
-                }
-            },
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            # Ускорение загрузки
-            'concurrent_fragment_downloads': 4,
-            'retries': 3,
-            'fragment_retries': 3,
-            # Скачать обложку
-            'writethumbnail': True,
-        }
-        
-        # Добавляем прокси если есть
-        if youtube_proxies:
-            proxy = random.choice(youtube_proxies)
-            ydl_opts['proxy'] = proxy
-            print(f"Using YouTube proxy: {proxy}")
-        
-        # Download the audio
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(youtube_url, download=True)
+        # Рабочая папка удаляется при любом исходе (успех, ошибка, отмена)
+        async with workspace_manager.workspace() as temp_dir:
+            temp_path = os.path.join(temp_dir, 'audio')
+            
+            ydl_opts = {
+                'format': 'bestaudio/best',
+                'outtmpl': temp_path,
+                'quiet': False,
+                'no_warnings': False,
+                'socket_timeout': 300,  # 5 minutes timeout
+                'max_filesize': workspace_manager.max_file_bytes,
+                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'extractor_args': {
+                    'youtube': {
+                        'player_client': ['android', 'web'],
+                        'skip': ['dash', 'hls']
+                    }
+                },
+                # Ускорение загрузки
+                'concurrent_fragment_downloads': 4,
+                'retries': 3,
+                'fragment_retries': 3,
+                # Скачать обложку
+                'writethumbnail': True,
+            }
+            
+            ffmpeg_location = find_ffmpeg()
+            if ffmpeg_location:
+                ydl_opts['ffmpeg_location'] = ffmpeg_location
+                ydl_opts['postprocessors'] = [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'mp3',
+                    'preferredquality': '192',
+                }]
+            else:
+                # Без FFmpeg отправляем исходную аудиодорожку (m4a/webm/opus)
+                print("⚠️ FFmpeg not found (set FFMPEG_LOCATION or add ffmpeg to PATH), sending original audio stream")
+            
+            # Добавляем прокси если есть
+            if youtube_proxies:
+                proxy = random.choice(youtube_proxies)
+                ydl_opts['proxy'] = proxy
+                print(f"Using YouTube proxy: {proxy}")
+            
+            def run_download():
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    return ydl.extract_info(youtube_url, download=True)
+            
+            # yt-dlp блокирующий — выполняем в потоке, чтобы не останавливать event loop (стриминг и т.д.)
+            info = await asyncio.to_thread(run_download)
             print(f"✅ YouTube download complete")
-        
-        # Find the downloaded MP3 file and thumbnail
-        downloaded_file = None
-        thumbnail_file = None
-        
-        for ext in ['.mp3', '.webm', '.m4a', '.opus', '.mp4']:
-            test_path = temp_path + ext
-            if os.path.exists(test_path):
-                downloaded_file = test_path
-                print(f"📁 Found file: {downloaded_file}")
-                break
-        
-        # Find thumbnail file
-        for thumb_ext in ['.jpg', '.jpeg', '.png', '.webp']:
-            thumb_path = temp_path + thumb_ext
-            if os.path.exists(thumb_path):
-                thumbnail_file = thumb_path
-                print(f"🎨 Found thumbnail: {thumbnail_file}")
-                break
-        
-        if not downloaded_file:
-            files_in_dir = os.listdir(temp_dir) if os.path.exists(temp_dir) else []
-            raise Exception(f"Downloaded file not found. Dir contents: {files_in_dir}")
-        
-        # Send to Telegram
-        BOT_TOKEN = os.getenv("BOT_TOKEN")
-        if not BOT_TOKEN:
-            raise Exception("BOT_TOKEN not configured")
-        
-        telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendAudio"
-
-        # Подготовить thumbnail для отправки (если есть локальный файл)
-        with open(downloaded_file, 'rb') as audio_file:
-            files = {'audio': audio_file}
             
-            # Добавить thumbnail если есть локальный файл
-            if thumbnail_file:
-                with open(thumbnail_file, 'rb') as thumb_file:
-                    thumbnail_data = thumb_file.read()
-                    files['thumbnail'] = ('thumb.jpg', thumbnail_data, 'image/jpeg')
-                    print(f"📸 Adding thumbnail from local file")
+            # Find the downloaded MP3 file and thumbnail
+            downloaded_file = None
+            thumbnail_file = None
             
-            data = {
-                'chat_id': user_id,
-                'title': track_title,
-                'performer': track_artist,
-                'caption': 'Отправлено из приложения @zvuklybot',
-                'protect_content': False
-            }
+            for ext in ['.mp3', '.webm', '.m4a', '.opus', '.mp4']:
+                test_path = temp_path + ext
+                if os.path.exists(test_path):
+                    downloaded_file = test_path
+                    print(f"📁 Found file: {downloaded_file}")
+                    break
+            
+            # Find thumbnail file
+            for thumb_ext in ['.jpg', '.jpeg', '.png', '.webp']:
+                thumb_path = temp_path + thumb_ext
+                if os.path.exists(thumb_path):
+                    thumbnail_file = thumb_path
+                    print(f"🎨 Found thumbnail: {thumbnail_file}")
+                    break
+            
+            if not downloaded_file:
+                files_in_dir = os.listdir(temp_dir) if os.path.exists(temp_dir) else []
+                raise Exception(f"Downloaded file not found. Dir contents: {files_in_dir}")
             
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(telegram_url, files=files, data=data)
+            # Send to Telegram
+            BOT_TOKEN = os.getenv("BOT_TOKEN")
+            if not BOT_TOKEN:
+                raise Exception("BOT_TOKEN not configured")
+            
+            telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendAudio"
+
+            # Подготовить thumbnail для отправки (если есть локальный файл)
+            with open(downloaded_file, 'rb') as audio_file:
+                files = {'audio': audio_file}
+                
+                # Добавить thumbnail если есть локальный файл
+                if thumbnail_file:
+                    with open(thumbnail_file, 'rb') as thumb_file:
+                        thumbnail_data = thumb_file.read()
+                        files['thumbnail'] = ('thumb.jpg', thumbnail_data, 'image/jpeg')
+                        print(f"📸 Adding thumbnail from local file")
+                
+                data = {
+                    'chat_id': user_id,
+                    'title': track_title,
+                    'performer': track_artist,
+                    'caption': 'Отправлено из приложения @zvuklybot',
+                    'protect_content': False
+                }
                 
-                if response.status_code != 200:
-                    raise Exception(f"Telegram API error: {response.text}")
+                async with httpx.AsyncClient(timeout=300.0) as client:
+                    response = await client.post(telegram_url, files=files, data=data)
+                    
+                    if response.status_code != 200:
+                        raise Exception(f"Telegram API error: {response.text}")
         
         print(f"✅ Sent to Telegram chat {user_id}")
         
         # Track download in database
         try:
-            download_msg = DownloadedMessage(
-                user_id=user_id,
-                chat_id=user_id,
-                message_id=0,  # We don't have message_id yet
-                track_id=f"yt_{info.get('id', 'unknown')}"
-            )
-            db.add(download_msg)
-            db.commit()
+            # We don't have message_id yet
+            await run_db(record_chat_download, db, user_id, 0, f"yt_{info.get('id', 'unknown')}", increment_count=False)
         except Exception as e:
             print(f"Warning: Failed to track download: {e}")
         
-        # Cleanup
-        try:
-            import shutil
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-                print(f"🗑️ Cleaned up: {temp_dir}")
-        except Exception as e:
-            print(f"Error cleaning up: {e}")
-        
         return {"status": "ok", "message": "Track sent to chat"}
         
+    except WorkspaceQuotaExceeded as e:
+        print(f"⚠️ YouTube to chat rejected: {e}")
+        raise HTTPException(status_code=503, detail="Сервер загрузок перегружен, попробуйте позже")
     except Exception as e:
         print(f"❌ Error in YouTube to chat: {e}")
         import traceback
@@ -1268,6 +1461,75 @@ class LyricsResponse(BaseModel):
     lyrics_text: str
     source: str
 
+class LyricsPrefetchItem(BaseModel):
+    track_id: Optional[str] = None
+    title: str
+    artist: str
+
+class LyricsPrefetchRequest(BaseModel):
+    tracks: List[LyricsPrefetchItem]
+
+# Upper bound on tracks accepted per prefetch call (roughly one queue page)
+LYRICS_PREFETCH_MAX_BATCH = int(os.getenv("LYRICS_PREFETCH_MAX_BATCH", "50"))
+
+@app.post("/api/lyrics/prefetch")
+async def prefetch_lyrics(request: LyricsPrefetchRequest, db: Session = Depends(get_db)):
+    """
+    Warm the lyrics cache for upcoming tracks of a queue or playlist.
+    Returns immediately; uncached tracks are looked up in the background
+    at low priority and written to the database.
+    """
+    if not lyrics_prefetcher:
+        raise HTTPException(status_code=503, detail="Lyrics service not available")
+
+    tracks = request.tracks[:LYRICS_PREFETCH_MAX_BATCH]
+    keyed = [(make_lyrics_key(t.artist, t.title), t) for t in tracks if t.title and t.artist]
+    cached = await run_db(fresh_keys, db, [key for key, _ in keyed])
+
+    to_fetch = []
+    seen = set(cached)
+    for key, t in keyed:
+        if key in seen:
+            continue
+        seen.add(key)
+        to_fetch.append((t.track_id, t.artist, t.title))
+
+    queued = lyrics_prefetcher.enqueue(to_fetch)
+    return {
+        "received": len(request.tracks),
+        "cached": len(cached),
+        "queued": queued,
+    }
+
+class LyricsSearchItem(BaseModel):
+    track_id: Optional[str] = None
+    title: str
+    artist: str
+    snippet: str
+    score: float
+
+class LyricsSearchResponse(BaseModel):
+    query: str
+    items: List[LyricsSearchItem]
+
+# Must be registered before /api/lyrics/{track_id}, otherwise "search" is taken as a track id
+@app.get("/api/lyrics/search", response_model=LyricsSearchResponse)
+def search_lyrics_text(
+    q: str = Query(..., min_length=2, description="Words from the lyrics, title or artist"),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over cached lyrics, best match first.
+    Only songs whose lyrics are already in the cache can be found.
+    """
+    try:
+        items = search_lyrics(db, q, limit=limit, offset=offset)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return LyricsSearchResponse(query=q, items=items)
+
 @app.get("/api/lyrics/{track_id}", response_model=LyricsResponse)
 async def get_lyrics(
     track_id: str,
@@ -1277,53 +1539,53 @@ async def get_lyrics(
 ):
     """
     Get lyrics for a track
-    First checks cache (database), then fetches from Genius API if not found
+    First checks cache (database, keyed by normalized artist + title), then fetches from external sources.
+    Not-found results are cached too, until they expire.
     """
     try:
         # 1. Check cache (database)
-        cached_lyrics = db.query(Lyrics).filter(Lyrics.track_id == track_id).first()
+        lookup_key = make_lyrics_key(artist, title)
+        cached_lyrics = await run_db(lookup_lyrics, db, lookup_key, track_id)
         
-        if cached_lyrics:
+        if cached_lyrics and not is_miss(cached_lyrics):
             print(f"Lyrics found in cache for: {artist} - {title}")
             return LyricsResponse(
-                track_id=cached_lyrics.track_id,
+                track_id=track_id,
                 title=cached_lyrics.title,
                 artist=cached_lyrics.artist,
                 lyrics_text=cached_lyrics.lyrics_text,
                 source=cached_lyrics.source
             )
         
-        # 2. Fetch from Genius API
+        if cached_lyrics and not is_expired(cached_lyrics):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Lyrics not found for: {artist} - {title}"
+            )
+        
+        # 2. Fetch from external sources
         if not lyrics_service:
             raise HTTPException(
                 status_code=503,
                 detail="Lyrics service not available. GENIUS_API_TOKEN not configured."
             )
         
-        lyrics_text = lyrics_service.get_lyrics(title, artist)
+        lyrics_text = await lyrics_service.get_lyrics(title, artist)
         
         if not lyrics_text:
+            await run_db(store_miss, db, lookup_key, track_id, title, artist)
             raise HTTPException(
                 status_code=404,
                 detail=f"Lyrics not found for: {artist} - {title}"
             )
         
         # 3. Save to cache
-        new_lyrics = Lyrics(
-            track_id=track_id,
-            title=title,
-            artist=artist,
-            lyrics_text=lyrics_text,
-            source="genius"
-        )
-        db.add(new_lyrics)
-        db.commit()
-        db.refresh(new_lyrics)
+        new_lyrics = await run_db(store_lyrics, db, lookup_key, track_id, title, artist, lyrics_text, source="genius")
         
         print(f"Lyrics cached for: {artist} - {title}")
         
         return LyricsResponse(
-            track_id=new_lyrics.track_id,
+            track_id=track_id,
             title=new_lyrics.title,
             artist=new_lyrics.artist,
             lyrics_text=new_lyrics.lyrics_text,
@@ -1336,35 +1598,94 @@ async def get_lyrics(
         print(f"Error getting lyrics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/admin/lyrics/stats")
+def get_lyrics_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
+    """Статистика текстов: источники (успешность, задержка, порядок), кэш и сжатие (только для админов)"""
+    user = get_user_snapshot(db, user_id)
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if not lyrics_service:
+        raise HTTPException(status_code=503, detail="Lyrics service not available")
+
+    stats = lyrics_service.get_source_stats()
+    stats["cache"] = get_lyrics_cache_stats(db)
+    if lyrics_prefetcher:
+        stats["prefetch"] = lyrics_prefetcher.get_stats()
+    return stats
+
+@app.get("/api/admin/events/stats")
+def get_event_buffer_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
+    """Буфер событий рекомендаций этого воркера: размер пачек, задержка записи, потери (только для админов)"""
+    user = get_user_snapshot(db, user_id)
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return event_buffer.get_stats()
+
+@app.get("/api/admin/jobs/stats")
+def get_background_job_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
+    """Фоновые задачи обслуживания БД этого воркера: rollups, retention событий, co-occurrence (только для админов)"""
+    user = get_user_snapshot(db, user_id)
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return {"jobs": [
+        rollup_compactor.get_stats(),
+        event_retention.get_stats(),
+        cooccurrence_builder.get_stats(),
+        cooccurrence_reloader.get_stats(),
+    ]}
+
+@app.get("/api/admin/rec-pools/stats")
+async def get_candidate_pool_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
+    """Пулы кандидатов, курсоры и co-occurrence индекс рекомендаций этого воркера (только для админов)"""
+    # async: пулы и курсоры трогаются только из event loop
+    user = await run_db(get_user_snapshot, db, user_id)
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return {
+        **candidate_pools.get_stats(),
+        "cursors": cursor_store.get_stats(),
+        "cooccurrence": cooccurrence_index.get_stats(),
+    }
+
+@app.get("/api/admin/user-cache/stats")
+def get_user_cache_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
+    """Кэш пользователей этого воркера: размер, попадания, инвалидации (только для админов)"""
+    user = get_user_snapshot(db, user_id)
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return user_cache.get_stats()
+
 # --- Referral System Endpoints ---
 
 @app.get("/api/referral/code")
-async def get_referral_code(user_id: int = Query(...), db: Session = Depends(get_db)):
+def get_referral_code(user_id: int = Query(...), db: Session = Depends(get_db)):
     """Get user's referral code and link"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_snapshot(db, user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Generate referral code if doesn't exist
     if not user.referral_code:
-        user.referral_code = f"REF{user_id}"
+        db_user = db.query(User).filter(User.id == user_id).first()
+        db_user.referral_code = f"REF{user_id}"
         db.commit()
+        user = cache_user(db_user)
     
     bot_username = os.getenv("BOT_USERNAME", "muzikavtgbot")
+    summary = get_referral_summary(db, user_id)
     
     return {
         "code": user.referral_code,
         "link": f"https://t.me/{bot_username}/app?startapp={user.referral_code}",
-        "referrals_count": db.query(Referral).filter(Referral.referrer_id == user_id).count(),
-        "completed_referrals": db.query(Referral).filter(
-            Referral.referrer_id == user_id,
-            Referral.status == 'completed'
-        ).count()
+        "referrals_count": summary["total_referrals"],
+        "completed_referrals": summary["completed_referrals"]
     }
 
 @app.post("/api/referral/register")
-async def register_referral(
+def register_referral(
+    background_tasks: BackgroundTasks,
     user_id: int = Query(...),
     referral_code: str = Query(...),
     db: Session = Depends(get_db)
@@ -1404,7 +1725,7 @@ async def register_referral(
         print(f"ℹ️ register_referral failed: user not found user_id={user_id}")
         raise HTTPException(status_code=404, detail="User not found")
     
-    created = await register_referral_relationship(db, user, referrer)
+    created = register_referral_relationship(db, user, referrer, background_tasks)
     if not created:
         print(f"ℹ️ register_referral skipped: already registered user_id={user_id}, referrer_id={referrer.id}")
         raise HTTPException(status_code=400, detail="Referral already registered")
@@ -1416,43 +1737,22 @@ async def register_referral(
     }
 
 @app.get("/api/referral/stats")
-async def get_referral_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
-    """Get referral statistics for a user"""
-    total = db.query(Referral).filter(Referral.referrer_id == user_id).count()
-    completed = db.query(Referral).filter(
-        Referral.referrer_id == user_id,
-        Referral.status == 'completed'
-    ).count()
-    pending = total - completed
-    
-    # Get list of referrals with details
-    referrals = db.query(Referral).filter(Referral.referrer_id == user_id).all()
-    referral_list = []
-    
-    for ref in referrals:
-        referred_user = db.query(User).filter(User.id == ref.referred_id).first()
-        if referred_user:
-            referral_list.append({
-                "id": ref.id,
-                "user_id": referred_user.id,
-                "username": referred_user.username,
-                "first_name": referred_user.first_name,
-                "status": ref.status,
-                "reward_given": ref.reward_given,
-                "created_at": ref.created_at.isoformat() if ref.created_at else None,
-                "completed_at": ref.completed_at.isoformat() if ref.completed_at else None
-            })
-    
+def get_referral_stats(
+    user_id: int = Query(...),
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get referral statistics for a user; the list is paginated with cursor=next_cursor"""
+    referrals, next_cursor = get_referral_page(db, user_id, limit, _page_cursor(cursor))
     return {
-        "total_referrals": total,
-        "completed_referrals": completed,
-        "pending_referrals": pending,
-        "referrals": referral_list
+        **get_referral_summary(db, user_id),
+        "referrals": referrals,
+        "next_cursor": next_cursor,
     }
 
 def extend_premium(user: User, days: int, db: Session):
     """Extend user's premium subscription by specified days"""
-    from datetime import timedelta
     now = datetime.utcnow()
     
     # If user has active premium, extend from expiration date
@@ -1468,6 +1768,45 @@ def extend_premium(user: User, days: int, db: Session):
     
     return user.premium_expires_at
 
+def apply_completed_payment(db: Session, user_id: int, days: int):
+    """
+    Продлевает премиум пользователю и, если это первая покупка приглашённого,
+    награждает реферера. Возвращает (expires_at, referral_reward), где
+    referral_reward = (referrer_id, referrer_expires, referred_name) или None.
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        return None, None
+
+    expires_at = extend_premium(user, days, db)
+
+    if not user.referred_by:
+        return expires_at, None
+
+    referral = db.query(Referral).filter(
+        Referral.referred_id == user_id,
+        Referral.status == 'pending'
+    ).first()
+    if not referral or referral.reward_given:
+        return expires_at, None
+
+    referrer = db.query(User).filter(User.id == referral.referrer_id).first()
+    if not referrer:
+        return expires_at, None
+
+    # Give the referrer the same duration as the invited user's first purchased subscription
+    referrer_expires = extend_premium(referrer, days, db)
+
+    # Update referral status
+    referral.status = 'completed'
+    referral.reward_given = True
+    referral.completed_at = datetime.utcnow()
+    db.commit()
+    invalidate_referrer(referrer.id)
+
+    referred_name = user.first_name or user.username or f"User {user.id}"
+    return expires_at, (referrer.id, referrer_expires, referred_name)
+
 @app.post("/api/payment/complete")
 async def complete_payment(
     user_id: int = Query(...),
@@ -1477,20 +1816,17 @@ async def complete_payment(
     """Mark payment as complete and grant premium.
     This should be called from Tribute webhook or payment verification.
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Determine premium duration
     days = 30 if plan == 'month' else 365
     
-    # Extend premium
-    expires_at = extend_premium(user, days, db)
+    # Extend premium (and reward referrer) off the event loop
+    expires_at, referral_reward = await run_db(apply_completed_payment, db, user_id, days)
+    if expires_at is None:
+        raise HTTPException(status_code=404, detail="User not found")
     
     # Send premium activation notification
     if BOT_TOKEN:
         try:
-            import httpx
             telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
             async with httpx.AsyncClient() as client:
                 await client.post(telegram_url, json={
@@ -1503,46 +1839,21 @@ async def complete_payment(
         except Exception as e:
             print(f"Failed to send premium activation notification: {e}")
     
-    # Check if this user was referred and reward referrer
-    if user.referred_by:
-        referral = db.query(Referral).filter(
-            Referral.referred_id == user_id,
-            Referral.status == 'pending'
-        ).first()
-        
-        if referral and not referral.reward_given:
-            # Get referrer
-            referrer = db.query(User).filter(User.id == referral.referrer_id).first()
-            
-            if referrer:
-                # Give the referrer the same duration as the invited user's first purchased subscription
-                referrer_expires = extend_premium(referrer, days, db)
-                
-                # Update referral status
-                referral.status = 'completed'
-                referral.reward_given = True
-                referral.completed_at = datetime.utcnow()
-                db.commit()
-                
-                # Send notification to referrer
-                if BOT_TOKEN:
-                    try:
-                        import httpx
-                        telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-                        
-                        # Get referred user name
-                        referred_name = user.first_name or user.username or f"User {user.id}"
-                        
-                        async with httpx.AsyncClient() as client:
-                            await client.post(telegram_url, json={
-                                'chat_id': referrer.id,
-                                'text': f"💎 <b>Бонус получен!</b>\n\n"
-                                        f"{referred_name} оформил подписку!\n"
-                                        f"Вы получили Premium до {referrer_expires.strftime('%d.%m.%Y')} на такой же срок, как и его подписка!",
-                                'parse_mode': 'HTML'
-                            })
-                    except Exception as e:
-                        print(f"Failed to send referral notification: {e}")
+    # Send notification to referrer
+    if referral_reward and BOT_TOKEN:
+        referrer_id, referrer_expires, referred_name = referral_reward
+        try:
+            telegram_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+            async with httpx.AsyncClient() as client:
+                await client.post(telegram_url, json={
+                    'chat_id': referrer_id,
+                    'text': f"💎 <b>Бонус получен!</b>\n\n"
+                            f"{referred_name} оформил подписку!\n"
+                            f"Вы получили Premium до {referrer_expires.strftime('%d.%m.%Y')} на такой же срок, как и его подписка!",
+                    'parse_mode': 'HTML'
+                })
+        except Exception as e:
+            print(f"Failed to send referral notification: {e}")
     
     return {
         "status": "ok",
@@ -1551,10 +1862,10 @@ async def complete_payment(
     }
 
 @app.post("/api/admin/promocodes")
-async def create_promo_code(request: PromoCodeCreate, user_id: int = Query(...), db: Session = Depends(get_db)):
+def create_promo_code(request: PromoCodeCreate, user_id: int = Query(...), db: Session = Depends(get_db)):
     """Создание промокода (только для админов)"""
     # Проверка прав администратора
-    admin = db.query(User).filter(User.id == user_id).first()
+    admin = get_user_snapshot(db, user_id)
     if not admin or not admin.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
     
@@ -1579,10 +1890,10 @@ async def create_promo_code(request: PromoCodeCreate, user_id: int = Query(...),
     return {"status": "ok", "promo_code": promo.code}
 
 @app.get("/api/admin/promocodes")
-async def get_promo_codes(user_id: int = Query(...), db: Session = Depends(get_db)):
+def get_promo_codes(user_id: int = Query(...), db: Session = Depends(get_db)):
     """Получение списка промокодов (только для админов)"""
     # Проверка прав администратора
-    admin = db.query(User).filter(User.id == user_id).first()
+    admin = get_user_snapshot(db, user_id)
     if not admin or not admin.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
     
@@ -1590,10 +1901,10 @@ async def get_promo_codes(user_id: int = Query(...), db: Session = Depends(get_d
     return promos
 
 @app.delete("/api/admin/promocodes/{promo_id}")
-async def delete_promo_code(promo_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
+def delete_promo_code(promo_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
     """Удаление промокода (только для админов)"""
     # Проверка прав администратора
-    admin = db.query(User).filter(User.id == user_id).first()
+    admin = get_user_snapshot(db, user_id)
     if not admin or not admin.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
     
@@ -1607,10 +1918,10 @@ async def delete_promo_code(promo_id: int, user_id: int = Query(...), db: Sessio
     return {"status": "ok"}
 
 @app.delete("/api/admin/user/{user_id}")
-async def delete_user(user_id: int, admin_id: int = Query(...), db: Session = Depends(get_db)):
+def delete_user(user_id: int, admin_id: int = Query(...), db: Session = Depends(get_db)):
     """Удаление пользователя из БД (для тестирования)"""
     # Проверка прав администратора
-    admin = db.query(User).filter(User.id == admin_id).first()
+    admin = get_user_snapshot(db, admin_id)
     if not admin or not admin.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
     
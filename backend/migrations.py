@@ -0,0 +1,347 @@
+"""
+Versioned schema migrations.
+
+Every migration is a function registered under an increasing version number.
+Pending migrations are applied once, in order, and recorded in the
+`schema_migrations` table. init_db() runs them on startup;
+scripts/migrate.py applies them or shows their status by hand.
+
+Migration 1 (baseline) creates missing tables from the current models, so a
+fresh database already has everything the models declare. Later migrations
+must therefore be idempotent: they bring *existing* databases up to date.
+
+Indexes on tables that may already hold a lot of rows are built online
+(CREATE INDEX CONCURRENTLY on PostgreSQL), so writers aren't blocked while
+they build. Data that takes long to fill (e.g. the lyrics search index) is
+left to a script, so startup isn't held up by it.
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+try:
+    from backend.database import Base, Payment, DailyStat, DailyRevenue, parse_amount, engine as default_engine
+    from backend.lyrics_search import FTS_TABLE, GIN_INDEX, TSVECTOR_COLUMN
+    from backend.recommendations.models import UserArtistStat, UserTaste
+except ImportError:
+    from database import Base, Payment, DailyStat, DailyRevenue, parse_amount, engine as default_engine
+    from lyrics_search import FTS_TABLE, GIN_INDEX, TSVECTOR_COLUMN
+    from recommendations.models import UserArtistStat, UserTaste
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# Arbitrary key for pg_advisory_lock, so parallel workers don't migrate at the same time
+ADVISORY_LOCK_KEY = 7310241
+
+# (table, index name, columns) built online by migration 2. Columns are spelled
+# out here because the models may move on (migration 3 replaces the payments one)
+HOT_PATH_INDEXES = [
+    ("user_track_events", "ix_user_track_events_user_created", ("user_id", "created_at")),
+    ("user_track_events", "ix_user_track_events_user_type_created", ("user_id", "event_type", "created_at")),
+    ("referrals", "ix_referrals_referrer_status", ("referrer_id", "status")),
+    ("payments", "ix_payments_status_currency", ("status", "currency")),
+    ("users", "ix_users_joined_at", ("joined_at",)),
+    ("users", "ix_users_download_count", ("download_count",)),
+    ("downloaded_messages", "ix_downloaded_messages_user_track", ("user_id", "track_id")),
+]
+
+PAYMENT_AMOUNT_INDEX = ("payments", "ix_payments_status_currency_amount", ("status", "currency", "amount_value"))
+PAYMENT_BACKFILL_BATCH = 1000
+
+# Range scans of the daily rollup compactor (migration 4)
+ROLLUP_INDEXES = [
+    ("downloaded_messages", "ix_downloaded_messages_created_at", ("created_at",)),
+    ("payments", "ix_payments_status_completed_at", ("status", "completed_at")),
+]
+
+# Keyset pagination of the admin lists (migration 5)
+KEYSET_INDEXES = [
+    ("users", "ix_users_joined_id", ("joined_at", "id")),
+    ("payments", "ix_payments_created_id", ("created_at", "id")),
+]
+
+REFERRAL_LIST_INDEX = ("referrals", "ix_referrals_referrer_created", ("referrer_id", "created_at", "id"))
+
+# Indexes owned by a later migration; the baseline must not build them in place
+ONLINE_INDEXES = {
+    name for _, name, _ in HOT_PATH_INDEXES + [PAYMENT_AMOUNT_INDEX] + ROLLUP_INDEXES + KEYSET_INDEXES + [REFERRAL_LIST_INDEX]
+}
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Engine], None]]] = []
+
+
+def migration(version: int, name: str):
+    def register(func: Callable[[Engine], None]):
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+
+def _is_postgres(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def create_index_online(
+    engine: Engine,
+    table_name: str,
+    index_name: str,
+    columns: Tuple[str, ...],
+    unique: bool = False,
+    using: Optional[str] = None,
+):
+    """Create an index if missing, without locking out writers on PostgreSQL."""
+    columns = ", ".join(columns)
+    unique = "UNIQUE " if unique else ""
+    method = f"USING {using} " if using else ""
+
+    if _is_postgres(engine):
+        # CONCURRENTLY can't run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            # An interrupted concurrent build leaves an INVALID index behind; IF NOT EXISTS would keep it
+            invalid = conn.execute(
+                text(
+                    "SELECT NOT i.indisvalid FROM pg_index i "
+                    "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+                ),
+                {"name": index_name},
+            ).scalar()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+            conn.execute(text(
+                f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {table_name} {method}({columns})"
+            ))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE {unique}INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+    print(f"✅ Index {index_name} ready")
+
+
+def drop_index_online(engine: Engine, index_name: str):
+    if _is_postgres(engine):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+    print(f"🗑️ Index {index_name} dropped")
+
+
+@migration(1, "baseline")
+def _baseline(engine: Engine):
+    """
+    Tables from the models, plus columns and single-column indexes that were
+    added to the models after a table was first created (replaces the old
+    ensure_schema() and scripts/migrate_db.py / migrate_lyrics.py).
+    """
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            # Only nullable columns without server defaults can be added in place
+            if column.name in existing_columns or not column.nullable or column.primary_key:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            print(f"✅ Added column {table.name}.{column.name}")
+
+        existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes or index.name in ONLINE_INDEXES:
+                continue
+            index.create(bind=engine, checkfirst=True)
+            print(f"✅ Created index {index.name}")
+
+    # users.is_blocked used to be added by scripts/migrate_db.py with DEFAULT 0;
+    # NULLs would slip past `is_blocked == False` filters
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET is_blocked = :no WHERE is_blocked IS NULL"), {"no": False})
+
+
+@migration(2, "hot_path_composite_indexes")
+def _hot_path_indexes(engine: Engine):
+    """Composite indexes for taste profiles, admin stats, referral stats and download lookups."""
+    for table_name, index_name, columns in HOT_PATH_INDEXES:
+        create_index_online(engine, table_name, index_name, columns)
+
+
+@migration(3, "payment_amount_value")
+def _payment_amount_value(engine: Engine):
+    """
+    Numeric payments.amount_value next to the string amount, so admin revenue
+    is summed by the database. Backfilled in batches; the covering index
+    replaces ix_payments_status_currency (its prefix).
+    """
+    if "amount_value" not in {c["name"] for c in inspect(engine).get_columns("payments")}:
+        column_type = Payment.__table__.c.amount_value.type.compile(dialect=engine.dialect)
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE payments ADD COLUMN amount_value {column_type}"))
+        print("✅ Added column payments.amount_value")
+
+    # Amounts are free-form strings ("1.5", "0,25"), so parse them in Python like the ORM listener does.
+    # Keyset over id: unparseable amounts stay NULL and must not be fetched again
+    filled = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, amount FROM payments WHERE id > :after AND amount_value IS NULL "
+                    "AND amount IS NOT NULL ORDER BY id LIMIT :limit"
+                ),
+                {"after": last_id, "limit": PAYMENT_BACKFILL_BATCH},
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = [{"id": row_id, "value": parse_amount(amount)} for row_id, amount in rows]
+            updates = [u for u in updates if u["value"] is not None]
+            if updates:
+                conn.execute(text("UPDATE payments SET amount_value = :value WHERE id = :id"), updates)
+            filled += len(updates)
+    if filled:
+        print(f"✅ Backfilled amount_value for {filled} payments")
+
+    create_index_online(engine, *PAYMENT_AMOUNT_INDEX)
+    drop_index_online(engine, "ix_payments_status_currency")
+
+
+@migration(4, "daily_rollups")
+def _daily_rollups(engine: Engine):
+    """Summary tables for the admin dashboards (filled by rollups.py) and the indexes it scans."""
+    Base.metadata.create_all(bind=engine, tables=[DailyStat.__table__, DailyRevenue.__table__])
+    for table_name, index_name, columns in ROLLUP_INDEXES:
+        create_index_online(engine, table_name, index_name, columns)
+
+
+@migration(5, "admin_keyset_indexes")
+def _admin_keyset_indexes(engine: Engine):
+    """
+    (timestamp, id) indexes for the keyset-paginated admin lists. A cursor
+    can't point at a NULL timestamp, so legacy NULLs get the epoch and sort
+    as the oldest rows. ix_users_joined_id replaces
+    ix_users_joined_at (its prefix).
+    """
+    epoch = datetime(1970, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET joined_at = :epoch WHERE joined_at IS NULL"), {"epoch": epoch})
+        conn.execute(text("UPDATE payments SET created_at = :epoch WHERE created_at IS NULL"), {"epoch": epoch})
+    for table_name, index_name, columns in KEYSET_INDEXES:
+        create_index_online(engine, table_name, index_name, columns)
+    drop_index_online(engine, "ix_users_joined_at")
+
+
+@migration(6, "referral_list_index")
+def _referral_list_index(engine: Engine):
+    """Keyset index for a referrer's invite list; NULL timestamps get the epoch as in migration 5."""
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE referrals SET created_at = :epoch WHERE created_at IS NULL"), {"epoch": datetime(1970, 1, 1)})
+    create_index_online(engine, *REFERRAL_LIST_INDEX)
+
+
+@migration(7, "user_artist_stats")
+def _user_artist_stats(engine: Engine):
+    """Long-term per-artist totals that old user_track_events are compacted into (recommendations/retention.py)."""
+    Base.metadata.create_all(bind=engine, tables=[UserArtistStat.__table__])
+
+
+@migration(8, "user_taste")
+def _user_taste(engine: Engine):
+    """Materialized taste profiles (recommendations/taste.py); rows are built lazily from history on first use."""
+    Base.metadata.create_all(bind=engine, tables=[UserTaste.__table__])
+
+
+@migration(9, "lyrics_search_index")
+def _lyrics_search_index(engine: Engine):
+    """
+    Full-text index for cached lyrics (lyrics_search.py): a contentless FTS5
+    table on SQLite, a tsvector column with an online GIN index on PostgreSQL.
+    New lyrics are indexed as they're stored; existing ones by
+    scripts/rebuild_lyrics_search.py.
+    """
+    if _is_postgres(engine):
+        # Nullable without a default: a catalogue-only change, no table rewrite
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE lyrics ADD COLUMN IF NOT EXISTS {TSVECTOR_COLUMN} tsvector"))
+        create_index_online(engine, "lyrics", GIN_INDEX, (TSVECTOR_COLUMN,), using="GIN")
+    elif engine.dialect.name == "sqlite":
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    "title, artist, lyrics_text, content='', tokenize='unicode61 remove_diacritics 2')"
+                ))
+        except Exception as e:
+            print(f"⚠️ SQLite FTS5 not available, lyrics search disabled: {e}")
+            return
+    else:
+        return
+    print("ℹ️ Run scripts/rebuild_lyrics_search.py to index lyrics cached before this migration")
+
+
+def _ensure_migrations_table(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "name VARCHAR(200) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL)"
+        ))
+
+
+def applied_versions(engine: Optional[Engine] = None) -> Dict[int, datetime]:
+    engine = engine or default_engine
+    _ensure_migrations_table(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT version, applied_at FROM {MIGRATIONS_TABLE}")).all()
+    return {version: applied_at for version, applied_at in rows}
+
+
+def migration_status(engine: Optional[Engine] = None) -> List[Tuple[int, str, Optional[datetime]]]:
+    """(version, name, applied_at or None) for every known migration"""
+    applied = applied_versions(engine)
+    return [(version, name, applied.get(version)) for version, name, _ in MIGRATIONS]
+
+
+def run_migrations(engine: Optional[Engine] = None, target: Optional[int] = None) -> List[int]:
+    """
+    Apply pending migrations up to `target` (all if None).
+    Returns the versions applied by this call.
+    """
+    engine = engine or default_engine
+
+    lock_conn = None
+    if _is_postgres(engine):
+        lock_conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+    try:
+        applied = applied_versions(engine)
+        done = []
+        for version, name, func in MIGRATIONS:
+            if version in applied or (target is not None and version > target):
+                continue
+            print(f"🔧 Applying migration {version:04d}_{name}")
+            func(engine)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:v, :n, :t)"),
+                        {"v": version, "n": name, "t": datetime.utcnow()},
+                    )
+            except IntegrityError:
+                # Another process recorded it first (SQLite has no advisory lock)
+                pass
+            done.append(version)
+        return done
+    finally:
+        if lock_conn is not None:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            lock_conn.close()
@@ -0,0 +1,124 @@
+"""
+Keyset pagination for the admin lists.
+
+Pages are ordered by (timestamp DESC, id DESC) and continue from an opaque
+cursor holding the last row's (timestamp, id), so a deep page costs the same
+as the first one (no OFFSET). Totals come from a short-lived count cache, or
+from the planner's row estimate on large unfiltered PostgreSQL tables.
+Pages are streamed as JSON while rows are read.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Tuple
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Session
+
+PAGE_SIZE_MAX = 200
+COUNT_CACHE_TTL = int(os.getenv("ADMIN_COUNT_CACHE_TTL", "60"))
+# Unfiltered PostgreSQL tables above this size report pg_class.reltuples instead of COUNT(*)
+COUNT_ESTIMATE_MIN = int(os.getenv("ADMIN_COUNT_ESTIMATE_MIN", "10000"))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    raw = json.dumps([ts.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, row_id = json.loads(raw)
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception as e:
+        raise InvalidCursor(str(e))
+
+
+def keyset_before(ts_column, id_column, cursor: Tuple[datetime, int]):
+    """Rows after the cursor in (ts DESC, id DESC) order; a row-value comparison both backends index."""
+    return tuple_(ts_column, id_column) < tuple_(*cursor)
+
+
+class CountCache:
+    """Exact COUNT results per filter combination, kept for `ttl` seconds."""
+
+    def __init__(self, ttl: int = COUNT_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        # Sync endpoints run in the threadpool; the COUNT itself runs outside the lock
+        self._lock = threading.Lock()
+
+    def get(self, key: str, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[1] > now:
+            return entry[0]
+        value = compute()
+        with self._lock:
+            # Search filters make keys open-ended: drop expired ones while we're here
+            for stale in [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]:
+                del self._entries[stale]
+            self._entries[key] = (value, now + self.ttl)
+        return value
+
+    def invalidate(self, prefix: str = ""):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+
+count_cache = CountCache()
+
+
+def list_total(db: Session, table_name: str, key: str, count: Callable[[], int], filtered: bool) -> Tuple[int, bool]:
+    """
+    Total for a list header.
+
+    Returns:
+        (total, exact) — exact is False for a planner estimate
+    """
+    if not filtered and db.bind.dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"), {"name": table_name}
+        ).scalar()
+        if estimate is not None and estimate >= COUNT_ESTIMATE_MIN:
+            return int(estimate), False
+    return count_cache.get(key, count), True
+
+
+def stream_page(
+    items_key: str,
+    rows: Iterator[Tuple[str, Tuple[datetime, int]]],
+    limit: int,
+    extra: Dict,
+) -> Iterator[str]:
+    """
+    Stream {items_key: [...], "next_cursor": ..., **extra} as JSON.
+
+    Args:
+        rows: (item JSON, (ts, id)) for up to limit + 1 rows; the extra row
+              only tells that another page exists
+    """
+    yield '{"' + items_key + '":['
+    last_key = None
+    next_cursor = None
+    try:
+        for n, (item_json, sort_key) in enumerate(rows):
+            if n == limit:
+                next_cursor = encode_cursor(*last_key)
+                break
+            yield ("," if n else "") + item_json
+            last_key = sort_key
+    finally:
+        rows.close()
+    yield "]," + json.dumps({"next_cursor": next_cursor, **extra})[1:]
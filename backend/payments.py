@@ -5,8 +5,10 @@ import secrets
 
 try:
     from backend.database import User, Payment
+    from backend.referrals import invalidate_referrer
 except ImportError:
     from database import User, Payment
+    from referrals import invalidate_referrer
 
 STARS_PRODUCTS = {
     "month": {
@@ -124,6 +126,7 @@ def activate_premium_for_payment(db: Session, payment: Payment, payment_method:
             referral.reward_given = True
             referral.completed_at = now
             db.commit()
+            invalidate_referrer(referral.referrer_id)
 
     return True
 
@@ -208,6 +211,7 @@ def grant_premium_after_payment(db: Session, user_id: int, plan: str, payment_me
                 referral.completed_at = now
                 
                 db.commit()
+                invalidate_referrer(referral.referrer_id)
                 print(f"✅ Referral reward granted to {referral.referrer_id} ({plan})")
                 
                 # Возвращаем данные для отправки уведомления
@@ -0,0 +1,63 @@
+"""
+Background jobs that run a blocking function every N seconds.
+
+Used for database maintenance (daily rollups, event retention). The
+function runs in a worker thread, so it may use its own SessionLocal and
+take its time without blocking the event loop.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+
+class PeriodicJob:
+    """Runs func() every `interval` seconds (0 = disabled) from start() until close()."""
+
+    def __init__(self, name: str, func: Callable[[], Optional[int]], interval: int):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "runs": 0,
+            "errors": 0,
+            "processed": 0,
+            "last_run_at": None,
+            "last_duration_ms": None,
+        }
+
+    def start(self):
+        # Started from the lifespan, inside the event loop
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """Run the job now; returns what func() reported as processed (0 on error)."""
+        started = time.perf_counter()
+        processed = 0
+        try:
+            processed = await asyncio.to_thread(self.func) or 0
+            self._stats["processed"] += processed
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ Periodic job {self.name} failed: {e}")
+        self._stats["runs"] += 1
+        self._stats["last_run_at"] = datetime.utcnow().isoformat()
+        self._stats["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return processed
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {"name": self.name, "interval": self.interval, **self._stats}
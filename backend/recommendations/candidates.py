@@ -1,15 +1,101 @@
 """
 Candidate generation for recommendations.
 Uses existing HitmoParser to search for tracks similar to user taste profile.
+
+Seed searches run concurrently (at most REC_SEED_CONCURRENCY at a time per
+request) under one REC_CANDIDATE_DEADLINE: seeds that haven't answered by
+then are cancelled and the request goes on with what arrived.
+
+Tracks other users play next to the user's recent ones come from the
+offline co-occurrence index (recommendations/cooccurrence.py) without any
+upstream request.
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import asyncio
+import os
 import random
+import time
 
 try:
     from backend.hitmo_parser_light import HitmoParser
+    from backend.recommendations.cooccurrence import cooccurrence_index
 except ImportError:
     from hitmo_parser_light import HitmoParser
+    from recommendations.cooccurrence import cooccurrence_index
+
+SEED_CONCURRENCY = int(os.getenv("REC_SEED_CONCURRENCY", "3"))
+CANDIDATE_DEADLINE = float(os.getenv("REC_CANDIDATE_DEADLINE", "4"))
+# Seed searches per personal request
+PERSONAL_SEEDS = 5
+# Recent tracks used as co-occurrence seeds, and neighbors taken from the index
+COOCCURRENCE_SEEDS = 20
+COOCCURRENCE_CANDIDATES = 40
+
+
+async def fetch_seeds(
+    parser: HitmoParser,
+    seeds: List[Tuple[str, str, int, int]],
+    user_agent: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[List[Tuple[str, List[Dict]]], List[Dict]]:
+    """
+    Run seed searches concurrently within a deadline.
+
+    Args:
+        seeds: (query, source, limit, page) per search
+
+    Returns:
+        ([(source, tracks)] of seeds that answered in time, in seed order,
+         [{query, source, status, ms, tracks}] per seed; ms is None for seeds still queued at the deadline)
+    """
+    concurrency = concurrency or SEED_CONCURRENCY
+    deadline = CANDIDATE_DEADLINE if deadline is None else deadline
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    timings = [{"query": q, "source": source, "status": "timeout", "ms": None, "tracks": 0} for q, source, _, _ in seeds]
+
+    async def run(index: int, query: str, limit: int, page: int) -> List[Dict]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                batch = await parser.search(query, limit=limit, page=page, user_agent=user_agent) or []
+                timings[index].update(status="ok" if batch else "empty", tracks=len(batch))
+            except asyncio.CancelledError:
+                # Deadline: report how long it had been running
+                timings[index]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+                raise
+            except Exception:
+                batch = []
+                timings[index]["status"] = "error"
+            timings[index]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return batch
+
+    tasks = [
+        asyncio.create_task(run(i, query, limit, page), name=f"seed:{source}")
+        for i, (query, source, limit, page) in enumerate(seeds)
+    ]
+    if not tasks:
+        return [], timings
+
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+    finally:
+        # Deadline, or the caller was cancelled (client gone, pool worker shut down):
+        # no search may outlive this call
+        unfinished = [task for task in tasks if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            await asyncio.gather(*unfinished, return_exceptions=True)
+    if pending:
+        print(f"⏱️ Candidate deadline ({deadline:g}s): dropped {len(pending)} of {len(tasks)} seeds")
+
+    results = [
+        (seeds[i][1], task.result())
+        for i, task in enumerate(tasks)
+        if task in done and task.result()
+    ]
+    return results, timings
 
 
 async def generate_personal_candidates(
@@ -17,6 +103,8 @@ async def generate_personal_candidates(
     taste_profile: Dict,
     limit: int = 120,
     user_agent: Optional[str] = None,
+    debug: Optional[Dict] = None,
+    seeds: int = PERSONAL_SEEDS,
 ) -> List[Dict]:
     """
     Generate recommendation candidates from taste profile.
@@ -24,6 +112,11 @@ async def generate_personal_candidates(
       - 60% from top artists
       - 25% from liked artists broader search
       - 15% exploration (random related queries)
+      plus tracks co-listened with the recent ones (local index, no upstream request)
+
+    Args:
+        debug: if given, gets "seeds": per-seed status and latency, "co_listen": index candidates
+        seeds: how many seed searches to run
     """
     top_artists = taste_profile.get("top_artists", [])
     liked_artists = taste_profile.get("liked_artists", [])
@@ -62,20 +155,22 @@ async def generate_personal_candidates(
         seed_queries.append((q, "exploration", 8, random.randint(1, 3)))
 
     random.shuffle(seed_queries)
-    active_seeds = seed_queries[:5]
-
-    for query, source, query_limit, page in active_seeds:
-        try:
-            batch = await parser.search(query, limit=query_limit, page=page, user_agent=user_agent)
-        except Exception:
-            batch = []
-        if not batch:
-            continue
+    active_seeds = seed_queries[:seeds]
+
+    co_listened = cooccurrence_index.similar(
+        signatures=recent_signatures[:COOCCURRENCE_SEEDS], limit=COOCCURRENCE_CANDIDATES
+    )
+    results, timings = await fetch_seeds(parser, active_seeds, user_agent=user_agent)
+    if debug is not None:
+        debug["seeds"] = timings
+        debug["co_listen"] = len(co_listened)
+
+    for source, batch in [(None, co_listened)] + results:
         for track in batch:
             url = track.get("url", "")
             if url and url not in seen_urls:
                 seen_urls.add(url)
-                track["candidate_source"] = source
+                track["candidate_source"] = source or track["candidate_source"]
                 candidates.append(track)
 
     random.shuffle(candidates)
@@ -101,10 +196,10 @@ async def generate_radio_candidates(
     candidates: List[Dict] = []
     seen_urls: set = set()
 
-    tasks = [
-        parser.search(seed_artist, limit=15, page=1, user_agent=user_agent),
-        parser.search(seed_title, limit=10, page=1, user_agent=user_agent),
-        parser.search(f"{seed_artist} {seed_title}", limit=10, page=1, user_agent=user_agent),
+    seeds = [
+        (seed_artist, "radio_seed", 15, 1),
+        (seed_title, "radio_seed", 10, 1),
+        (f"{seed_artist} {seed_title}", "radio_seed", 10, 1),
     ]
 
     # Add a taste-based query if available
@@ -112,14 +207,11 @@ async def generate_radio_candidates(
         top = taste_profile.get("top_artists", [])
         extra_artists = [a for a in top if a.lower() != seed_artist.lower()]
         if extra_artists:
-            tasks.append(
-                parser.search(extra_artists[0], limit=10, page=1, user_agent=user_agent)
-            )
-
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    for batch in results:
-        if isinstance(batch, Exception) or not batch:
-            continue
+            seeds.append((extra_artists[0], "radio_seed", 10, 1))
+
+    co_listened = cooccurrence_index.similar(tracks=[(seed_artist, seed_title)], limit=limit)
+    results, _ = await fetch_seeds(parser, seeds, user_agent=user_agent, concurrency=len(seeds))
+    for _, batch in [("radio_seed", co_listened)] + results:
         for track in batch:
             url = track.get("url", "")
             if url and url not in seen_urls:
@@ -0,0 +1,314 @@
+"""
+Item-item co-occurrence model built offline from listening sessions.
+
+A batch job (scripts/build_cooccurrence.py, or the optional periodic job)
+reads positive events of the last REC_COOCCURRENCE_DAYS days from
+user_track_events, splits each user's history into sessions (a new client
+session_id or a gap of more than SESSION_GAP_MINUTES starts one) and counts how often two tracks
+are played within WINDOW positions of each other. Pair counts are
+normalized by the tracks' session counts (cosine), and the top
+REC_COOCCURRENCE_TOP_K neighbors of every track are written to a gzipped
+JSON index:
+
+    {"built_at", "days", "items": [[track_id, artist, title, duration, url, image], ...],
+     "neighbors": [[[item, score], ...] per item]}
+
+Tracks are identified by their signature (artist|||title|||duration), the
+same key taste profiles and filters use. Played events carry the audio URL
+and cover, so neighbors can be served as candidates without any upstream
+request. Each worker loads the file in a background thread and picks up a
+rebuilt one by its mtime; requests only do dict lookups on the loaded copy.
+"""
+
+import gzip
+import json
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import SessionLocal
+    from backend.recommendations.models import UserTrackEvent
+    from backend.recommendations.signals import track_signature
+except ImportError:
+    from database import SessionLocal
+    from recommendations.models import UserTrackEvent
+    from recommendations.signals import track_signature
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INDEX_PATH = os.getenv("REC_COOCCURRENCE_PATH", os.path.join(BACKEND_DIR, "data", "cooccurrence.json.gz"))
+COOCCURRENCE_DAYS = int(os.getenv("REC_COOCCURRENCE_DAYS", "60"))
+TOP_K = int(os.getenv("REC_COOCCURRENCE_TOP_K", "30"))
+MIN_COUNT = int(os.getenv("REC_COOCCURRENCE_MIN_COUNT", "2"))
+BUILD_INTERVAL = int(os.getenv("REC_COOCCURRENCE_INTERVAL_SECONDS", "0"))  # 0 = only the script builds it
+
+POSITIVE_EVENT_TYPES = ("play", "complete", "like", "playlist_add", "search_select")
+SESSION_GAP_MINUTES = 30
+# Neighbors are counted within this many positions of a session, longer sessions are cut
+WINDOW = 5
+MAX_SESSION_LENGTH = 200
+# How often a worker checks the index file for a newer build (the reload job's interval)
+RELOAD_CHECK_SECONDS = 60
+
+CANDIDATE_SOURCE = "co_listen"
+
+
+# --- Build ---
+
+def _sessions(db: Session, since: datetime) -> Iterable[List[str]]:
+    """Yield each listening session as a list of track signatures, in play order."""
+    rows = (
+        db.query(UserTrackEvent.user_id, UserTrackEvent.session_id, UserTrackEvent.artist,
+                 UserTrackEvent.title, UserTrackEvent.duration, UserTrackEvent.created_at)
+        .filter(UserTrackEvent.created_at >= since, UserTrackEvent.event_type.in_(POSITIVE_EVENT_TYPES))
+        .order_by(UserTrackEvent.user_id, UserTrackEvent.created_at)
+        .yield_per(5000)
+    )
+    gap = timedelta(minutes=SESSION_GAP_MINUTES)
+    session: List[str] = []
+    last_user, last_session, last_at = None, None, None
+    for user_id, session_id, artist, title, duration, created_at in rows:
+        if (
+            user_id != last_user
+            or (session_id and last_session and session_id != last_session)
+            or (last_at is not None and created_at - last_at > gap)
+        ):
+            if len(session) > 1:
+                yield session
+            session = []
+        last_user, last_session, last_at = user_id, session_id, created_at
+        sig = track_signature(artist, title, duration)
+        # play + complete + like of one listen count once
+        if not session or session[-1] != sig:
+            if len(session) < MAX_SESSION_LENGTH:
+                session.append(sig)
+    if len(session) > 1:
+        yield session
+
+
+def _track_metadata(db: Session, since: datetime, wanted: set) -> Dict[str, Tuple]:
+    """{signature: (track_id, artist, title, duration, url, image)} from the latest playable event of each track"""
+    meta: Dict[str, Tuple] = {}
+    rows = (
+        db.query(UserTrackEvent.track_id, UserTrackEvent.artist, UserTrackEvent.title,
+                 UserTrackEvent.duration, UserTrackEvent.audio_url, UserTrackEvent.cover_url)
+        .filter(UserTrackEvent.created_at >= since, UserTrackEvent.audio_url.isnot(None),
+                UserTrackEvent.event_type.in_(POSITIVE_EVENT_TYPES))
+        .order_by(UserTrackEvent.created_at)
+        .yield_per(5000)
+    )
+    for track_id, artist, title, duration, url, image in rows:
+        sig = track_signature(artist, title, duration)
+        if sig in wanted:
+            meta[sig] = (track_id, artist, title, duration or 0, url, image or "")
+    return meta
+
+
+def build_index(db: Session, days: int = COOCCURRENCE_DAYS, top_k: int = TOP_K, min_count: int = MIN_COUNT) -> Dict:
+    """
+    Count co-occurrences over the last `days` days and keep the top_k neighbors per track.
+
+    Returns:
+        The index dict (see the module docstring)
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+
+    # Two streaming passes over the events instead of holding every session in memory.
+    # First: in how many sessions each track occurs
+    session_counts: Dict[str, int] = defaultdict(int)
+    sessions = 0
+    for session in _sessions(db, since):
+        sessions += 1
+        for sig in set(session):
+            session_counts[sig] += 1
+    # Tracks heard in fewer than min_count sessions can't reach min_count pairs
+    frequent = {sig for sig, count in session_counts.items() if count >= min_count}
+
+    # Second: pair counts among the frequent tracks
+    pairs: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for session in _sessions(db, since):
+        session = [sig for sig in session if sig in frequent]
+        for i, a in enumerate(session):
+            for b in session[i + 1:i + 1 + WINDOW]:
+                if a != b:
+                    pairs[a][b] += 1
+                    pairs[b][a] += 1
+
+    meta = _track_metadata(db, since, set(pairs))
+    neighbors: Dict[str, List[Tuple[str, float]]] = {}
+    for a, counts in pairs.items():
+        if a not in meta:
+            continue
+        scored = [
+            (b, count / math.sqrt(session_counts[a] * session_counts[b]))
+            for b, count in counts.items()
+            if count >= min_count and b in meta
+        ]
+        if scored:
+            scored.sort(key=lambda x: x[1], reverse=True)
+            neighbors[a] = scored[:top_k]
+
+    # Items referenced anywhere get an integer id; the file stores ids, not signatures
+    ids: Dict[str, int] = {}
+    for a, scored in neighbors.items():
+        for sig in [a] + [b for b, _ in scored]:
+            ids.setdefault(sig, len(ids))
+    items = [None] * len(ids)
+    for sig, item_id in ids.items():
+        items[item_id] = list(meta[sig])
+    neighbor_lists: List[List] = [[] for _ in items]
+    for a, scored in neighbors.items():
+        neighbor_lists[ids[a]] = [[ids[b], round(score, 4)] for b, score in scored]
+
+    return {
+        "built_at": datetime.utcnow().isoformat(),
+        "days": days,
+        "sessions": sessions,
+        "items": items,
+        "neighbors": neighbor_lists,
+    }
+
+
+def write_index(index: Dict, path: str = INDEX_PATH):
+    """Write atomically: readers see the old file or the new one, never half of it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def run_build(path: str = INDEX_PATH) -> int:
+    """
+    Build and write the index in its own session, then load it into this
+    worker; returns the number of tracks with neighbors.
+    """
+    db = SessionLocal()
+    try:
+        index = build_index(db)
+    finally:
+        db.close()
+    write_index(index, path)
+    with_neighbors = sum(1 for n in index["neighbors"] if n)
+    print(f"🔗 Co-occurrence index: {with_neighbors} tracks with neighbors from {index['sessions']} sessions")
+    if path == cooccurrence_index.path:
+        cooccurrence_index.reload_if_changed()
+    return with_neighbors
+
+
+# --- Lookup ---
+
+class _LoadedIndex:
+    """One parsed index file; replaced as a whole, never modified"""
+
+    __slots__ = ("items", "neighbors", "by_sig", "by_track", "built_at", "mtime")
+
+    def __init__(self, index: Dict, mtime: float):
+        self.items: List[List] = index["items"]
+        self.neighbors: List[List] = index["neighbors"]
+        self.by_sig: Dict[str, int] = {
+            track_signature(artist, title, duration): i
+            for i, (_, artist, title, duration, _, _) in enumerate(self.items)
+        }
+        # Radio seeds come without a reliable duration
+        self.by_track: Dict[str, int] = {
+            f"{artist.lower().strip()}|||{title.lower().strip()}": i
+            for i, (_, artist, title, _, _, _) in enumerate(self.items)
+        }
+        self.built_at: Optional[str] = index.get("built_at")
+        self.mtime = mtime
+
+
+class CooccurrenceIndex:
+    """
+    Read side of the index file.
+
+    Loading (gunzip, JSON, lookup dicts) is blocking work: reload_if_changed()
+    runs in a worker thread (the periodic reload job, or the build job right
+    after writing) and swaps the new index in with one assignment. similar()
+    and get_stats() only read the current index, so they're safe on the
+    event loop.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self._index: Optional[_LoadedIndex] = None
+
+    def reload_if_changed(self) -> int:
+        """Load the file if it's newer than the loaded index; returns the number of tracks loaded (0 if unchanged)."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return 0
+        current = self._index
+        if current is not None and current.mtime == mtime:
+            return 0
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                loaded = _LoadedIndex(json.load(f), mtime)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Could not load co-occurrence index {self.path}: {e}")
+            return 0
+        self._index = loaded
+        print(f"🔗 Loaded co-occurrence index ({len(loaded.items)} tracks, built {loaded.built_at})")
+        return len(loaded.items)
+
+    @staticmethod
+    def _track(index: _LoadedIndex, item_id: int, score: float) -> Dict:
+        track_id, artist, title, duration, url, image = index.items[item_id]
+        return {
+            "id": track_id,
+            "title": title,
+            "artist": artist,
+            "duration": duration,
+            "url": url,
+            "image": image,
+            "candidate_source": CANDIDATE_SOURCE,
+            "_cooccurrence": score,
+        }
+
+    def similar(self, signatures: Iterable[str] = (), tracks: Iterable[Tuple[str, str]] = (), limit: int = 30) -> List[Dict]:
+        """
+        Tracks most often played next to the given ones, summed over all seeds
+        (empty until an index has been loaded).
+
+        Args:
+            signatures: seed track signatures (artist|||title|||duration)
+            tracks: seed (artist, title) pairs, matched without duration
+        """
+        index = self._index
+        if index is None:
+            return []
+        seeds = {index.by_sig[sig] for sig in signatures if sig in index.by_sig}
+        for artist, title in tracks:
+            item_id = index.by_track.get(f"{artist.lower().strip()}|||{title.lower().strip()}")
+            if item_id is not None:
+                seeds.add(item_id)
+        if not seeds:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for seed in seeds:
+            for item_id, score in index.neighbors[seed]:
+                if item_id not in seeds:
+                    scores[item_id] += score
+        best = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:limit]
+        return [self._track(index, item_id, score) for item_id, score in best]
+
+    def get_stats(self) -> Dict:
+        index = self._index
+        return {
+            "path": self.path,
+            "loaded": index is not None,
+            "built_at": index.built_at if index else None,
+            "tracks": len(index.items) if index else 0,
+            "tracks_with_neighbors": sum(1 for n in index.neighbors if n) if index else 0,
+        }
+
+
+cooccurrence_index = CooccurrenceIndex()
@@ -0,0 +1,106 @@
+"""
+Server-side pagination state for recommendation feeds.
+
+The cursor used to carry every served track signature joined by
+`|||SEP|||`, so each page made the next request's URL longer. Now the
+client gets a short opaque token; the signatures it stands for stay here,
+and one scroll keeps one token for its whole life. Request size and the
+cost of resolving a cursor are the same on page 1 and page 100.
+
+State is per process and expires after REC_CURSOR_TTL of inactivity. An
+unknown token (expired, or served by another worker) just starts a fresh
+exclusion set: the feed may repeat a track, it doesn't fail.
+"""
+
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import AbstractSet, Dict, Iterable, Optional, Tuple
+
+try:
+    from backend.recommendations.scoring import candidate_signature
+except ImportError:
+    from recommendations.scoring import candidate_signature
+
+CURSOR_TTL = int(os.getenv("REC_CURSOR_TTL", "1800"))
+CURSOR_STATES = int(os.getenv("REC_CURSOR_STATES", "20000"))
+# Oldest signatures are forgotten past this, so a very deep scroll stays bounded
+MAX_EXCLUDED = 2000
+
+LEGACY_SEPARATOR = "|||SEP|||"
+
+
+class CursorStore:
+    """
+    {token: (served signatures in insertion order, expires_at)}, LRU-bounded.
+
+    Only touched from the event loop (the recommendation endpoints are async).
+    """
+
+    def __init__(self, ttl: int = CURSOR_TTL, max_states: int = CURSOR_STATES, max_excluded: int = MAX_EXCLUDED):
+        self.ttl = ttl
+        self.max_states = max_states
+        self.max_excluded = max_excluded
+        self._states: "OrderedDict[str, Tuple[Dict[str, None], float]]" = OrderedDict()
+        self._stats = {"created": 0, "resolved": 0, "unknown": 0, "legacy": 0, "evictions": 0}
+
+    def _state(self, token: Optional[str]) -> Optional[Dict[str, None]]:
+        entry = self._states.get(token) if token else None
+        if entry is None:
+            return None
+        served, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._states[token]
+            return None
+        return served
+
+    def load(self, cursor: Optional[str]) -> AbstractSet[str]:
+        """Signatures already served under this cursor (empty for a first page or an unknown token)."""
+        if not cursor:
+            return frozenset()
+        if "|||" in cursor:
+            # Cursor from a client that predates tokens
+            self._stats["legacy"] += 1
+            return frozenset(cursor.split(LEGACY_SEPARATOR)[-self.max_excluded:])
+        served = self._state(cursor)
+        if served is None:
+            self._stats["unknown"] += 1
+            return frozenset()
+        self._stats["resolved"] += 1
+        return served.keys()
+
+    def save(self, cursor: Optional[str], excluded: Iterable[str], results: Iterable[Dict]) -> str:
+        """
+        Record the tracks of a served page; returns the token for the next page
+        (the same one while its state is alive).
+
+        Args:
+            excluded: what load() returned for `cursor`
+        """
+        served = self._state(cursor)
+        token = cursor
+        if served is None:
+            token = secrets.token_urlsafe(12)
+            served = dict.fromkeys(excluded)
+            self._stats["created"] += 1
+
+        for r in results:
+            served[candidate_signature(r)] = None
+        overflow = len(served) - self.max_excluded
+        if overflow > 0:
+            for sig in list(served)[:overflow]:
+                del served[sig]
+
+        self._states[token] = (served, time.monotonic() + self.ttl)
+        self._states.move_to_end(token)
+        while len(self._states) > self.max_states:
+            self._states.popitem(last=False)
+            self._stats["evictions"] += 1
+        return token
+
+    def get_stats(self) -> Dict:
+        return {"states": len(self._states), "ttl": self.ttl, **self._stats}
+
+
+cursor_store = CursorStore()
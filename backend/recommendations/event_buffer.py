@@ -0,0 +1,247 @@
+"""
+Write-behind buffer for track events.
+
+The player posts play/pause/skip events constantly, so /events only
+validates them and appends the rows to an in-memory buffer; the request is
+answered right away. A background flusher writes the buffer in batches
+every REC_EVENT_FLUSH_MS or as soon as REC_EVENT_BATCH_SIZE rows are
+waiting: COPY on PostgreSQL, one multi-row Core INSERT elsewhere.
+
+The buffer is bounded: when the database can't keep up, new events are
+dropped (and counted) instead of growing memory. Events still buffered when
+the process is killed without a clean shutdown are lost; they're behavioral
+signals, not records anyone is billed for.
+
+After a batch is written, its events are applied to the users' taste
+profiles (recommendations/taste.py) in a second transaction. A failed taste
+update doesn't retry the batch (the events are already stored); the
+profiles just miss those events. Users whose taste changed get their
+candidate pool (recommendations/pools.py) refilled in the background.
+"""
+
+import asyncio
+import csv
+import io
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import engine as default_engine
+    from backend.recommendations.models import UserTrackEvent
+    from backend.recommendations.pools import candidate_pools
+    from backend.recommendations.schemas import TrackEventIn
+    from backend.recommendations.signals import validate_events
+    from backend.recommendations.taste import update_tastes
+except ImportError:
+    from database import engine as default_engine
+    from recommendations.models import UserTrackEvent
+    from recommendations.pools import candidate_pools
+    from recommendations.schemas import TrackEventIn
+    from recommendations.signals import validate_events
+    from recommendations.taste import update_tastes
+
+FLUSH_INTERVAL_MS = int(os.getenv("REC_EVENT_FLUSH_MS", "500"))
+BATCH_SIZE = int(os.getenv("REC_EVENT_BATCH_SIZE", "500"))
+MAX_BUFFERED = int(os.getenv("REC_EVENT_BUFFER_SIZE", "20000"))
+
+_COLUMNS = [c.name for c in UserTrackEvent.__table__.columns if c.name != "id"]
+_COPY_NULL = "\\N"
+
+
+def _copy_rows(engine: Engine, rows: List[Dict]):
+    """COPY rows into user_track_events (PostgreSQL, psycopg2)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([_COPY_NULL if row.get(c) is None else row[c] for c in _COLUMNS])
+    buf.seek(0)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.copy_expert(
+            f"COPY {UserTrackEvent.__tablename__} ({', '.join(_COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')",
+            buf,
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def write_event_rows(engine: Engine, rows: List[Dict]):
+    if not rows:
+        return
+    if engine.dialect.name == "postgresql":
+        _copy_rows(engine, rows)
+    else:
+        with engine.begin() as conn:
+            conn.execute(UserTrackEvent.__table__.insert(), rows)
+
+
+def update_event_tastes(engine: Engine, rows: List[Dict]) -> int:
+    """Apply written rows to taste profiles in their own session; returns users updated."""
+    with Session(bind=engine) as db:
+        return update_tastes(db, rows)
+
+
+class EventBuffer:
+    """Bounded in-memory queue of event rows with a periodic batch flusher."""
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        batch_size: int = BATCH_SIZE,
+        max_buffered: int = MAX_BUFFERED,
+    ):
+        self.engine = engine or default_engine
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+
+        self._rows: Deque[Dict] = deque()
+        # submit() runs in threadpool workers, the flusher on the event loop
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._stats = {
+            "accepted": 0,
+            "written": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "taste_updates": 0,
+            "failed_taste_updates": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the flusher; called from the lifespan, inside the event loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, user_id: int, events: List[TrackEventIn]) -> int:
+        """
+        Validate and buffer events; returns how many were accepted.
+        Without a running flusher (scripts, tests) the rows are written right away.
+        """
+        rows = validate_events(user_id, events)
+        if not rows:
+            return 0
+        if not self.running:
+            write_event_rows(self.engine, rows)
+            self._stats["accepted"] += len(rows)
+            self._stats["written"] += len(rows)
+            self._update_tastes(rows)
+            return len(rows)
+
+        with self._lock:
+            room = self.max_buffered - len(self._rows)
+            taken = rows[:max(room, 0)]
+            self._rows.extend(taken)
+            self._stats["accepted"] += len(taken)
+            self._stats["dropped"] += len(rows) - len(taken)
+            pending = len(self._rows)
+
+        if pending >= self.batch_size:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return len(taken)
+
+    def _take_batch(self) -> List[Dict]:
+        with self._lock:
+            count = min(self.batch_size, len(self._rows))
+            return [self._rows.popleft() for _ in range(count)]
+
+    def _requeue(self, batch: List[Dict]):
+        # Put a failed batch back in front, as far as the bound allows
+        with self._lock:
+            room = self.max_buffered - len(self._rows)
+            keep = batch[:max(room, 0)]
+            self._rows.extendleft(reversed(keep))
+            self._stats["dropped"] += len(batch) - len(keep)
+
+    def _update_tastes(self, batch: List[Dict]):
+        try:
+            self._stats["taste_updates"] += update_event_tastes(self.engine, batch)
+        except Exception as e:
+            self._stats["failed_taste_updates"] += 1
+            print(f"⚠️ Taste update failed ({len(batch)} events not applied): {e}")
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns rows written."""
+        written = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return written
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(write_event_rows, self.engine, batch)
+            except Exception as e:
+                self._stats["failed_flushes"] += 1
+                self._requeue(batch)
+                print(f"⚠️ Event flush failed ({len(batch)} rows kept for retry): {e}")
+                return written
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            written += len(batch)
+            self._stats["written"] += len(batch)
+            self._stats["flushes"] += 1
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+            self._stats["last_flush_ms"] = round(elapsed_ms, 2)
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], round(elapsed_ms, 2))
+            self._stats["total_flush_ms"] += elapsed_ms
+            await asyncio.to_thread(self._update_tastes, batch)
+            candidate_pools.notify_events({row["user_id"] for row in batch})
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def close(self):
+        """Stop the flusher and write what's left."""
+        if self._task is not None:
+            # Let an in-flight batch finish instead of cancelling it mid-write
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self._stats)
+        flushes = stats.pop("total_flush_ms")
+        stats["avg_flush_ms"] = round(flushes / stats["flushes"], 2) if stats["flushes"] else 0.0
+        stats["buffered"] = len(self._rows)
+        stats["flush_interval_ms"] = int(self.flush_interval * 1000)
+        stats["batch_size"] = self.batch_size
+        return stats
+
+
+event_buffer = EventBuffer()
@@ -2,13 +2,18 @@
 Post-filters for recommendation candidates.
 Handles deduplication, recent-repeat suppression, and quality checks.
 """
-from typing import List, Dict, Set, Optional
+from typing import AbstractSet, List, Dict, Set, Optional
+
+try:
+    from backend.recommendations.scoring import candidate_signature
+except ImportError:
+    from recommendations.scoring import candidate_signature
 
 
 def filter_candidates(
     candidates: List[Dict],
     recent_played_urls: List[str],
-    excluded_signatures: Optional[Set[str]] = None,
+    excluded_signatures: Optional[AbstractSet[str]] = None,
     max_same_artist: int = 2,
     limit: int = 20,
 ) -> List[Dict]:
@@ -26,9 +31,6 @@ def filter_candidates(
 
     for c in candidates:
         url = c.get("url", "")
-        artist = c.get("artist", "").lower().strip()
-        title = c.get("title", "").lower().strip()
-        duration = c.get("duration", 0)
 
         # Skip empty URL
         if not url:
@@ -42,8 +44,8 @@ def filter_candidates(
         if url in recent_urls_set:
             continue
 
-        # Build signature
-        sig = f"{artist}|||{title}|||{duration}"
+        # Signature (precomputed by scoring)
+        sig = candidate_signature(c)
 
         # Skip excluded signatures (cursor-based pagination)
         if sig in excluded_sigs:
@@ -54,6 +56,9 @@ def filter_candidates(
             continue
 
         # Limit same artist
+        artist = c.get("_artist_key")
+        if artist is None:
+            artist = c.get("artist", "").lower().strip()
         count = artist_counts.get(artist, 0)
         if count >= max_same_artist:
             continue
@@ -72,23 +77,3 @@ def filter_candidates(
 
     return result
 
-
-def build_cursor_from_results(results: List[Dict]) -> str:
-    """
-    Build a cursor string from result signatures for pagination.
-    The cursor encodes which tracks have already been served.
-    """
-    sigs = []
-    for r in results:
-        artist = r.get("artist", "").lower().strip()
-        title = r.get("title", "").lower().strip()
-        duration = r.get("duration", 0)
-        sigs.append(f"{artist}|||{title}|||{duration}")
-    return "|||SEP|||".join(sigs)
-
-
-def parse_cursor(cursor: Optional[str]) -> Set[str]:
-    """Parse cursor back into a set of excluded signatures."""
-    if not cursor:
-        return set()
-    return set(cursor.split("|||SEP|||"))
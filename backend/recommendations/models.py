@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, JSON
 from datetime import datetime
 
 try:
@@ -26,3 +26,48 @@ class UserTrackEvent(Base):
     context_id = Column(String, nullable=True)
     session_id = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        # Taste profile / recent plays: WHERE user_id = ? [AND event_type IN (...)] ORDER BY created_at DESC
+        Index("ix_user_track_events_user_created", "user_id", "created_at"),
+        Index("ix_user_track_events_user_type_created", "user_id", "event_type", "created_at"),
+    )
+
+
+class UserArtistStat(Base):
+    """
+    Long-term per-user, per-artist totals of events that aged out of
+    user_track_events (see recommendations/retention.py).
+    """
+    __tablename__ = "user_artist_stats"
+
+    user_id = Column(Integer, primary_key=True)
+    artist_key = Column(String, primary_key=True)  # artist.lower().strip(), as in taste profiles
+    artist = Column(String, nullable=False)
+    plays = Column(Integer, default=0)
+    completes = Column(Integer, default=0)
+    skips = Column(Integer, default=0)
+    likes = Column(Integer, default=0)
+    score = Column(Float, default=0.0)  # sum of EVENT_WEIGHTS
+    first_event_at = Column(DateTime, nullable=True)
+    last_event_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class UserTaste(Base):
+    """
+    Materialized taste profile of a user, updated as events are ingested
+    (see recommendations/taste.py). Artist scores decay over time; they are
+    stored as of scores_at and decayed lazily on the next update or read.
+    """
+    __tablename__ = "user_taste"
+
+    user_id = Column(Integer, primary_key=True)
+    artist_scores = Column(JSON, nullable=False, default=dict)  # {artist_key: score}
+    liked_artists = Column(JSON, nullable=False, default=dict)  # {artist_key: last like, ISO}
+    recent_signatures = Column(JSON, nullable=False, default=list)  # ring buffer, newest first
+    skipped_signatures = Column(JSON, nullable=False, default=list)  # ring buffer, newest first
+    recent_urls = Column(JSON, nullable=False, default=list)  # played audio URLs, newest first
+    events = Column(Integer, default=0)  # events applied so far
+    scores_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
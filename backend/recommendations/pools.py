@@ -0,0 +1,183 @@
+"""
+Per-user candidate pools for personal recommendations.
+
+Generating candidates means several Hitmo searches (plus cover lookups), and
+every "load more" used to repeat them. Instead each active user gets a pool
+of already normalized and scored candidates that pages are cut from; a
+small worker pool refills it in the background when it runs low, gets
+stale, or the user's taste changed (new events were ingested).
+
+Pools live in this process only (LRU of REC_POOL_USERS users, each capped
+at REC_POOL_MAX_ITEMS best candidates). A worker without a pool for the user
+serves the first page live and keeps that result as the user's pool.
+
+Sizing: a candidate dict takes about 1 KB, so the defaults (500 users x 150
+candidates) hold at most ~75k candidates, ~75 MB per worker.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+POOL_TTL = int(os.getenv("REC_POOL_TTL", "1800"))
+POOL_LOW_WATER = int(os.getenv("REC_POOL_LOW_WATER", "40"))
+POOL_USERS = int(os.getenv("REC_POOL_USERS", "500"))
+POOL_MAX_ITEMS = int(os.getenv("REC_POOL_MAX_ITEMS", "150"))
+POOL_CONCURRENCY = int(os.getenv("REC_POOL_CONCURRENCY", "2"))
+POOL_QUEUE_SIZE = 1000
+# New events refresh a pool only once it is at least this old (a play arrives every few minutes)
+POOL_EVENT_REFRESH_AGE = 120
+
+# builder(user_id) -> scored candidates, or None when the user has no taste profile yet
+PoolBuilder = Callable[[int], Awaitable[Optional[List[Dict]]]]
+
+
+class CandidatePool:
+    """Scored candidates of one user, best first"""
+
+    __slots__ = ("items", "built_at")
+
+    def __init__(self, items: List[Dict]):
+        self.items = items
+        self.built_at = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.built_at
+
+    @property
+    def stale(self) -> bool:
+        return self.age >= POOL_TTL
+
+
+class CandidatePools:
+    """
+    LRU of candidate pools plus a bounded refill queue drained by a few workers.
+
+    Only touched from the event loop (async endpoints, the event flusher),
+    so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        builder: Optional[PoolBuilder] = None,
+        max_users: int = POOL_USERS,
+        max_items: int = POOL_MAX_ITEMS,
+        concurrency: int = POOL_CONCURRENCY,
+        queue_size: int = POOL_QUEUE_SIZE,
+    ):
+        self.builder = builder
+        self.max_users = max_users
+        self.max_items = max_items
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+
+        self._pools: "OrderedDict[int, CandidatePool]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending: Set[int] = set()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "refills": 0,
+            "refill_errors": 0,
+            "dropped": 0,
+            "evictions": 0,
+            "total_refill_ms": 0.0,
+        }
+
+    def set_builder(self, builder: PoolBuilder):
+        self.builder = builder
+
+    def get(self, user_id: int) -> Optional[CandidatePool]:
+        pool = self._pools.get(user_id)
+        if pool is None:
+            self._stats["misses"] += 1
+            return None
+        self._pools.move_to_end(user_id)
+        self._stats["hits"] += 1
+        return pool
+
+    def put(self, user_id: int, items: List[Dict]):
+        """Keep the best max_items of `items` (scored, best first) as the user's pool."""
+        self._pools[user_id] = CandidatePool(items[: self.max_items])
+        self._pools.move_to_end(user_id)
+        while len(self._pools) > self.max_users:
+            self._pools.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _ensure_workers(self):
+        # Created lazily so the pools can be built at import time, outside the event loop.
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def refresh(self, user_id: int) -> bool:
+        """Queue a background refill; False if one is already pending or the queue is full."""
+        if self.builder is None or user_id in self._pending:
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait(user_id)
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            return False
+        self._pending.add(user_id)
+        return True
+
+    def refreshing(self, user_id: int) -> bool:
+        return user_id in self._pending
+
+    def notify_events(self, user_ids: Iterable[int]):
+        """New events changed these users' tastes: refill their pools if this worker has one."""
+        for user_id in user_ids:
+            pool = self._pools.get(user_id)
+            if pool is not None and pool.age >= POOL_EVENT_REFRESH_AGE:
+                self.refresh(user_id)
+
+    async def _worker(self):
+        while True:
+            user_id = await self._queue.get()
+            started = time.perf_counter()
+            try:
+                items = await self.builder(user_id)
+                if items:
+                    self.put(user_id, items)
+                self._stats["refills"] += 1
+                self._stats["total_refill_ms"] += (time.perf_counter() - started) * 1000
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["refill_errors"] += 1
+                print(f"❌ Candidate pool refill failed for user {user_id}: {e}")
+            finally:
+                self._pending.discard(user_id)
+                self._queue.task_done()
+
+    async def join(self):
+        """Wait until every queued refill has been processed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def get_stats(self) -> Dict:
+        stats = dict(self._stats)
+        refill_ms = stats.pop("total_refill_ms")
+        stats["avg_refill_ms"] = round(refill_ms / stats["refills"], 1) if stats["refills"] else 0.0
+        stats["users"] = len(self._pools)
+        stats["candidates"] = sum(len(pool.items) for pool in self._pools.values())
+        stats["pending"] = len(self._pending)
+        stats["concurrency"] = self.concurrency
+        return stats
+
+
+candidate_pools = CandidatePools()
@@ -0,0 +1,310 @@
+"""
+Retention for user_track_events.
+
+Raw events are only read over short windows (taste profile: 30 days,
+recent plays, daily rollups), but the table grows with every play. Events
+older than EVENT_RETENTION_DAYS are rolled up into per-user, per-artist
+totals in `user_artist_stats` and then deleted in batches of
+EVENT_RETENTION_BATCH rows; each batch is aggregated and deleted in one
+transaction, so a crash never counts an event twice or loses it.
+
+On PostgreSQL the table can be partitioned by month
+(scripts/partition_events.py). Then whole expired months are aggregated
+with one INSERT ... SELECT and dropped instead of deleted row by row, and
+partitions for the next months are created ahead of time.
+"""
+
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import SessionLocal, engine as default_engine
+    from backend.recommendations.models import UserTrackEvent, UserArtistStat
+    from backend.recommendations.signals import EVENT_WEIGHTS
+except ImportError:
+    from database import SessionLocal, engine as default_engine
+    from recommendations.models import UserTrackEvent, UserArtistStat
+    from recommendations.signals import EVENT_WEIGHTS
+
+EVENT_RETENTION_DAYS = int(os.getenv("EVENT_RETENTION_DAYS", "90"))  # 0 = keep raw events forever
+EVENT_RETENTION_BATCH = int(os.getenv("EVENT_RETENTION_BATCH", "5000"))
+EVENT_RETENTION_INTERVAL = int(os.getenv("EVENT_RETENTION_INTERVAL_SECONDS", "3600"))  # 0 = job disabled
+# Monthly partitions created ahead of the current month
+PARTITION_MONTHS_AHEAD = 2
+
+EVENTS_TABLE = UserTrackEvent.__tablename__
+_PARTITION_RE = re.compile(rf"^{EVENTS_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+# Counter columns of user_artist_stats and the event type each one counts
+COUNTERS = {"plays": "play", "completes": "complete", "skips": "skip", "likes": "like"}
+
+
+def retention_cutoff(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Events created before this are compacted; None when retention is disabled."""
+    if EVENT_RETENTION_DAYS <= 0:
+        return None
+    return (now or datetime.utcnow()) - timedelta(days=EVENT_RETENTION_DAYS)
+
+
+def artist_key(artist: str) -> str:
+    # Same key as the taste profile
+    return artist.lower().strip()
+
+
+# --- Row batches (any database) ---
+
+def _aggregate(rows) -> Dict[Tuple[int, str], Dict]:
+    """{(user_id, artist_key): totals} for rows of (user_id, artist, event_type, created_at)"""
+    totals: Dict[Tuple[int, str], Dict] = {}
+    for user_id, artist, event_type, created_at in rows:
+        key = (user_id, artist_key(artist))
+        entry = totals.get(key)
+        if entry is None:
+            entry = totals[key] = {
+                "artist": artist, "plays": 0, "completes": 0, "skips": 0, "likes": 0, "score": 0.0,
+                "first_event_at": created_at, "last_event_at": created_at,
+            }
+        for column, counted_type in COUNTERS.items():
+            if event_type == counted_type:
+                entry[column] += 1
+        entry["score"] += EVENT_WEIGHTS.get(event_type, 0)
+        if created_at < entry["first_event_at"]:
+            entry["first_event_at"] = created_at
+        if created_at > entry["last_event_at"]:
+            entry["last_event_at"] = created_at
+            entry["artist"] = artist
+    return totals
+
+
+def _merge_totals(db: Session, totals: Dict[Tuple[int, str], Dict]):
+    """Add batch totals to user_artist_stats (one read of the existing rows, no commit)."""
+    now = datetime.utcnow()
+    existing = {
+        (stat.user_id, stat.artist_key): stat
+        for stat in db.query(UserArtistStat).filter(
+            tuple_(UserArtistStat.user_id, UserArtistStat.artist_key).in_(list(totals))
+        )
+    }
+    for (user_id, key), entry in totals.items():
+        stat = existing.get((user_id, key))
+        if stat is None:
+            db.add(UserArtistStat(user_id=user_id, artist_key=key, updated_at=now, **entry))
+            continue
+        for column in COUNTERS:
+            setattr(stat, column, (getattr(stat, column) or 0) + entry[column])
+        stat.score = (stat.score or 0) + entry["score"]
+        if stat.first_event_at is None or entry["first_event_at"] < stat.first_event_at:
+            stat.first_event_at = entry["first_event_at"]
+        if stat.last_event_at is None or entry["last_event_at"] >= stat.last_event_at:
+            stat.last_event_at = entry["last_event_at"]
+            stat.artist = entry["artist"]
+        stat.updated_at = now
+
+
+def compact_batch(db: Session, cutoff: datetime, batch_size: int = EVENT_RETENTION_BATCH) -> int:
+    """
+    Roll up and delete the oldest batch of events created before `cutoff`.
+
+    Returns:
+        Number of events compacted (0 when nothing is left or another worker took the batch)
+    """
+    rows = (
+        db.query(UserTrackEvent.id, UserTrackEvent.user_id, UserTrackEvent.artist,
+                 UserTrackEvent.event_type, UserTrackEvent.created_at)
+        .filter(UserTrackEvent.created_at < cutoff)
+        .order_by(UserTrackEvent.created_at, UserTrackEvent.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not rows:
+        db.rollback()
+        return 0
+
+    ids = [row[0] for row in rows]
+    try:
+        _merge_totals(db, _aggregate(row[1:] for row in rows))
+        deleted = db.execute(UserTrackEvent.__table__.delete().where(UserTrackEvent.id.in_(ids))).rowcount
+        if deleted != len(ids):
+            # Another worker compacted part of this batch first; its totals already count them
+            db.rollback()
+            return 0
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(ids)
+
+
+def compact_events(db: Session, cutoff: Optional[datetime] = None, batch_size: int = EVENT_RETENTION_BATCH) -> int:
+    """
+    Compact every event created before `cutoff` (default: the retention window), batch by batch.
+
+    Returns:
+        Number of events compacted
+    """
+    cutoff = cutoff or retention_cutoff()
+    if cutoff is None:
+        return 0
+    total = 0
+    while True:
+        compacted = compact_batch(db, cutoff, batch_size)
+        total += compacted
+        if compacted < batch_size:
+            return total
+
+
+# --- Monthly partitions (PostgreSQL) ---
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"{EVENTS_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(engine: Engine) -> bool:
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table"
+        ), {"table": EVENTS_TABLE}).first() is not None
+
+
+def create_month_partition(conn, month: date):
+    """CREATE TABLE IF NOT EXISTS for the partition holding `month`."""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {EVENTS_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+    ))
+
+
+def ensure_month_partitions(engine: Engine, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """Partitions for the current month and the next `months_ahead` ones."""
+    month = month_start(datetime.utcnow().date())
+    for _ in range(months_ahead + 1):
+        try:
+            with engine.begin() as conn:
+                create_month_partition(conn, month)
+        except Exception as e:
+            # E.g. the default partition already holds rows of that month
+            print(f"⚠️ Could not create partition {partition_name(month)}: {e}")
+        month = next_month(month)
+
+
+def _month_partitions(engine: Engine) -> List[Tuple[str, date]]:
+    with engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {"table": EVENTS_TABLE}).scalars().all()
+    partitions = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def _rollup_range_statement(lo: datetime, hi: datetime):
+    """INSERT ... SELECT ... GROUP BY ... ON CONFLICT adding events of [lo, hi) to user_artist_stats"""
+    events = UserTrackEvent.__table__
+    key = func.lower(func.trim(events.c.artist))
+    score = func.sum(case(
+        *[(events.c.event_type == event_type, weight) for event_type, weight in EVENT_WEIGHTS.items()],
+        else_=0,
+    ))
+    counters = [
+        func.count().filter(events.c.event_type == counted_type).label(column)
+        for column, counted_type in COUNTERS.items()
+    ]
+    grouped = (
+        select(
+            events.c.user_id, key, func.max(events.c.artist), *counters, score,
+            func.min(events.c.created_at), func.max(events.c.created_at), func.timezone("utc", func.now()),
+        )
+        .where(events.c.created_at >= lo, events.c.created_at < hi)
+        .group_by(events.c.user_id, key)
+    )
+    stats = UserArtistStat.__table__
+    insert = pg_insert(stats).from_select(
+        ["user_id", "artist_key", "artist", *COUNTERS, "score", "first_event_at", "last_event_at", "updated_at"],
+        grouped,
+    )
+    excluded = insert.excluded
+    return insert.on_conflict_do_update(
+        index_elements=["user_id", "artist_key"],
+        set_={
+            **{column: stats.c[column] + excluded[column] for column in COUNTERS},
+            "score": stats.c.score + excluded.score,
+            "first_event_at": func.least(stats.c.first_event_at, excluded.first_event_at),
+            "last_event_at": func.greatest(stats.c.last_event_at, excluded.last_event_at),
+            "updated_at": excluded.updated_at,
+        },
+    )
+
+
+def drop_expired_partitions(engine: Engine, cutoff: datetime) -> int:
+    """
+    Roll up and drop monthly partitions that end before `cutoff`.
+
+    Returns:
+        Number of events compacted
+    """
+    total = 0
+    for name, month in _month_partitions(engine):
+        hi = datetime.combine(next_month(month), datetime.min.time())
+        if hi > cutoff:
+            break
+        lo = datetime.combine(month, datetime.min.time())
+        with engine.begin() as conn:
+            # Blocks inserts into this month's partition only, and only until the drop commits
+            conn.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+            count = conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+            conn.execute(_rollup_range_statement(lo, hi))
+            conn.execute(text(f"DROP TABLE {name}"))
+        print(f"🗜️ Dropped event partition {name} ({count} events rolled up)")
+        total += count
+    return total
+
+
+def run_retention(engine: Optional[Engine] = None) -> int:
+    """
+    One retention pass: partitions first (if partitioned), then the remaining
+    expired rows batch by batch. The periodic job entry point.
+
+    Returns:
+        Number of events compacted
+    """
+    cutoff = retention_cutoff()
+    if cutoff is None:
+        return 0
+    engine = engine or default_engine
+
+    total = 0
+    if is_partitioned(engine):
+        ensure_month_partitions(engine)
+        total += drop_expired_partitions(engine, cutoff)
+
+    db = SessionLocal(bind=engine) if engine is not default_engine else SessionLocal()
+    try:
+        total += compact_events(db, cutoff)
+    finally:
+        db.close()
+    if total:
+        print(f"🗜️ Compacted {total} track events older than {cutoff:%Y-%m-%d}")
+    return total
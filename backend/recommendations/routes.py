@@ -1,6 +1,7 @@
 """
 Recommendation API routes.
 """
+from functools import partial
 from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -12,8 +13,9 @@ try:
         TrackEventsRequest, TrackEventsResponse,
         RecommendationResponse, RecommendationTrack,
     )
-    from backend.recommendations.signals import ingest_events
-    from backend.recommendations.service import get_personal_recommendations, get_radio_recommendations
+    from backend.recommendations.event_buffer import event_buffer
+    from backend.recommendations.pools import candidate_pools
+    from backend.recommendations.service import build_candidate_pool, get_personal_recommendations, get_radio_recommendations
     from backend.hitmo_parser_light import HitmoParser
 except ImportError:
     from database import get_db
@@ -21,8 +23,9 @@ except ImportError:
         TrackEventsRequest, TrackEventsResponse,
         RecommendationResponse, RecommendationTrack,
     )
-    from recommendations.signals import ingest_events
-    from recommendations.service import get_personal_recommendations, get_radio_recommendations
+    from recommendations.event_buffer import event_buffer
+    from recommendations.pools import candidate_pools
+    from recommendations.service import build_candidate_pool, get_personal_recommendations, get_radio_recommendations
     from hitmo_parser_light import HitmoParser
 
 
@@ -35,12 +38,13 @@ _parser: Optional[HitmoParser] = None
 def set_parser(parser: HitmoParser):
     global _parser
     _parser = parser
+    # Background pool refills search with the same parser
+    candidate_pools.set_builder(partial(build_candidate_pool, parser))
 
 
 def _get_parser() -> HitmoParser:
-    global _parser
     if _parser is None:
-        _parser = HitmoParser()
+        set_parser(HitmoParser())
     return _parser
 
 
@@ -61,13 +65,10 @@ def _get_user_id(request: Request) -> int:
 # --- Event Ingestion ---
 
 @router.post("/events", response_model=TrackEventsResponse)
-async def post_events(
-    body: TrackEventsRequest,
-    request: Request,
-    db: Session = Depends(get_db),
-):
+def post_events(body: TrackEventsRequest, request: Request):
+    # Only buffers the rows and acks; the flusher writes them in batches
     user_id = _get_user_id(request)
-    accepted = ingest_events(db, user_id, body.events)
+    accepted = event_buffer.submit(user_id, body.events)
     return TrackEventsResponse(ok=True, accepted=accepted)
 
 
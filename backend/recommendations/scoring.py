@@ -1,18 +1,52 @@
 """
 Heuristic scoring for recommendation candidates.
+
+Each candidate's normalized artist key and track signature are computed once
+(`annotate_candidates`) and stored on the dict as `_artist_key` / `_sig`;
+filtering and cursors reuse them. With NumPy available the weighted score is
+computed for the whole batch at once: one pass of hash lookups encodes the
+features into a matrix and the weighting, rounding and ranking run on its
+columns. Without NumPy the same formula runs as a plain loop.
 """
 from typing import List, Dict
 
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python scoring below
+    np = None
 
-def score_candidates(
-    candidates: List[Dict],
-    taste_profile: Dict,
-) -> List[Dict]:
-    """
-    Score each candidate based on user taste profile.
-    Returns candidates sorted by score descending.
-    """
-    top_artists = set(taste_profile.get("top_artists", []))
+try:
+    from backend.recommendations.signals import track_signature
+except ImportError:
+    from recommendations.signals import track_signature
+
+W_ARTIST_AFFINITY = 0.35
+LIKED_BOOST = 0.15
+NOVELTY = 0.5
+W_NOVELTY = 0.20
+SKIP_PENALTY = 0.4
+EXPLORATION_BONUS = 0.15
+SOURCE_BONUS = {"top_artist": 0.1, "co_listen": 0.15, "radio_seed": 0.2}
+
+
+def annotate_candidates(candidates: List[Dict]) -> List[Dict]:
+    """Store `_artist_key` and `_sig` on candidates that don't have them yet."""
+    for c in candidates:
+        if "_sig" not in c:
+            artist = c.get("artist", "")
+            c["_artist_key"] = artist.lower().strip()
+            c["_sig"] = track_signature(artist, c.get("title", ""), c.get("duration", 0))
+    return candidates
+
+
+def candidate_signature(c: Dict) -> str:
+    sig = c.get("_sig")
+    if sig is None:
+        sig = track_signature(c.get("artist", ""), c.get("title", ""), c.get("duration", 0))
+    return sig
+
+
+def _scores_numpy(candidates: List[Dict], taste_profile: Dict):
     liked_artists = set(taste_profile.get("liked_artists", []))
     artist_scores = taste_profile.get("artist_scores", {})
     recent_sigs = set(taste_profile.get("recent_signatures", []))
@@ -20,47 +54,93 @@ def score_candidates(
 
     max_artist_score = max(artist_scores.values()) if artist_scores else 1
 
-    for c in candidates:
-        artist_key = c.get("artist", "").lower().strip()
-        title_key = c.get("title", "").lower().strip()
-        duration = c.get("duration", 0)
-        sig = f"{artist_key}|||{title_key}|||{duration}"
-        source = c.get("candidate_source", "")
+    # One pass of hash lookups encodes the features; the arithmetic runs on whole columns
+    features = np.array(
+        [
+            (
+                artist_scores.get(c["_artist_key"], 0),
+                c["_artist_key"] in liked_artists,
+                c["_sig"] in recent_sigs,
+                c["_sig"] in skipped_sigs,
+                SOURCE_BONUS.get(c.get("candidate_source", ""), 0.0),
+                c.get("candidate_source", "") == "exploration",
+            )
+            for c in candidates
+        ],
+        dtype=float,
+    )
+    raw_affinity, liked, recent, skipped, source_bonus, exploration = features.T
 
-        # --- Artist affinity (0..1) ---
-        raw_artist_affinity = artist_scores.get(artist_key, 0)
-        artist_affinity = min(raw_artist_affinity / max_artist_score, 1.0) if max_artist_score > 0 else 0
+    if max_artist_score > 0:
+        affinity = np.minimum(raw_affinity / max_artist_score, 1.0)
+    else:
+        affinity = np.zeros(len(candidates))
 
-        # --- Liked boost ---
-        liked_boost = 0.15 if artist_key in liked_artists else 0
+    scores = (
+        affinity * W_ARTIST_AFFINITY
+        + liked * LIKED_BOOST
+        + (1.0 - recent) * NOVELTY * W_NOVELTY
+        + exploration * EXPLORATION_BONUS
+        + source_bonus
+        - skipped * SKIP_PENALTY
+    )
+    return np.round(scores, 4)
 
-        # --- Novelty (higher if not in recent history) ---
-        novelty = 0.0 if sig in recent_sigs else 0.5
 
-        # --- Skip penalty ---
-        skip_penalty = 0.4 if sig in skipped_sigs else 0
+def _scores_python(candidates: List[Dict], taste_profile: Dict) -> List[float]:
+    liked_artists = set(taste_profile.get("liked_artists", []))
+    artist_scores = taste_profile.get("artist_scores", {})
+    recent_sigs = set(taste_profile.get("recent_signatures", []))
+    skipped_sigs = set(taste_profile.get("skipped_signatures", []))
+
+    max_artist_score = max(artist_scores.values()) if artist_scores else 1
 
-        # --- Exploration bonus ---
-        exploration_bonus = 0.15 if source == "exploration" else 0
+    scores = []
+    for c in candidates:
+        artist_key = c["_artist_key"]
+        sig = c["_sig"]
+        source = c.get("candidate_source", "")
 
-        # --- Source bonus ---
-        source_bonus = 0.0
-        if source == "top_artist":
-            source_bonus = 0.1
-        elif source == "radio_seed":
-            source_bonus = 0.2
+        raw_artist_affinity = artist_scores.get(artist_key, 0)
+        artist_affinity = min(raw_artist_affinity / max_artist_score, 1.0) if max_artist_score > 0 else 0
 
-        # --- Final score ---
         score = (
-            artist_affinity * 0.35
-            + liked_boost
-            + novelty * 0.20
-            + exploration_bonus
-            + source_bonus
-            - skip_penalty
+            artist_affinity * W_ARTIST_AFFINITY
+            + (LIKED_BOOST if artist_key in liked_artists else 0)
+            + (0.0 if sig in recent_sigs else NOVELTY) * W_NOVELTY
+            + (EXPLORATION_BONUS if source == "exploration" else 0)
+            + SOURCE_BONUS.get(source, 0.0)
+            - (SKIP_PENALTY if sig in skipped_sigs else 0)
         )
+        scores.append(round(score, 4))
+    return scores
+
+
+def score_candidates(
+    candidates: List[Dict],
+    taste_profile: Dict,
+) -> List[Dict]:
+    """
+    Score each candidate based on user taste profile.
+    Returns candidates sorted by score descending (stable for equal scores).
+
+    Score = artist affinity (0..1) * 0.35 + liked artist 0.15
+            + novelty (0.5 unless recently played) * 0.20
+            + exploration 0.15 + source bonus - skip penalty 0.4
+    """
+    if not candidates:
+        return candidates
+    annotate_candidates(candidates)
 
-        c["_score"] = round(score, 4)
+    if np is not None:
+        scores = _scores_numpy(candidates, taste_profile)
+        order = np.argsort(-scores, kind="stable")
+        for c, score in zip(candidates, scores.tolist()):
+            c["_score"] = score
+        candidates[:] = [candidates[i] for i in order.tolist()]
+        return candidates
 
+    for c, score in zip(candidates, _scores_python(candidates, taste_profile)):
+        c["_score"] = score
     candidates.sort(key=lambda x: x.get("_score", 0), reverse=True)
     return candidates
@@ -1,26 +1,37 @@
 """
 Recommendation service — orchestrates the full recommendation pipeline.
 """
-from typing import List, Dict, Optional, Set
+import asyncio
+from typing import AbstractSet, List, Dict, Optional
 from sqlalchemy.orm import Session
 
 try:
-    from backend.recommendations.signals import build_taste_profile, get_recent_played_urls
+    from backend.database import SessionLocal, run_db
+    from backend.recommendations.taste import get_taste_profile
     from backend.recommendations.candidates import generate_personal_candidates, generate_radio_candidates
-    from backend.recommendations.scoring import score_candidates
-    from backend.recommendations.filters import filter_candidates, build_cursor_from_results, parse_cursor
+    from backend.recommendations.scoring import candidate_signature, score_candidates
+    from backend.recommendations.filters import filter_candidates
+    from backend.recommendations.cursors import cursor_store
+    from backend.recommendations.pools import POOL_LOW_WATER, candidate_pools
     from backend.hitmo_parser_light import HitmoParser
 except ImportError:
-    from recommendations.signals import build_taste_profile, get_recent_played_urls
+    from database import SessionLocal, run_db
+    from recommendations.taste import get_taste_profile
     from recommendations.candidates import generate_personal_candidates, generate_radio_candidates
-    from recommendations.scoring import score_candidates
-    from recommendations.filters import filter_candidates, build_cursor_from_results, parse_cursor
+    from recommendations.scoring import candidate_signature, score_candidates
+    from recommendations.filters import filter_candidates
+    from recommendations.cursors import cursor_store
+    from recommendations.pools import POOL_LOW_WATER, candidate_pools
     from hitmo_parser_light import HitmoParser
 
 
 # Default genres for cold-start fallback
 FALLBACK_GENRE_IDS = [1, 2, 3, 4, 5]
 
+# Background pool refills run more seeds than a live request can afford
+POOL_SEEDS = 10
+POOL_CANDIDATES = 150
+
 
 def _normalize_track(raw: Dict) -> Dict:
     """Normalize a raw Hitmo track dict to our recommendation track shape."""
@@ -48,30 +59,63 @@ async def get_personal_recommendations(
     Full personal recommendation pipeline.
     Returns { items, cursor, has_more, debug }.
     """
-    # 1. Build taste profile
-    taste = build_taste_profile(db, user_id)
-    recent_urls = get_recent_played_urls(db, user_id, limit=20)
-    excluded = parse_cursor(cursor)
+    # 1. Taste profile: one user_taste row (blocking query runs in the threadpool)
+    taste = await run_db(get_taste_profile, db, user_id)
+    recent_urls = taste["recent_urls"]
+    excluded = cursor_store.load(cursor)
 
     # 2. Cold-start fallback
     if not taste["top_artists"] and not taste["liked_artists"]:
         return await _cold_start_recommendations(parser, limit, excluded, user_agent)
 
-    # 3. Generate candidates
+    # 3. Serve from the user's candidate pool when it can fill the page
+    pool = candidate_pools.get(user_id)
+    if pool is not None:
+        page = filter_candidates(
+            pool.items,
+            recent_played_urls=recent_urls,
+            excluded_signatures=excluded,
+            max_same_artist=2,
+            limit=limit,
+        )
+        served = excluded | {candidate_signature(t) for t in page}
+        remaining = sum(1 for t in pool.items if candidate_signature(t) not in served)
+        if remaining < POOL_LOW_WATER or pool.stale:
+            candidate_pools.refresh(user_id)
+        if len(page) >= limit:
+            return {
+                "items": page,
+                "cursor": cursor_store.save(cursor, excluded, page),
+                "has_more": remaining > 0 or candidate_pools.refreshing(user_id),
+                "debug": {
+                    "profile_top_artists": taste["top_artists"][:5],
+                    "pool": {
+                        "size": len(pool.items),
+                        "remaining": remaining,
+                        "age_seconds": round(pool.age),
+                        "refreshing": candidate_pools.refreshing(user_id),
+                    },
+                },
+            }
+
+    # 4. Generate candidates live (seed searches run concurrently, slow ones are dropped)
+    candidate_debug: Dict = {}
     raw_candidates = await generate_personal_candidates(
-        parser, taste, limit=max(limit * 6, 120), user_agent=user_agent
+        parser, taste, limit=max(limit * 6, 120), user_agent=user_agent, debug=candidate_debug
     )
 
     if not raw_candidates:
         return await _cold_start_recommendations(parser, limit, excluded, user_agent)
 
-    # 4. Normalize
+    # 5. Normalize
     candidates = [_normalize_track(c) for c in raw_candidates]
 
-    # 5. Score
+    # 6. Score
     scored = score_candidates(candidates, taste)
+    # No pool or it ran dry: next pages are cut from this until a background refill lands
+    candidate_pools.put(user_id, scored)
 
-    # 6. Filter
+    # 7. Filter
     filtered = filter_candidates(
         scored,
         recent_played_urls=recent_urls,
@@ -80,9 +124,8 @@ async def get_personal_recommendations(
         limit=limit,
     )
 
-    # 7. Build cursor
-    all_excluded = excluded | set(build_cursor_from_results(filtered).split("|||SEP|||"))
-    new_cursor = "|||SEP|||".join(all_excluded) if filtered else None
+    # 8. Cursor: opaque token for the served signatures, kept server-side
+    new_cursor = cursor_store.save(cursor, excluded, filtered) if filtered else None
 
     return {
         "items": filtered,
@@ -93,10 +136,31 @@ async def get_personal_recommendations(
             "candidate_count": len(raw_candidates),
             "after_score_count": len(scored),
             "after_filter_count": len(filtered),
+            "seeds": candidate_debug.get("seeds", []),
         },
     }
 
 
+def _load_taste(user_id: int) -> Dict:
+    db = SessionLocal()
+    try:
+        return get_taste_profile(db, user_id)
+    finally:
+        db.close()
+
+
+async def build_candidate_pool(parser: HitmoParser, user_id: int) -> Optional[List[Dict]]:
+    """
+    Scored candidate pool for a user (background refill, see recommendations/pools.py).
+    Returns None for users without a taste profile: cold start stays live.
+    """
+    taste = await asyncio.to_thread(_load_taste, user_id)
+    if not taste["top_artists"] and not taste["liked_artists"]:
+        return None
+    raw_candidates = await generate_personal_candidates(parser, taste, limit=POOL_CANDIDATES, seeds=POOL_SEEDS)
+    return score_candidates([_normalize_track(c) for c in raw_candidates], taste)
+
+
 async def get_radio_recommendations(
     db: Session,
     user_id: int,
@@ -111,9 +175,9 @@ async def get_radio_recommendations(
     Radio-from-track recommendation pipeline.
     Returns { items, cursor, has_more }.
     """
-    taste = build_taste_profile(db, user_id)
-    recent_urls = get_recent_played_urls(db, user_id, limit=20)
-    excluded = parse_cursor(cursor)
+    taste = await run_db(get_taste_profile, db, user_id)
+    recent_urls = taste["recent_urls"]
+    excluded = cursor_store.load(cursor)
 
     raw_candidates = await generate_radio_candidates(
         parser,
@@ -135,8 +199,7 @@ async def get_radio_recommendations(
         limit=limit,
     )
 
-    all_excluded = excluded | set(build_cursor_from_results(filtered).split("|||SEP|||"))
-    new_cursor = "|||SEP|||".join(all_excluded) if filtered else None
+    new_cursor = cursor_store.save(cursor, excluded, filtered) if filtered else None
 
     return {
         "items": filtered,
@@ -148,7 +211,7 @@ async def get_radio_recommendations(
 async def _cold_start_recommendations(
     parser: HitmoParser,
     limit: int,
-    excluded: Set[str],
+    excluded: AbstractSet[str],
     user_agent: Optional[str] = None,
 ) -> Dict:
     """Fallback when user has no history — return popular/genre tracks."""
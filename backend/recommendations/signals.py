@@ -1,6 +1,6 @@
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import desc
 from datetime import datetime, timedelta
 
 try:
@@ -17,37 +17,44 @@ VALID_EVENT_TYPES = {
 }
 
 
-def ingest_events(db: Session, user_id: int, events: List[TrackEventIn]) -> int:
-    """Insert validated events into the database. Returns count of accepted events."""
-    accepted = 0
+def validate_events(user_id: int, events: List[TrackEventIn]) -> List[Dict]:
+    """
+    Turn incoming events into user_track_events rows, dropping invalid ones.
+    created_at is stamped here, so a buffered row keeps the time it arrived.
+    """
+    now = datetime.utcnow()
+    rows = []
     for ev in events:
         if ev.event_type not in VALID_EVENT_TYPES:
             continue
         if not ev.track_id or not ev.title or not ev.artist:
             continue
 
-        record = UserTrackEvent(
-            user_id=user_id,
-            event_type=ev.event_type,
-            track_id=ev.track_id,
-            title=ev.title,
-            artist=ev.artist,
-            audio_url=ev.audio_url,
-            cover_url=ev.cover_url,
-            duration=ev.duration or 0,
-            played_seconds=ev.played_seconds or 0,
-            position_seconds=ev.position_seconds or 0,
-            source=ev.source,
-            context_type=ev.context_type,
-            context_id=ev.context_id,
-            session_id=ev.session_id,
-        )
-        db.add(record)
-        accepted += 1
-
-    if accepted > 0:
+        rows.append({
+            "user_id": user_id,
+            "event_type": ev.event_type,
+            "track_id": ev.track_id,
+            "title": ev.title,
+            "artist": ev.artist,
+            "audio_url": ev.audio_url,
+            "cover_url": ev.cover_url,
+            "duration": ev.duration or 0,
+            "played_seconds": ev.played_seconds or 0,
+            "position_seconds": ev.position_seconds or 0,
+            "source": ev.source,
+            "context_type": ev.context_type,
+            "context_id": ev.context_id,
+            "session_id": ev.session_id,
+            "created_at": now,
+        })
+    return rows
+
+
+def insert_event_rows(db: Session, rows: List[Dict]):
+    """One multi-row Core INSERT for already validated rows; commits."""
+    if rows:
+        db.execute(UserTrackEvent.__table__.insert(), rows)
         db.commit()
-    return accepted
 
 
 # --- Taste Profile ---
@@ -63,68 +70,26 @@ EVENT_WEIGHTS = {
 }
 
 
-def build_taste_profile(db: Session, user_id: int, days: int = 30, max_artists: int = 15) -> Dict:
-    """
-    Build a compact taste profile for a user from recent events.
-    Returns dict with top_artists, recent_track_signatures, skipped_signatures.
-    """
-    cutoff = datetime.utcnow() - timedelta(days=days)
-
-    events = (
-        db.query(UserTrackEvent)
-        .filter(UserTrackEvent.user_id == user_id, UserTrackEvent.created_at >= cutoff)
-        .order_by(desc(UserTrackEvent.created_at))
-        .limit(500)
-        .all()
-    )
+def track_signature(artist: str, title: str, duration: Optional[int]) -> str:
+    """Dedup key of a track across sources: normalized artist, title and duration"""
+    return f"{artist.lower().strip()}|||{title.lower().strip()}|||{duration or 0}"
 
-    artist_scores: Dict[str, float] = {}
-    recent_signatures: List[str] = []
-    skipped_signatures: List[str] = []
-    liked_artists: set = set()
 
-    for ev in events:
-        artist_key = ev.artist.lower().strip()
-        sig = f"{artist_key}|||{ev.title.lower().strip()}|||{ev.duration or 0}"
-        weight = EVENT_WEIGHTS.get(ev.event_type, 0)
-
-        artist_scores[artist_key] = artist_scores.get(artist_key, 0) + weight
-
-        if ev.event_type in ("play", "complete", "search_select", "like"):
-            if sig not in recent_signatures:
-                recent_signatures.append(sig)
-
-        if ev.event_type == "skip":
-            if sig not in skipped_signatures:
-                skipped_signatures.append(sig)
-
-        if ev.event_type == "like":
-            liked_artists.add(artist_key)
-
-    # Sort artists by score descending
-    sorted_artists = sorted(artist_scores.items(), key=lambda x: x[1], reverse=True)
-    top_artists = [a[0] for a in sorted_artists[:max_artists] if a[1] > 0]
-
-    return {
-        "top_artists": top_artists,
-        "liked_artists": list(liked_artists),
-        "recent_signatures": recent_signatures[:50],
-        "skipped_signatures": skipped_signatures[:30],
-        "artist_scores": dict(sorted_artists[:max_artists]),
-    }
-
-
-def get_recent_played_urls(db: Session, user_id: int, limit: int = 20) -> List[str]:
-    """Get audio URLs of recently played tracks to avoid recommending them."""
-    events = (
-        db.query(UserTrackEvent.audio_url)
-        .filter(
-            UserTrackEvent.user_id == user_id,
-            UserTrackEvent.event_type.in_(["play", "complete"]),
-            UserTrackEvent.audio_url.isnot(None),
+def load_recent_events(db: Session, user_id: int, days: int = 30, limit: int = 500) -> List[Dict]:
+    """The user's latest events (newest first) as plain dicts of the columns taste profiles need."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    rows = (
+        db.query(
+            UserTrackEvent.event_type,
+            UserTrackEvent.artist,
+            UserTrackEvent.title,
+            UserTrackEvent.duration,
+            UserTrackEvent.audio_url,
+            UserTrackEvent.created_at,
         )
+        .filter(UserTrackEvent.user_id == user_id, UserTrackEvent.created_at >= cutoff)
         .order_by(desc(UserTrackEvent.created_at))
         .limit(limit)
         .all()
     )
-    return [e.audio_url for e in events if e.audio_url]
+    return [dict(row._mapping) for row in rows]
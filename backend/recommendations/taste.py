@@ -0,0 +1,262 @@
+"""
+Incrementally maintained taste profiles.
+
+Every /personal and /radio request used to load the user's last 500 events
+and recompute the profile from scratch. Now each user has one `user_taste`
+row (artist scores, liked artists, ring buffers of recent and skipped track
+signatures and of played URLs) that the event writer updates with every
+flushed batch, so a recommendation request reads one small row.
+
+Artist scores decay exponentially with a half-life of TASTE_HALF_LIFE_DAYS
+instead of falling out of a fixed 30-day window. Decay is lazy: scores are
+stored as of `scores_at` and scaled by the elapsed time on the next update
+or read.
+
+A user without a row (existing users after the deploy, or a failed update
+that left no row) gets one built by replaying their recent history, once.
+
+Events older than EVENT_RETENTION_DAYS only survive as per-artist totals in
+user_artist_stats (recommendations/retention.py). Their contribution has
+long decayed out of the row, so the profile adds the user's strongest
+long-term artists on read, log-scaled and weighted by
+TASTE_LONG_TERM_WEIGHT: a months-long favourite stays in the profile after
+its raw events are gone.
+"""
+
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+try:
+    from backend.recommendations.models import UserArtistStat, UserTaste
+    from backend.recommendations.signals import EVENT_WEIGHTS, load_recent_events, track_signature
+except ImportError:
+    from recommendations.models import UserArtistStat, UserTaste
+    from recommendations.signals import EVENT_WEIGHTS, load_recent_events, track_signature
+
+TASTE_HALF_LIFE_DAYS = float(os.getenv("TASTE_HALF_LIFE_DAYS", "14"))
+# Weight of log(1 + long-term artist score) next to the decayed scores; 0 = ignore user_artist_stats
+TASTE_LONG_TERM_WEIGHT = float(os.getenv("TASTE_LONG_TERM_WEIGHT", "1"))
+LONG_TERM_ARTISTS = 15
+
+# Liked artists count for as long as events used to stay in the profile window
+LIKED_ARTIST_DAYS = 30
+# Scores that decayed below this are dropped; past the cap the weakest go
+MIN_ARTIST_SCORE = 0.05
+MAX_ARTIST_SCORES = 200
+TOP_ARTISTS = 15
+RECENT_SIGNATURES = 50
+SKIPPED_SIGNATURES = 30
+RECENT_URLS = 20
+
+RECENT_EVENT_TYPES = ("play", "complete", "search_select", "like")
+PLAYED_URL_EVENT_TYPES = ("play", "complete")
+
+
+def _decay(seconds: float) -> float:
+    if TASTE_HALF_LIFE_DAYS <= 0 or seconds <= 0:
+        return 1.0
+    return 0.5 ** (seconds / (TASTE_HALF_LIFE_DAYS * 86400))
+
+
+def _push(buffer: List[str], item: str, size: int):
+    """Move/insert item to the front of a bounded newest-first buffer."""
+    if item in buffer:
+        buffer.remove(item)
+    buffer.insert(0, item)
+    del buffer[size:]
+
+
+class TasteState:
+    """Working copy of a user_taste row"""
+
+    def __init__(self, row: Optional[UserTaste] = None):
+        self.artist_scores: Dict[str, float] = dict(row.artist_scores or {}) if row else {}
+        self.liked_artists: Dict[str, str] = dict(row.liked_artists or {}) if row else {}
+        self.recent_signatures: List[str] = list(row.recent_signatures or []) if row else []
+        self.skipped_signatures: List[str] = list(row.skipped_signatures or []) if row else []
+        self.recent_urls: List[str] = list(row.recent_urls or []) if row else []
+        self.events: int = (row.events or 0) if row else 0
+        self.scores_at: Optional[datetime] = row.scores_at if row else None
+
+    def decay_to(self, when: datetime):
+        """Scale the stored scores to `when` (never backwards)."""
+        if self.scores_at is not None and when <= self.scores_at:
+            return
+        if self.scores_at is not None:
+            factor = _decay((when - self.scores_at).total_seconds())
+            self.artist_scores = {
+                artist: score * factor
+                for artist, score in self.artist_scores.items()
+                if abs(score * factor) >= MIN_ARTIST_SCORE
+            }
+        self.scores_at = when
+
+    def apply(self, event: Dict):
+        """Apply one event row (event_type, artist, title, duration, audio_url, created_at)."""
+        event_type = event["event_type"]
+        created_at = event.get("created_at") or datetime.utcnow()
+        artist_key = event["artist"].lower().strip()
+
+        weight = EVENT_WEIGHTS.get(event_type, 0)
+        if weight:
+            if self.scores_at is None or created_at > self.scores_at:
+                self.decay_to(created_at)
+            else:
+                # Late event (e.g. flushed by another worker after newer ones): pre-decay it
+                weight *= _decay((self.scores_at - created_at).total_seconds())
+            self.artist_scores[artist_key] = self.artist_scores.get(artist_key, 0) + weight
+
+        sig = track_signature(event["artist"], event["title"], event.get("duration"))
+        if event_type in RECENT_EVENT_TYPES:
+            _push(self.recent_signatures, sig, RECENT_SIGNATURES)
+        if event_type == "skip":
+            _push(self.skipped_signatures, sig, SKIPPED_SIGNATURES)
+        if event_type == "like":
+            self.liked_artists[artist_key] = created_at.isoformat()
+        elif event_type == "unlike":
+            self.liked_artists.pop(artist_key, None)
+        if event_type in PLAYED_URL_EVENT_TYPES and event.get("audio_url"):
+            _push(self.recent_urls, event["audio_url"], RECENT_URLS)
+        self.events += 1
+
+    def _trim(self):
+        if len(self.artist_scores) > MAX_ARTIST_SCORES:
+            strongest = sorted(self.artist_scores.items(), key=lambda x: abs(x[1]), reverse=True)
+            self.artist_scores = dict(strongest[:MAX_ARTIST_SCORES])
+        liked_since = (datetime.utcnow() - timedelta(days=LIKED_ARTIST_DAYS)).isoformat()
+        self.liked_artists = {a: at for a, at in self.liked_artists.items() if at >= liked_since}
+
+    def store(self, row: UserTaste):
+        """Write the state back (new containers, so the JSON columns are flagged dirty)."""
+        self._trim()
+        row.artist_scores = {a: round(s, 4) for a, s in self.artist_scores.items()}
+        row.liked_artists = dict(self.liked_artists)
+        row.recent_signatures = list(self.recent_signatures)
+        row.skipped_signatures = list(self.skipped_signatures)
+        row.recent_urls = list(self.recent_urls)
+        row.events = self.events
+        row.scores_at = self.scores_at
+        row.updated_at = datetime.utcnow()
+
+    def profile(
+        self,
+        now: Optional[datetime] = None,
+        max_artists: int = TOP_ARTISTS,
+        long_term: Optional[Dict[str, float]] = None,
+    ) -> Dict:
+        """
+        The dict scoring and candidate generation expect: top/liked artists, recent/skipped signatures, artist scores, recent URLs.
+
+        Args:
+            long_term: extra artist scores from load_long_term_scores(), added to the decayed ones
+        """
+        self.decay_to(now or datetime.utcnow())
+        self._trim()
+        scores = dict(self.artist_scores)
+        for artist, score in (long_term or {}).items():
+            scores[artist] = scores.get(artist, 0) + score
+        sorted_artists = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return {
+            "top_artists": [a for a, score in sorted_artists[:max_artists] if score > 0],
+            "liked_artists": list(self.liked_artists),
+            "recent_signatures": list(self.recent_signatures),
+            "skipped_signatures": list(self.skipped_signatures),
+            "artist_scores": dict(sorted_artists[:max_artists]),
+            "recent_urls": list(self.recent_urls),
+        }
+
+
+def rebuild_taste(db: Session, user_id: int) -> TasteState:
+    """Replay the user's recent history (last 500 events / 30 days), oldest first."""
+    state = TasteState()
+    for event in reversed(load_recent_events(db, user_id)):
+        state.apply(event)
+    return state
+
+
+def load_long_term_scores(db: Session, user_id: int, limit: int = LONG_TERM_ARTISTS) -> Dict[str, float]:
+    """
+    {artist_key: weighted score} of the user's strongest compacted artists
+    (both ends: long-term favourites and long-term skips).
+    """
+    if TASTE_LONG_TERM_WEIGHT <= 0:
+        return {}
+    rows = (
+        db.query(UserArtistStat.artist_key, UserArtistStat.score)
+        .filter(UserArtistStat.user_id == user_id, UserArtistStat.score != 0)
+        .order_by(func.abs(UserArtistStat.score).desc())
+        .limit(limit)
+        .all()
+    )
+    return {
+        artist: math.copysign(math.log1p(abs(score)), score) * TASTE_LONG_TERM_WEIGHT
+        for artist, score in rows
+    }
+
+
+def get_taste_profile(db: Session, user_id: int) -> Dict:
+    """Taste profile from the user's user_taste row, built from history on first use."""
+    long_term = load_long_term_scores(db, user_id)
+    row = db.get(UserTaste, user_id)
+    if row is not None:
+        return TasteState(row).profile(long_term=long_term)
+
+    state = rebuild_taste(db, user_id)
+    row = UserTaste(user_id=user_id)
+    state.store(row)
+    db.add(row)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Built concurrently by the event writer or another request
+        db.rollback()
+    return state.profile(long_term=long_term)
+
+
+def _apply_batch(db: Session, by_user: Dict[int, List[Dict]]):
+    # FOR UPDATE: another worker may be flushing events of the same user
+    existing = {
+        row.user_id: row
+        for row in db.query(UserTaste).filter(UserTaste.user_id.in_(list(by_user))).with_for_update()
+    }
+    for user_id, events in by_user.items():
+        row = existing.get(user_id)
+        if row is None:
+            # The batch is already written, so the replayed history includes it
+            state = rebuild_taste(db, user_id)
+            row = UserTaste(user_id=user_id)
+            db.add(row)
+        else:
+            state = TasteState(row)
+            for event in sorted(events, key=lambda e: e.get("created_at") or datetime.min):
+                state.apply(event)
+        state.store(row)
+    db.commit()
+
+
+def update_tastes(db: Session, rows: Iterable[Dict]) -> int:
+    """
+    Apply freshly written event rows to their users' taste rows; commits.
+
+    Returns:
+        Number of users updated
+    """
+    by_user: Dict[int, List[Dict]] = {}
+    for row in rows:
+        by_user.setdefault(row["user_id"], []).append(row)
+    if not by_user:
+        return 0
+
+    try:
+        _apply_batch(db, by_user)
+    except IntegrityError:
+        # Another writer created one of the rows first; now it exists and is locked properly
+        db.rollback()
+        _apply_batch(db, by_user)
+    return len(by_user)
@@ -0,0 +1,160 @@
+"""
+Referral statistics.
+
+The referral screen used to count referrals twice and then look up every
+invited user one by one. Here a response is one grouped count (cached per
+referrer) plus one joined, keyset-paginated page of referrals.
+
+The summary cache is per process: the writers in this process invalidate it
+when a referral is created or completed, and a short TTL bounds how stale
+other workers can be.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import User, Referral
+    from backend.pagination import PAGE_SIZE_MAX, encode_cursor, keyset_before
+except ImportError:
+    from database import User, Referral
+    from pagination import PAGE_SIZE_MAX, encode_cursor, keyset_before
+
+REFERRAL_SUMMARY_TTL = int(os.getenv("REFERRAL_SUMMARY_TTL", "300"))
+REFERRAL_SUMMARY_CACHE_SIZE = 10000
+
+
+class ReferralSummaryCache:
+    """{referrer_id: ({total, completed, pending}, expires_at)} with hit/miss counters"""
+
+    def __init__(self, ttl: int = REFERRAL_SUMMARY_TTL, max_size: int = REFERRAL_SUMMARY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[int, Tuple[Dict[str, int], float]] = {}
+        # Sync endpoints run in the threadpool
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, referrer_id: int) -> Optional[Dict[str, int]]:
+        entry = self._entries.get(referrer_id)
+        if entry and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def put(self, referrer_id: int, summary: Dict[str, int]):
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                # Expired entries go first; if none, drop the oldest insert
+                now = time.monotonic()
+                expired = [key for key, (_, expires) in self._entries.items() if expires <= now]
+                for key in expired or [next(iter(self._entries))]:
+                    del self._entries[key]
+            self._entries[referrer_id] = (summary, time.monotonic() + self.ttl)
+
+    def invalidate(self, referrer_id: int):
+        with self._lock:
+            self._entries.pop(referrer_id, None)
+
+    def get_stats(self) -> Dict:
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+        }
+
+
+summary_cache = ReferralSummaryCache()
+
+
+def invalidate_referrer(referrer_id: Optional[int]):
+    """Call after a referral of this referrer is created or completed (after commit)."""
+    if referrer_id is not None:
+        summary_cache.invalidate(referrer_id)
+
+
+def get_referral_summary(db: Session, referrer_id: int) -> Dict[str, int]:
+    """{total_referrals, completed_referrals, pending_referrals} from one grouped count"""
+    summary = summary_cache.get(referrer_id)
+    if summary is not None:
+        return summary
+
+    counts = dict(
+        db.query(Referral.status, func.count(Referral.id))
+        .filter(Referral.referrer_id == referrer_id)
+        .group_by(Referral.status)
+        .all()
+    )
+    total = sum(counts.values())
+    completed = counts.get("completed", 0)
+    summary = {
+        "total_referrals": total,
+        "completed_referrals": completed,
+        "pending_referrals": total - completed,
+    }
+    summary_cache.put(referrer_id, summary)
+    return summary
+
+
+def get_referral_page(
+    db: Session,
+    referrer_id: int,
+    limit: int = 50,
+    after: Optional[Tuple] = None,
+) -> Tuple[list, Optional[str]]:
+    """
+    One page of a referrer's invites with the invited users joined in, newest first.
+
+    Args:
+        after: decoded cursor (created_at, id) of the last referral of the previous page
+
+    Returns:
+        (referrals, next_cursor)
+    """
+    limit = max(1, min(limit, PAGE_SIZE_MAX))
+    query = (
+        db.query(
+            Referral.id,
+            Referral.status,
+            Referral.reward_given,
+            Referral.created_at,
+            Referral.completed_at,
+            User.id,
+            User.username,
+            User.first_name,
+        )
+        .join(User, User.id == Referral.referred_id)
+        .filter(Referral.referrer_id == referrer_id)
+    )
+    if after:
+        query = query.filter(keyset_before(Referral.created_at, Referral.id, after))
+    rows = query.order_by(Referral.created_at.desc(), Referral.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][3], rows[-1][0])
+
+    referrals = [
+        {
+            "id": ref_id,
+            "user_id": referred_id,
+            "username": username,
+            "first_name": first_name,
+            "status": status,
+            "reward_given": reward_given,
+            "created_at": created_at.isoformat() if created_at else None,
+            "completed_at": completed_at.isoformat() if completed_at else None,
+        }
+        for ref_id, status, reward_given, created_at, completed_at, referred_id, username, first_name in rows
+    ]
+    return referrals, next_cursor
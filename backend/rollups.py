@@ -0,0 +1,243 @@
+"""
+Daily rollups for the admin dashboards.
+
+Per-day counters (new users, active users, plays, completes, downloads) live
+in `daily_stats`, completed revenue per day and currency in `daily_revenue`.
+A periodic compactor recomputes the last couple of days from the raw tables
+with grouped range queries, so dashboards read a few dozen summary rows
+instead of scanning users, events, downloads and payments.
+
+Recomputing (instead of bumping counters on every write) keeps distinct
+counts like active users exact and makes a run idempotent: several workers
+or a restarted process can compact the same days without double counting.
+
+With the compactor disabled (ROLLUP_INTERVAL_SECONDS=0, rollups only built by
+scripts/compact_rollups.py) the dashboards compute today and yesterday live
+from the raw tables, so the current numbers don't read as zero.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, distinct, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import SessionLocal, User, DownloadedMessage, Payment, DailyStat, DailyRevenue
+    from backend.recommendations.models import UserTrackEvent
+    from backend.recommendations.retention import retention_cutoff
+except ImportError:
+    from database import SessionLocal, User, DownloadedMessage, Payment, DailyStat, DailyRevenue
+    from recommendations.models import UserTrackEvent
+    from recommendations.retention import retention_cutoff
+
+ROLLUP_INTERVAL = int(os.getenv("ROLLUP_INTERVAL_SECONDS", "300"))  # 0 = compactor disabled
+ROLLUP_BACKFILL_DAYS = int(os.getenv("ROLLUP_BACKFILL_DAYS", "365"))
+
+# Days recomputed behind the newest rollup row: late writes land on yesterday around midnight
+RECOMPUTE_DAYS = 2
+# Days per transaction on the first (backfill) run
+CHUNK_DAYS = 31
+
+
+def _as_day(value) -> date:
+    # func.date() returns a string on SQLite and a date on PostgreSQL
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    """[start 00:00, day after end 00:00) as datetimes, so the range stays indexable"""
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+
+def compute_days(db: Session, start: date, end: date) -> Tuple[Dict[date, Dict], Dict[Tuple[date, str], Tuple[float, int]]]:
+    """
+    Aggregate the raw tables for the days start..end (inclusive).
+
+    Returns:
+        ({day: counters}, {(day, currency): (amount, payments)})
+    """
+    lo, hi = _bounds(start, end)
+    stats: Dict[date, Dict] = {}
+
+    def row(day: date) -> Dict:
+        return stats.setdefault(day, {"new_users": 0, "active_users": 0, "plays": 0, "completes": 0, "downloads": 0})
+
+    joined_day = func.date(User.joined_at)
+    for day, count in (
+        db.query(joined_day, func.count(User.id))
+        .filter(User.joined_at >= lo, User.joined_at < hi)
+        .group_by(joined_day)
+    ):
+        row(_as_day(day))["new_users"] = count
+
+    event_day = func.date(UserTrackEvent.created_at)
+    for day, active, plays, completes in (
+        db.query(
+            event_day,
+            func.count(distinct(UserTrackEvent.user_id)),
+            func.sum(case((UserTrackEvent.event_type == "play", 1), else_=0)),
+            func.sum(case((UserTrackEvent.event_type == "complete", 1), else_=0)),
+        )
+        .filter(UserTrackEvent.created_at >= lo, UserTrackEvent.created_at < hi)
+        .group_by(event_day)
+    ):
+        counters = row(_as_day(day))
+        counters["active_users"] = active
+        counters["plays"] = int(plays or 0)
+        counters["completes"] = int(completes or 0)
+
+    download_day = func.date(DownloadedMessage.created_at)
+    for day, count in (
+        db.query(download_day, func.count(DownloadedMessage.id))
+        .filter(DownloadedMessage.created_at >= lo, DownloadedMessage.created_at < hi)
+        .group_by(download_day)
+    ):
+        row(_as_day(day))["downloads"] = count
+
+    revenue: Dict[Tuple[date, str], Tuple[float, int]] = {}
+    paid_day = func.date(Payment.completed_at)
+    for day, currency, amount, count in (
+        db.query(paid_day, Payment.currency, func.sum(Payment.amount_value), func.count(Payment.id))
+        .filter(Payment.status == "completed", Payment.completed_at >= lo, Payment.completed_at < hi)
+        .group_by(paid_day, Payment.currency)
+    ):
+        revenue[(_as_day(day), currency or "unknown")] = (float(amount or 0), count)
+
+    return stats, revenue
+
+
+def _write_days(db: Session, start: date, end: date):
+    """Replace the rollup rows of start..end in one transaction; commits."""
+    stats, revenue = compute_days(db, start, end)
+    now = datetime.utcnow()
+
+    # Raw events of days before the retention cutoff are gone (compacted into
+    # user_artist_stats), so rebuilding such a day keeps its old event counters
+    cutoff = retention_cutoff()
+    if cutoff is not None and start <= cutoff.date():
+        for day, active, plays, completes in (
+            db.query(DailyStat.day, DailyStat.active_users, DailyStat.plays, DailyStat.completes)
+            .filter(DailyStat.day >= start, DailyStat.day <= min(end, cutoff.date()))
+        ):
+            counters = stats.setdefault(_as_day(day), {"new_users": 0, "downloads": 0})
+            counters.update(active_users=active, plays=plays, completes=completes)
+
+    db.query(DailyStat).filter(DailyStat.day >= start, DailyStat.day <= end).delete(synchronize_session=False)
+    db.query(DailyRevenue).filter(DailyRevenue.day >= start, DailyRevenue.day <= end).delete(synchronize_session=False)
+
+    # Every day gets a row, even an empty one: the newest row is the compactor's watermark
+    day = start
+    while day <= end:
+        db.add(DailyStat(day=day, updated_at=now, **stats.get(day, {
+            "new_users": 0, "active_users": 0, "plays": 0, "completes": 0, "downloads": 0,
+        })))
+        day += timedelta(days=1)
+    for (day, currency), (amount, count) in revenue.items():
+        db.add(DailyRevenue(day=day, currency=currency, amount=amount, payments=count, updated_at=now))
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker rolled up the same days concurrently; its rows are just as good
+        db.rollback()
+
+
+def compact_rollups(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """
+    Recompute the rollups for start..end (inclusive).
+
+    By default continues from the newest rollup row (minus RECOMPUTE_DAYS) up to
+    today; on an empty table backfills up to ROLLUP_BACKFILL_DAYS of history.
+
+    Returns:
+        Number of days recomputed
+    """
+    today = datetime.utcnow().date()
+    end = end or today
+    if start is None:
+        last = db.query(func.max(DailyStat.day)).scalar()
+        if last is not None:
+            start = min(_as_day(last), end) - timedelta(days=RECOMPUTE_DAYS - 1)
+        else:
+            start = end - timedelta(days=ROLLUP_BACKFILL_DAYS - 1)
+            first_user = db.query(func.min(User.joined_at)).scalar()
+            if first_user is not None:
+                start = max(start, _as_day(first_user))
+    if start > end:
+        return 0
+
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=CHUNK_DAYS - 1), end)
+        _write_days(db, chunk_start, chunk_end)
+        chunk_start = chunk_end + timedelta(days=1)
+    return (end - start).days + 1
+
+
+def get_daily_stats(db: Session, days: int, live_days: Optional[int] = None) -> List[Dict]:
+    """
+    Rollup rows for the last `days` days, oldest first; days without a row count as zero.
+
+    Args:
+        live_days: newest days computed from the raw tables instead of the rollups
+                   (default: RECOMPUTE_DAYS when the compactor is disabled, else none)
+
+    Returns:
+        List of {date, new_users, active_users, plays, completes, downloads, revenue: {currency: amount}}
+    """
+    if live_days is None:
+        live_days = RECOMPUTE_DAYS if ROLLUP_INTERVAL <= 0 else 0
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+    live_start = max(start, end - timedelta(days=live_days - 1)) if live_days > 0 else end + timedelta(days=1)
+
+    stats: Dict[date, Dict] = {
+        _as_day(r.day): {
+            "new_users": r.new_users,
+            "active_users": r.active_users,
+            "plays": r.plays,
+            "completes": r.completes,
+            "downloads": r.downloads,
+        }
+        for r in db.query(DailyStat).filter(DailyStat.day >= start, DailyStat.day < live_start)
+    }
+    revenue: Dict[date, Dict[str, float]] = {}
+    for r in db.query(DailyRevenue).filter(DailyRevenue.day >= start, DailyRevenue.day < live_start):
+        revenue.setdefault(_as_day(r.day), {})[r.currency] = float(r.amount or 0)
+
+    if live_start <= end:
+        live_stats, live_revenue = compute_days(db, live_start, end)
+        stats.update(live_stats)
+        for (day, currency), (amount, _) in live_revenue.items():
+            revenue.setdefault(day, {})[currency] = amount
+
+    result = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        counters = stats.get(day, {})
+        result.append({
+            "date": day.isoformat(),
+            "new_users": counters.get("new_users", 0),
+            "active_users": counters.get("active_users", 0),
+            "plays": counters.get("plays", 0),
+            "completes": counters.get("completes", 0),
+            "downloads": counters.get("downloads", 0),
+            "revenue": revenue.get(day, {}),
+        })
+    return result
+
+
+def run_compaction() -> int:
+    """compact_rollups() in its own session; the periodic job entry point"""
+    db = SessionLocal()
+    try:
+        return compact_rollups(db)
+    finally:
+        db.close()
@@ -0,0 +1,70 @@
+"""
+Скрипт фоновой догрузки текстов песен для самых популярных треков
+Ранжирует треки по числу прослушиваний (user_track_events) и кэширует тексты для топ-N без кэша.
+Прерванный запуск можно просто перезапустить: уже обработанные треки пропускаются.
+
+Запуск из backend/:
+    python scripts/backfill_lyrics.py --limit 500 --days 30
+    python scripts/backfill_lyrics.py --limit 200 --interval 3600   # по расписанию
+    python scripts/backfill_lyrics.py --compress-legacy --limit 0    # только сжать старые записи
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Добавляем путь к backend для импорта модулей
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+try:
+    from database import init_db, SessionLocal
+    from lyrics_backfill import run_backfill
+    from lyrics_cache import compress_legacy_rows
+except ImportError:
+    from backend.database import init_db, SessionLocal
+    from backend.lyrics_backfill import run_backfill
+    from backend.lyrics_cache import compress_legacy_rows
+
+
+async def main(args):
+    while True:
+        await run_backfill(
+            limit=args.limit,
+            concurrency=args.concurrency,
+            rate_limit=args.rps,
+            days=args.days,
+        )
+        if not args.interval:
+            break
+        print(f"💤 Next backfill run in {args.interval}s")
+        await asyncio.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill lyrics cache for the most played tracks")
+    parser.add_argument("--limit", type=int, default=200, help="How many uncached tracks to look up per run")
+    parser.add_argument("--concurrency", type=int, default=None, help="Parallel lookups (LYRICS_BACKFILL_CONCURRENCY)")
+    parser.add_argument("--rps", type=float, default=None, help="Requests per second to each source (LYRICS_BACKFILL_RPS)")
+    parser.add_argument("--days", type=int, default=None, help="Rank by plays from the last N days only")
+    parser.add_argument("--interval", type=int, default=0, help="Repeat every N seconds (0 = run once)")
+    parser.add_argument("--compress-legacy", action="store_true", help="Compress plain-text rows stored before compression first")
+    args = parser.parse_args()
+
+    init_db()
+    if args.compress_legacy:
+        db = SessionLocal()
+        try:
+            print(f"🗜️ Compressed {compress_legacy_rows(db)} legacy lyrics rows")
+        finally:
+            db.close()
+    if args.limit <= 0:
+        sys.exit(0)
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        print("⏹️ Backfill interrupted; run again to continue")
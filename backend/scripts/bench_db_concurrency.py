@@ -0,0 +1,110 @@
+"""
+Concurrency benchmark for the database engine settings.
+
+Runs the same mixed workload (event ingestion inserts + profile-style reads)
+from several threads against a default engine and against the tuned one from
+database.create_db_engine, and prints throughput and lock errors for both.
+
+Usage (from backend/):
+    python scripts/bench_db_concurrency.py                      # temp SQLite file
+    python scripts/bench_db_concurrency.py --url postgresql://... --threads 32
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import create_db_engine
+from recommendations.models import UserTrackEvent
+
+
+def worker(Session, thread_no: int, ops: int, read_ratio: float, results: dict, lock: threading.Lock):
+    writes = reads = errors = 0
+    session = Session()
+    try:
+        for i in range(ops):
+            user_id = (thread_no * 7 + i) % 50
+            try:
+                if (i % 100) < read_ratio * 100:
+                    session.query(UserTrackEvent.artist).filter(
+                        UserTrackEvent.user_id == user_id
+                    ).order_by(UserTrackEvent.created_at.desc()).limit(50).all()
+                    reads += 1
+                else:
+                    session.add(UserTrackEvent(
+                        user_id=user_id,
+                        event_type="play",
+                        track_id=f"bench-{thread_no}-{i}",
+                        title=f"Track {i}",
+                        artist=f"Artist {i % 30}",
+                    ))
+                    session.commit()
+                    writes += 1
+            except OperationalError:
+                session.rollback()
+                errors += 1
+    finally:
+        session.close()
+
+    with lock:
+        results["writes"] += writes
+        results["reads"] += reads
+        results["errors"] += errors
+
+
+def run(url: str, tuned: bool, threads: int, ops: int, read_ratio: float) -> dict:
+    engine = create_db_engine(url, tuned=tuned)
+    UserTrackEvent.__table__.drop(bind=engine, checkfirst=True)
+    UserTrackEvent.__table__.create(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    results = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    pool = [
+        threading.Thread(target=worker, args=(Session, n, ops, read_ratio, results, lock))
+        for n in range(threads)
+    ]
+
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    UserTrackEvent.__table__.drop(bind=engine)
+    engine.dispose()
+    results["elapsed"] = elapsed
+    results["ops_per_sec"] = (results["writes"] + results["reads"]) / elapsed
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare default vs tuned engine under concurrent load")
+    parser.add_argument("--url", default=None, help="Database URL (default: temporary SQLite file)")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200, help="Operations per thread")
+    parser.add_argument("--read-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.url is None:
+        tmp_dir = tempfile.mkdtemp(prefix="bench-db-")
+
+    for label, tuned in (("default", False), ("tuned", True)):
+        url = args.url or f"sqlite:///{os.path.join(tmp_dir, label + '.db')}"
+        r = run(url, tuned, args.threads, args.ops, args.read_ratio)
+        print(f"{label:8s} {r['ops_per_sec']:10,.0f} ops/s  "
+              f"writes={r['writes']} reads={r['reads']} lock_errors={r['errors']} ({r['elapsed']:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
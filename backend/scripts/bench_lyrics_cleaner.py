@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for LyricsService._clean_lyrics.
+
+Feeds a Genius-like page (header junk, section tags, language labels) through
+the cleaner repeatedly and reports throughput in lines/sec.
+
+Usage (from backend/):
+    python scripts/bench_lyrics_cleaner.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lyrics_service import LyricsService
+
+HEADER = [
+    "42 Contributors",
+    "Translations",
+    "Español",
+    "Русский (Russian)",
+    'Song Title Lyrics',
+    '"Song Title" is the second single from the album... Read More',
+    "",
+]
+
+VERSE = [
+    "[Verse 1]",
+    "I've been tryna call",
+    "I've been on my own for long enough",
+    "Maybe you can show me how to love, maybe",
+    "...",
+    "[Chorus]",
+    "I said, ooh, I'm blinded by the lights",
+    "No, I can't sleep until I feel your touch",
+    "",
+]
+
+
+def build_page(verses: int = 8) -> str:
+    return "\n".join(HEADER + VERSE * verses + ["Embed"])
+
+
+def run(iterations: int = 2000):
+    service = LyricsService()
+    page = build_page()
+    line_count = page.count("\n") + 1
+
+    # Warm-up
+    for _ in range(50):
+        service._clean_lyrics(page)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        service._clean_lyrics(page)
+    elapsed = time.perf_counter() - start
+
+    total_lines = line_count * iterations
+    print(f"Pages:      {iterations} x {line_count} lines")
+    print(f"Elapsed:    {elapsed:.3f}s")
+    print(f"Throughput: {total_lines / elapsed:,.0f} lines/sec")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,53 @@
+"""
+Build the item-item co-occurrence index used as a recommendation candidate source.
+
+Run it from cron (e.g. nightly); API workers pick up the new file by its
+mtime. Alternatively set REC_COOCCURRENCE_INTERVAL_SECONDS and let the API
+rebuild it.
+
+Usage (from backend/):
+    python scripts/build_cooccurrence.py                       # REC_COOCCURRENCE_* settings
+    python scripts/build_cooccurrence.py --days 30 --top-k 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+try:
+    from database import init_db, SessionLocal
+    from recommendations.cooccurrence import COOCCURRENCE_DAYS, INDEX_PATH, MIN_COUNT, TOP_K, build_index, write_index
+except ImportError:
+    from backend.database import init_db, SessionLocal
+    from backend.recommendations.cooccurrence import COOCCURRENCE_DAYS, INDEX_PATH, MIN_COUNT, TOP_K, build_index, write_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the co-occurrence index from listening sessions")
+    parser.add_argument("--days", type=int, default=COOCCURRENCE_DAYS, help="Sessions of the last N days")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="Neighbors kept per track")
+    parser.add_argument("--min-count", type=int, default=MIN_COUNT, help="Minimum co-plays for a neighbor")
+    parser.add_argument("--path", default=INDEX_PATH, help="Output file")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        index = build_index(db, days=args.days, top_k=args.top_k, min_count=args.min_count)
+    finally:
+        db.close()
+    write_index(index, args.path)
+
+    with_neighbors = sum(1 for n in index["neighbors"] if n)
+    size_kb = os.path.getsize(args.path) / 1024
+    print(f"🔗 {with_neighbors} tracks with neighbors ({len(index['items'])} indexed) "
+          f"from {index['sessions']} sessions in {time.perf_counter() - started:.1f}s")
+    print(f"💾 Wrote {args.path} ({size_kb:.0f} KB)")
@@ -18,8 +18,16 @@ def clear_cache():
     
     try:
         cursor.execute("DELETE FROM lyrics")
+        deleted = cursor.rowcount
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='lyrics_aliases'")
+        if cursor.fetchone():
+            cursor.execute("DELETE FROM lyrics_aliases")
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='lyrics_fts'")
+        if cursor.fetchone():
+            cursor.execute("INSERT INTO lyrics_fts(lyrics_fts) VALUES ('delete-all')")
         conn.commit()
-        print(f"✅ Successfully cleared lyrics cache. Deleted {cursor.rowcount} entries.")
+        print(f"✅ Successfully cleared lyrics cache. Deleted {deleted} entries.")
+        print("ℹ️ Running API workers keep their in-memory hot tier until restarted.")
     except Exception as e:
         print(f"❌ Error clearing cache: {e}")
     finally:
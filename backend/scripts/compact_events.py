@@ -0,0 +1,47 @@
+"""
+Compact old recommendation events by hand.
+
+The API server does this every EVENT_RETENTION_INTERVAL_SECONDS; use the
+script for a first run on a big table or to apply a shorter window once.
+Events are rolled up into user_artist_stats before they're deleted.
+
+Usage (from backend/):
+    python scripts/compact_events.py                  # same as the periodic run
+    python scripts/compact_events.py --days 30        # compact events older than 30 days
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+try:
+    from database import init_db, SessionLocal
+    from recommendations.retention import EVENT_RETENTION_BATCH, compact_events, run_retention
+except ImportError:
+    from backend.database import init_db, SessionLocal
+    from backend.recommendations.retention import EVENT_RETENTION_BATCH, compact_events, run_retention
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll up and delete old user_track_events")
+    parser.add_argument("--days", type=int, default=None, help="Compact events older than N days (default: EVENT_RETENTION_DAYS)")
+    parser.add_argument("--batch", type=int, default=EVENT_RETENTION_BATCH, help="Events per transaction")
+    args = parser.parse_args()
+
+    init_db()
+    if args.days is None:
+        print(f"🗜️ Compacted {run_retention()} events")
+    else:
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=args.days)
+            print(f"🗜️ Compacted {compact_events(db, cutoff, args.batch)} events older than {cutoff:%Y-%m-%d}")
+        finally:
+            db.close()
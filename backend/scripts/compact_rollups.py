@@ -0,0 +1,44 @@
+"""
+Recompute the daily rollups (daily_stats / daily_revenue) by hand.
+
+The API server does this every ROLLUP_INTERVAL_SECONDS; use the script to
+rebuild a longer range, e.g. after fixing raw data or importing history.
+
+Usage (from backend/):
+    python scripts/compact_rollups.py                 # same as the periodic run
+    python scripts/compact_rollups.py --days 90       # rebuild the last 90 days
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+try:
+    from database import init_db, SessionLocal
+    from rollups import compact_rollups
+except ImportError:
+    from backend.database import init_db, SessionLocal
+    from backend.rollups import compact_rollups
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute daily rollups for the admin dashboards")
+    parser.add_argument("--days", type=int, default=None, help="Rebuild the last N days (default: continue from the newest row)")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        start = None
+        if args.days:
+            start = datetime.utcnow().date() - timedelta(days=args.days - 1)
+        print(f"📊 Recomputed {compact_rollups(db, start=start)} days of rollups")
+    finally:
+        db.close()
@@ -0,0 +1,49 @@
+"""
+Миграции схемы БД
+Применяет недостающие версии миграций (см. backend/migrations.py) или показывает их статус.
+Работает с любой БД из DATABASE_URL (SQLite или PostgreSQL).
+
+Запуск из backend/:
+    python scripts/migrate.py            # применить все ожидающие
+    python scripts/migrate.py --status   # показать статус
+    python scripts/migrate.py --to 1     # применить до версии 1 включительно
+"""
+
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Добавляем путь к backend для импорта модулей
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+try:
+    from migrations import run_migrations, migration_status
+except ImportError:
+    from backend.migrations import run_migrations, migration_status
+
+
+def print_status():
+    for version, name, applied_at in migration_status():
+        state = f"applied {applied_at}" if applied_at else "pending"
+        print(f"{version:04d}_{name:40s} {state}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations")
+    parser.add_argument("--status", action="store_true", help="Show migration status and exit")
+    parser.add_argument("--to", type=int, default=None, help="Apply migrations up to this version")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        sys.exit(0)
+
+    applied = run_migrations(target=args.to)
+    if applied:
+        print(f"✅ Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print("✅ Database is up to date")
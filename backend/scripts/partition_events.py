@@ -0,0 +1,91 @@
+"""
+Convert user_track_events into a table partitioned by month (PostgreSQL only).
+
+With monthly partitions the retention job drops whole expired months
+instead of deleting them row by row. The conversion copies the table under
+an exclusive lock, so event writes wait until it commits: run it in a quiet
+window, or compact old events first (scripts/compact_events.py) to keep the
+copy small. Safe to re-run: an already partitioned table is left alone.
+
+Usage (from backend/):
+    python scripts/partition_events.py
+"""
+
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+try:
+    from database import init_db, engine
+    from recommendations.models import UserTrackEvent
+    from recommendations.retention import (
+        EVENTS_TABLE, PARTITION_MONTHS_AHEAD, create_month_partition, is_partitioned, month_start, next_month,
+    )
+except ImportError:
+    from backend.database import init_db, engine
+    from backend.recommendations.models import UserTrackEvent
+    from backend.recommendations.retention import (
+        EVENTS_TABLE, PARTITION_MONTHS_AHEAD, create_month_partition, is_partitioned, month_start, next_month,
+    )
+
+LEGACY_TABLE = f"{EVENTS_TABLE}_legacy"
+
+
+def partition_events():
+    with engine.begin() as conn:
+        conn.execute(text(f"LOCK TABLE {EVENTS_TABLE} IN ACCESS EXCLUSIVE MODE"))
+        # The partition key is part of the primary key, so it can't be NULL
+        conn.execute(text(f"UPDATE {EVENTS_TABLE} SET created_at = :now WHERE created_at IS NULL"), {"now": datetime.utcnow()})
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": EVENTS_TABLE}).scalar()
+        oldest = conn.execute(text(f"SELECT min(created_at) FROM {EVENTS_TABLE}")).scalar()
+
+        conn.execute(text(f"ALTER TABLE {EVENTS_TABLE} RENAME TO {LEGACY_TABLE}"))
+        conn.execute(text(
+            f"CREATE TABLE {EVENTS_TABLE} (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+        ))
+        conn.execute(text(f"ALTER TABLE {EVENTS_TABLE} ALTER COLUMN created_at SET NOT NULL"))
+
+        month = month_start((oldest or datetime.utcnow()).date())
+        last = month_start(datetime.utcnow().date())
+        for _ in range(PARTITION_MONTHS_AHEAD):
+            last = next_month(last)
+        created = 0
+        while month <= last:
+            create_month_partition(conn, month)
+            month = next_month(month)
+            created += 1
+        # Catches events outside the monthly partitions (clock skew, missed maintenance)
+        conn.execute(text(f"CREATE TABLE {EVENTS_TABLE}_default PARTITION OF {EVENTS_TABLE} DEFAULT"))
+
+        conn.execute(text(f"INSERT INTO {EVENTS_TABLE} SELECT * FROM {LEGACY_TABLE}"))
+        # Keep the id sequence: it's owned by the legacy table and would be dropped with it
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+        conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {EVENTS_TABLE}.id"))
+
+        conn.execute(text(f"ALTER TABLE {EVENTS_TABLE} ADD PRIMARY KEY (id, created_at)"))
+        # Indexes on the parent are created on every partition
+        for index in UserTrackEvent.__table__.indexes:
+            index.create(conn)
+    return created
+
+
+if __name__ == "__main__":
+    if engine.dialect.name != "postgresql":
+        print("❌ Partitioning needs PostgreSQL")
+        sys.exit(1)
+    init_db()
+    if is_partitioned(engine):
+        print(f"✅ {EVENTS_TABLE} is already partitioned")
+        sys.exit(0)
+    print(f"🗂️ Partitioning {EVENTS_TABLE} by month...")
+    print(f"✅ Created {partition_events()} monthly partitions")
@@ -0,0 +1,48 @@
+"""
+Fill the full-text lyrics search index from cached lyrics.
+
+The index is created by migration 9 and new lyrics are indexed as they're
+stored; run this once after that migration to index the lyrics cached
+before it, or with --full to rebuild the index from scratch.
+
+Usage (from backend/):
+    python scripts/rebuild_lyrics_search.py           # index missing entries
+    python scripts/rebuild_lyrics_search.py --full    # drop and rebuild everything
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+try:
+    from database import init_db, SessionLocal
+    from lyrics_search import rebuild_search_index, _get_backend
+except ImportError:
+    from backend.database import init_db, SessionLocal
+    from backend.lyrics_search import rebuild_search_index, _get_backend
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index cached lyrics for full-text search")
+    parser.add_argument("--full", action="store_true", help="Rebuild the whole index instead of adding missing entries")
+    args = parser.parse_args()
+
+    init_db()
+    if _get_backend() is None:
+        print("❌ No lyrics search index in this database (FTS5 unavailable or unsupported dialect)")
+        sys.exit(1)
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        indexed = rebuild_search_index(db, only_missing=not args.full)
+    finally:
+        db.close()
+    print(f"✅ Indexed {indexed} lyrics ({_get_backend()}) in {time.perf_counter() - started:.1f}s")
@@ -1,7 +1,7 @@
 from lyrics_service import LyricsService
 
 def test_cleaner():
-    service = LyricsService("dummy")
+    service = LyricsService()
     
     garbage = [
         'العربية', 'Svenska', 'azərbaycan', 'עברית', 'हिन्दी', 'srpski'
@@ -2,6 +2,8 @@
 Quick test for lyrics service
 """
 
+import asyncio
+
 from lyrics_service import LyricsService
 
 service = LyricsService()
@@ -16,7 +18,7 @@ artist = "Queen"
 print(f"Searching for: {artist} - {title}")
 print("-" * 80)
 
-lyrics = service.get_lyrics(title, artist)
+lyrics = asyncio.run(service.get_lyrics(title, artist))
 
 if lyrics:
     print(f"\n✅ Found lyrics! Length: {len(lyrics)} characters")
@@ -0,0 +1,137 @@
+"""
+Regression corpus for LyricsService._clean_lyrics
+
+Expected outputs were recorded from the original (per-line re.match) cleaner,
+so any behaviour change in the optimized cleaner shows up here.
+Run: python tests/test_lyrics_cleaner.py  (or pytest)
+"""
+
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lyrics_service import LyricsService
+
+
+# Cases from scripts/verify_lyrics_cleaner.py
+GARBAGE_LANGUAGES = ['العربية', 'Svenska', 'azərbaycan', 'עברית', 'हिन्दी', 'srpski']
+
+# (name, raw text, expected cleaned text)
+CORPUS = [
+    (
+        "verify_script_case",
+        "Some real lyrics\n" + "\n".join(GARBAGE_LANGUAGES) + "\nMore real lyrics",
+        '',
+    ),
+    (
+        "garbage_languages",
+        "Some real words\n" + "\n".join(GARBAGE_LANGUAGES) + "\nMore real words",
+        'Some real words\nMore real words',
+    ),
+    (
+        "genius_header",
+        "42 Contributors\nTranslations\nEnglish\nEspañol\nBlinding Lights Lyrics\n[Intro]\nYeah\n\n[Verse 1]\nI've been tryna call\nI've been on my own for long enough\nEmbed",
+        "Yeah\n\nI've been tryna call\nI've been on my own for long enough",
+    ),
+    (
+        "read_more_and_description",
+        "\"Blinding Lights\" is the second single from the album\nRead More\nI said, ooh, I'm blinded by the lights\nNo, I can't sleep until I feel your touch",
+        "I said, ooh, I'm blinded by the lights\nNo, I can't sleep until I feel your touch",
+    ),
+    (
+        "serves_as_description",
+        "\"Song\" serves as the lead single…\nReal line one\nReal line two",
+        'Real line one\nReal line two',
+    ),
+    (
+        "ellipsis_lines",
+        "Short line…\n" + "x" * 101 + " … more\nKeep this line\nAnd this … one",
+        'Keep this line\nAnd this … one',
+    ),
+    (
+        "language_labels",
+        "ไทย (Thai)\nРусский (Russian)\nTiếng Việt\nKeep me\nПривет (мир) ok",
+        'Keep me\nПривет (мир) ok',
+    ),
+    (
+        "bracket_annotations",
+        "[Pont : version 1]\n[Couplet 1 : Tito Prince]\n[]\nLine [inside] brackets\n[Chorus]\nHook line",
+        '[]\nLine [inside] brackets\nHook line',
+    ),
+    (
+        "blank_line_collapse",
+        "Line one\n\n\n\n\nLine two\n   \n\t\n\nLine three\n\n\n",
+        'Line one\n\nLine two\n\nLine three',
+    ),
+    (
+        "playlist_dash_format",
+        "\n".join(f"Artist {i} - Track {i}" for i in range(25)),
+        '',
+    ),
+    (
+        "playlist_keywords",
+        "My summer playlist\nTracklist below\nSong one\nSong two",
+        '',
+    ),
+    (
+        "single_keyword_kept",
+        "Explicit content warning\nLa la la\nNa na na",
+        'Explicit content warning\nLa la la\nNa na na',
+    ),
+    (
+        "mixed_case_rules",
+        "1 contributor\n3Contributors\nTRANSLATIONS here\nread more\nREAD MORE please\nembed\nMy Song lyrics\nLyrics\nActual lyric",
+        '1 contributor\nREAD MORE please\nLyrics\nActual lyric',
+    ),
+    (
+        "quoted_is_variants",
+        "\"Track\" Is About love\n\"Track is another thing\n'Single' is the best\n\"Hello\" she said\nplain line is the best",
+        '\'Single\' is the best\n"Hello" she said\nplain line is the best',
+    ),
+    (
+        "whitespace_and_crlf",
+        "  padded line  \r\nSecond line\r\n\r\n\r\n\r\nThird line\r",
+        'padded line\nSecond line\n\nThird line',
+    ),
+    (
+        "dash_below_threshold",
+        "\n".join(f"Artist {i} - Track {i}" for i in range(5)) + "\n" + "\n".join(f"verse line {i}" for i in range(16)),
+        'Artist 0 - Track 0\nArtist 1 - Track 1\nArtist 2 - Track 2\nArtist 3 - Track 3\nArtist 4 - Track 4\nverse line 0\nverse line 1\nverse line 2\nverse line 3\nverse line 4\nverse line 5\nverse line 6\nverse line 7\nverse line 8\nverse line 9\nverse line 10\nverse line 11\nverse line 12\nverse line 13\nverse line 14\nverse line 15',
+    ),
+    (
+        "empty",
+        "",
+        '',
+    ),
+]
+
+
+def test_clean_lyrics_corpus():
+    """Every corpus entry must clean to exactly the recorded text"""
+    service = LyricsService()
+    failures = []
+
+    for name, raw, expected in CORPUS:
+        cleaned = service._clean_lyrics(raw)
+        if cleaned != expected:
+            failures.append(f"{name}: expected {expected!r}, got {cleaned!r}")
+
+    assert not failures, "\n".join(failures)
+
+
+def test_garbage_languages_removed():
+    """Same check as scripts/verify_lyrics_cleaner.py, with lines the cleaner keeps"""
+    service = LyricsService()
+    dirty = "Some real words\n" + "\n".join(GARBAGE_LANGUAGES) + "\nMore real words"
+    cleaned = service._clean_lyrics(dirty)
+
+    for lang in GARBAGE_LANGUAGES:
+        assert lang not in cleaned, f"{lang} was not removed"
+
+
+if __name__ == "__main__":
+    test_clean_lyrics_corpus()
+    test_garbage_languages_removed()
+    print(f"SUCCESS: {len(CORPUS)} corpus cases match")
@@ -2,6 +2,7 @@
 Test script for lyrics service with multiple sources
 """
 
+import asyncio
 import sys
 import os
 
@@ -16,6 +17,10 @@ load_dotenv()
 def test_lyrics_service():
     """Test lyrics fetching from multiple sources"""
     
+    asyncio.run(_run_lyrics_checks())
+
+
+async def _run_lyrics_checks():
     service = LyricsService()
     
     # Test cases
@@ -34,7 +39,7 @@ def test_lyrics_service():
         print(f"Testing: {artist} - {title}")
         print(f"{'=' * 80}")
         
-        lyrics = service.get_lyrics(title, artist)
+        lyrics = await service.get_lyrics(title, artist)
         
         if lyrics:
             print(f"\n✅ SUCCESS! Found lyrics ({len(lyrics)} characters)")
@@ -45,6 +50,8 @@ def test_lyrics_service():
             print(f"\n❌ FAILED: No lyrics found")
         
         print("\n" + "-" * 80)
+    
+    await service.close()
 
 if __name__ == "__main__":
     test_lyrics_service()
@@ -0,0 +1,185 @@
+"""
+In-process cache of user records for the hot read paths.
+
+Every app open calls /api/user/auth, and the subscription status and admin
+checks read the same row again. Those paths read a detached UserSnapshot
+from here instead; only a miss, a new user or a changed profile goes to the
+database.
+
+Invalidation is driven by the ORM: any flushed change to a snapshot field
+(premium activation or extension, grants, blocking, profile updates) or a
+new/deleted user drops the entry once the transaction commits. Writes from
+other processes (bot, scripts, other workers) are bounded by the TTL.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+try:
+    from backend.database import SessionLocal, User
+except ImportError:
+    from database import SessionLocal, User
+
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# Columns copied into a snapshot; a change to any other column (download_count, ...) keeps the entry
+SNAPSHOT_FIELDS = (
+    "id",
+    "username",
+    "first_name",
+    "last_name",
+    "is_admin",
+    "is_premium",
+    "is_premium_pro",
+    "is_blocked",
+    "trial_expires_at",
+    "premium_expires_at",
+    "referral_code",
+)
+
+
+class UserSnapshot:
+    """Detached copy of the hot User columns (same attribute names)"""
+
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self, user: User):
+        for field in SNAPSHOT_FIELDS:
+            setattr(self, field, getattr(user, field))
+
+
+class UserCache:
+    """LRU of user snapshots with a TTL and a generation counter against stale puts"""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: int = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # Bumped on every invalidation: a load that started before it must not be cached.
+        # One counter for all users keeps memory flat; user writes are rare next to reads
+        self._generation = 0
+        # Sync endpoints run in the threadpool
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "invalidations": 0, "stale_puts": 0, "evictions": 0}
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            snapshot, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return snapshot
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def put(self, snapshot: UserSnapshot, generation: int):
+        """Cache a snapshot that was read while `generation` was current."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                self._stats["stale_puts"] += 1
+                return
+            self._entries[snapshot.id] = (snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def get_stats(self) -> Dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0,
+        }
+
+
+user_cache = UserCache()
+
+
+def get_user_snapshot(db: Session, user_id: int) -> Optional[UserSnapshot]:
+    """Cached snapshot of a user, loading it on a miss; None if there's no such user."""
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    generation = user_cache.generation
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        return None
+    snapshot = UserSnapshot(user)
+    user_cache.put(snapshot, generation)
+    return snapshot
+
+
+def cache_user(user: User) -> UserSnapshot:
+    """Snapshot of a user the caller just loaded or committed, stored for the next request."""
+    generation = user_cache.generation
+    snapshot = UserSnapshot(user)
+    user_cache.put(snapshot, generation)
+    return snapshot
+
+
+def _touched_user_ids(session: Session) -> Set[int]:
+    touched = set()
+    for obj in session.new:
+        if isinstance(obj, User) and obj.id is not None:
+            touched.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            touched.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in SNAPSHOT_FIELDS):
+                touched.add(obj.id)
+    return touched
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_user_changes(session, flush_context, instances):
+    touched = _touched_user_ids(session)
+    if touched:
+        session.info.setdefault("user_cache_touched", set()).update(touched)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("user_cache_touched", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("user_cache_touched", None)
@@ -2,7 +2,7 @@ import React, { createContext, useContext, useState, useRef, useEffect, ReactNod
 import { Track, Playlist, RepeatMode, RadioStation, User, SearchMode } from '../types';
 import { MOCK_TRACKS, INITIAL_PLAYLISTS, API_BASE_URL } from '../constants';
 import { hapticFeedback } from '../utils/telegram';
-import { searchTracks, getGenreTracks } from '../utils/api';
+import { searchTracks, getGenreTracks, prefetchLyrics } from '../utils/api';
 
 interface PlayerContextType {
   // Данные
@@ -665,13 +665,17 @@ export const PlayerProvider: React.FC<{ children: ReactNode }> = ({ children })
     };
     preloadBlobs();
 
-    // 2. Load more tracks from API if needed
+    // 2. Warm server lyrics cache for the next tracks
+    const upcoming = queue.slice(currentIndex + 1, currentIndex + 6);
+    prefetchLyrics(upcoming);
+
+    // 3. Load more tracks from API if needed
     const tracksRemaining = queue.length - 1 - currentIndex;
     if (tracksRemaining < 3) {
       loadMoreTracks();
     }
 
-    // 3. Cleanup old cache entries (optional, keep last 5?)
+    // 4. Cleanup old cache entries (optional, keep last 5?)
     // Simple cleanup: remove tracks far behind
     if (currentIndex > 5) {
       const trackToRemove = queue[currentIndex - 5];
@@ -104,6 +104,9 @@ export interface UserListItem {
 
 export interface UserListResponse {
   users: UserListItem[];
+  next_cursor?: string | null;
+  total?: number;
+  total_exact?: boolean;
 }
 
 export interface BroadcastRequest {
@@ -314,6 +314,24 @@ export const getLyrics = async (trackId: string, title: string, artist: string):
     }
 };
 
+/**
+ * Warm the server lyrics cache for upcoming tracks (fire-and-forget)
+ */
+export const prefetchLyrics = async (tracks: { id: string; title: string; artist: string }[]): Promise<void> => {
+    if (tracks.length === 0) return;
+    try {
+        await fetch(`${API_BASE_URL}/api/lyrics/prefetch`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                tracks: tracks.map(t => ({ track_id: t.id, title: t.title, artist: t.artist })),
+            }),
+        });
+    } catch (error) {
+        console.warn('Lyrics prefetch error:', error);
+    }
+};
+
 // --- Recommendations API ---
 
 interface RecommendationResponse {
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Shield, Users, Activity, ArrowLeft, Database, RefreshCw, Crown, Loader, CheckCircle } from 'lucide-react';
 import { usePlayer } from '../context/PlayerContext';
 import { API_BASE_URL } from '../constants';
-import { UserStats, UserListItem, TopUser, ActivityStat, CacheStats } from '../types';
+import { UserStats, UserListItem, UserListResponse, TopUser, ActivityStat, CacheStats } from '../types';
 
 interface AdminViewProps {
     onBack: () => void;
@@ -36,6 +36,10 @@ const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
     });
     const [allUsers, setAllUsers] = useState<UserListItem[]>([]);
     const [adminUsers, setAdminUsers] = useState<UserListItem[]>([]);
+    // Курсоры следующих страниц списков пользователей (null = страниц больше нет)
+    const [allUsersCursor, setAllUsersCursor] = useState<string | null>(null);
+    const [allUsersTotal, setAllUsersTotal] = useState(0);
+    const [adminUsersCursor, setAdminUsersCursor] = useState<string | null>(null);
     const [topUsers, setTopUsers] = useState<TopUser[]>([]);
     const [activityStats, setActivityStats] = useState<ActivityStat[]>([]);
 
@@ -89,24 +93,32 @@ const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
         }
     };
 
-    const loadAllUsers = async () => {
+    const fetchUsersPage = async (filterType: 'all' | 'admin', cursor?: string | null): Promise<UserListResponse | null> => {
+        const params = new URLSearchParams({ user_id: String(user?.id), filter_type: filterType });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`${API_BASE_URL}/api/admin/users?${params}`);
+        return response.ok ? await response.json() : null;
+    };
+
+    const loadAllUsers = async (more = false) => {
         try {
-            const response = await fetch(`${API_BASE_URL}/api/admin/users?user_id=${user?.id}&filter_type=all`);
-            if (response.ok) {
-                const data = await response.json();
-                setAllUsers(data.users);
+            const data = await fetchUsersPage('all', more ? allUsersCursor : null);
+            if (data) {
+                setAllUsers(prev => more ? [...prev, ...data.users] : data.users);
+                setAllUsersCursor(data.next_cursor ?? null);
+                setAllUsersTotal(data.total ?? 0);
             }
         } catch (error) {
             console.error('Failed to load all users:', error);
         }
     };
 
-    const loadAdminUsers = async () => {
+    const loadAdminUsers = async (more = false) => {
         try {
-            const response = await fetch(`${API_BASE_URL}/api/admin/users?user_id=${user?.id}&filter_type=admin`);
-            if (response.ok) {
-                const data = await response.json();
-                setAdminUsers(data.users);
+            const data = await fetchUsersPage('admin', more ? adminUsersCursor : null);
+            if (data) {
+                setAdminUsers(prev => more ? [...prev, ...data.users] : data.users);
+                setAdminUsersCursor(data.next_cursor ?? null);
             }
         } catch (error) {
             console.error('Failed to load admin users:', error);
@@ -312,9 +324,9 @@ const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
         </div>
     );
 
-    const renderUserList = (users: UserListItem[], title: string) => (
+    const renderUserList = (users: UserListItem[], title: string, total?: number, onLoadMore?: () => void) => (
         <div className="space-y-2">
-            <div className="text-sm font-bold uppercase text-gray-400 mb-4">{title} ({users.length})</div>
+            <div className="text-sm font-bold uppercase text-gray-400 mb-4">{title} ({Math.max(total ?? 0, users.length)})</div>
             {users.map(u => (
                 <div key={u.id} className={`bg-black border ${u.is_blocked ? 'border-red-900 opacity-50' : 'border-white/20'} p-4 flex justify-between items-center hover:border-white transition-colors`}>
                     <div>
@@ -344,6 +356,14 @@ const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
                     )}
                 </div>
             ))}
+            {onLoadMore && (
+                <button
+                    onClick={onLoadMore}
+                    className="w-full py-3 border border-white/20 text-xs font-bold uppercase text-gray-400 hover:border-white hover:text-white transition-colors"
+                >
+                    ПОКАЗАТЬ ЕЩЁ
+                </button>
+            )}
         </div>
     );
 
@@ -458,10 +478,10 @@ const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
                         {activeTab === 'all' && (
                             <>
                                 {renderGrantRights()}
-                                <div className="mt-6">{renderUserList(allUsers, 'Все пользователи')}</div>
+                                <div className="mt-6">{renderUserList(allUsers, 'Все пользователи', allUsersTotal, allUsersCursor ? () => loadAllUsers(true) : undefined)}</div>
                             </>
                         )}
-                        {activeTab === 'admins' && renderUserList(adminUsers, 'Администраторы')}
+                        {activeTab === 'admins' && renderUserList(adminUsers, 'Администраторы', undefined, adminUsersCursor ? () => loadAdminUsers(true) : undefined)}
                         {activeTab === 'broadcast' && renderBroadcast()}
                         {activeTab === 'top_users' && (
                             <div className="space-y-2">